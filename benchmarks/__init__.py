@@ -0,0 +1,5 @@
+"""
+Benchmarks for :py:mod:`lookupapi`. Each module may be run from the repository root via
+``python -m benchmarks.<module>``.
+
+"""
@@ -0,0 +1,112 @@
+"""
+Load benchmark which drives each endpoint in :py:mod:`lookupapi.urls` in turn and reports its
+throughput and latency percentiles. Lookup is replaced by the fake server in
+:py:mod:`benchmarks.fakelookup` and lookupproxy is served by a single threaded gunicorn worker.
+Responses are not cached so that every request which needs Lookup data is proxied.
+
+gunicorn must be installed. Run from the repository root::
+
+    python -m benchmarks.bench_endpoints --latency 0.05 --member-count 500
+
+"""
+import argparse
+import urllib.parse
+
+import requests
+
+from benchmarks import loadtest
+
+
+GUNICORN_ARGS = ['--workers', '1', '--worker-class', 'gthread', '--threads', '32']
+"""
+gunicorn command line arguments. A single worker process is used so that the throughput reported
+is that of one worker.
+
+"""
+
+REQUESTS = {
+    'person-attributes': 'attributes/people',
+    'person-list': 'people?query=fake&limit=20',
+    'person-batch': loadtest.Request(
+        'POST', 'people/batch', {'identifiers': ['fake{}'.format(idx) for idx in range(10)]}),
+    'person-detail': 'people/crsid/fake1?fetch=email,title',
+    'group-detail': 'groups/100656?fetch=all_members',
+    'institution-list': 'institutions',
+    'institution-detail': 'institutions/UIS?fetch=all_members',
+    'institution-attributes': 'attributes/institutions',
+    'healthz': 'healthz',
+    'schema-json': 'swagger.json',
+}
+"""
+Requests made for each URL name. The request for attribute-content is added once the URL of some
+content is known.
+
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark each lookupproxy endpoint.')
+    parser.add_argument(
+        '--latency', type=float, default=0.05,
+        help='seconds taken by Lookup to answer each call (default: %(default)s)')
+    parser.add_argument(
+        '--concurrency', type=int, default=16,
+        help='number of concurrent clients (default: %(default)s)')
+    parser.add_argument(
+        '--duration', type=float, default=5,
+        help='seconds for which each endpoint is driven (default: %(default)s)')
+    parser.add_argument(
+        '--member-count', type=int, default=20,
+        help='number of members of every group and institution (default: %(default)s)')
+    parser.add_argument(
+        '--search-count', type=int, default=250,
+        help='number of people matched by every search (default: %(default)s)')
+    parser.add_argument(
+        '--photo-size', type=int, default=4096,
+        help='size of each photo in bytes (default: %(default)s)')
+    args = parser.parse_args()
+
+    fake_lookup = loadtest.fake_lookup(
+        args.latency, member_count=args.member_count, search_count=args.search_count,
+        photo_size=args.photo_size)
+    with fake_lookup as (lookup_port, certfile):
+        with loadtest.lookupproxy(lookup_port, certfile, GUNICORN_ARGS) as base_url:
+            requests_by_name = dict(REQUESTS)
+            requests_by_name['attribute-content'] = get_content_path(base_url)
+
+            print('{:24s} {:>10s} {:>8s} {:>8s} {:>8s} {:>7s}'.format(
+                'endpoint', 'requests/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors'))
+            for name, request in requests_by_name.items():
+                # Warm up the connection pool, introspection cache and any snapshots.
+                loadtest.generate_load(base_url, {name: request}, args.concurrency, 1)
+                results = loadtest.generate_load(
+                    base_url, {name: request}, args.concurrency, args.duration)
+                report(name, results, args.duration)
+
+
+def get_content_path(base_url):
+    """Return the path of some binary content by fetching a person's photo."""
+    response = requests.get(
+        base_url + 'people/crsid/fake1?fetch=jpegPhoto',
+        headers={'Authorization': 'Bearer benchmark-token'})
+    response.raise_for_status()
+    url = response.json()['attributes'][0]['binaryDataUrl']
+    return urllib.parse.urlsplit(url).path.lstrip('/')
+
+
+def report(name, results, duration):
+    """Print the throughput and latency percentiles of successful requests in *results*."""
+    elapsed = [result.elapsed for result in results if result.status == 200]
+    errors = len(results) - len(elapsed)
+    if len(elapsed) == 0:
+        print('{:24s} {:>10s} {:>8s} {:>8s} {:>8s} {:7d}'.format(
+            name, '-', '-', '-', '-', errors))
+        return
+    print('{:24s} {:10.1f} {:8.1f} {:8.1f} {:8.1f} {:7d}'.format(
+        name, len(elapsed) / duration,
+        *[1e3 * loadtest.percentile(elapsed, percent) for percent in (50, 95, 99)],
+        errors))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Microbenchmark comparing the per-request cost of obtaining an exception-wrapping
+:py:class:`ibisclient.PersonMethods` instance by inspecting and decorating each method of the
+instance, as :py:mod:`lookupapi.ibis` used to, with re-classing the instance as a pre-computed
+wrapped class, as it does now.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_ibis_methods
+
+"""
+import inspect
+import timeit
+
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure()
+
+from ucamlookup import ibisclient  # noqa: E402
+
+from lookupapi import ibis  # noqa: E402
+
+
+NUMBER = 20000
+
+
+def get_person_methods_by_inspection(connection):
+    """The previous implementation of :py:func:`lookupapi.ibis.get_person_methods`."""
+    obj = ibisclient.PersonMethods(connection)
+    for name, value in inspect.getmembers(obj, inspect.ismethod):
+        setattr(obj, name, ibis.ibis_exception_wrapper(value))
+    return obj
+
+
+def main():
+    connection = object()
+    results = [
+        ('inspect.getmembers', lambda: get_person_methods_by_inspection(connection)),
+        ('pre-computed class', lambda: ibis.get_person_methods(connection)),
+    ]
+    for label, f in results:
+        elapsed = min(timeit.repeat(f, number=NUMBER, repeat=5))
+        print('{:20s} {:8.2f} us per call'.format(label, 1e6 * elapsed / NUMBER))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark comparing serialisation of an institution with a large member list by the Django REST
+Framework serializers in :py:mod:`lookupapi.serializers` with the compiled plans in
+:py:mod:`lookupapi.fastserializers`.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_serializers
+
+"""
+import os
+import timeit
+
+import django
+from django.conf import settings
+
+if not settings.configured and 'DJANGO_SETTINGS_MODULE' not in os.environ:
+    settings.configure(
+        INSTALLED_APPS=['rest_framework', 'lookupapi'], ROOT_URLCONF='lookupapi.urls',
+        ALLOWED_HOSTS=['localhost'])
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+from ucamlookup import ibisclient  # noqa: E402
+
+from lookupapi import fastserializers, serializers  # noqa: E402
+
+
+MEMBERS = 5000
+
+NUMBER = 5
+
+
+def make_institution(member_count):
+    """Return an institution with *member_count* members."""
+    institution = ibisclient.IbisInstitution()
+    institution.instid = 'UIS'
+    institution.name = 'University Information Services'
+    institution.acronym = 'UIS'
+    institution.cancelled = False
+    institution.members = []
+    for idx in range(member_count):
+        person = ibisclient.IbisPerson()
+        person.identifier = ibisclient.IbisIdentifier({'scheme': 'crsid', 'value': None})
+        person.identifier.value = 'abc{}'.format(idx)
+        person.cancelled = False
+        person.visibleName = 'A. B. Person {}'.format(idx)
+        institution.members.append(person)
+    return institution
+
+
+def main():
+    institution = make_institution(MEMBERS)
+    context = {'request': Request(APIRequestFactory().get('/', HTTP_HOST='localhost'))}
+    serializer_class = serializers.InstitutionSerializer
+
+    def drf():
+        return serializer_class(institution, context=context).data
+
+    def fast():
+        return fastserializers.serialize(serializer_class, institution, context)
+
+    renderer = JSONRenderer()
+    assert renderer.render(drf()) == renderer.render(fast())
+
+    for label, f in [('DRF serializer', drf), ('compiled plan', fast)]:
+        elapsed = min(timeit.repeat(f, number=NUMBER, repeat=3))
+        print('{:20s} {:8.2f} ms per institution with {} members'.format(
+            label, 1e3 * elapsed / NUMBER, MEMBERS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark comparing the peak memory allocated while rendering an institution with a large member
+list in full with that allocated while streaming it via
+:py:func:`lookupapi.responses.streaming_response`.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_streaming
+
+"""
+import tracemalloc
+
+from benchmarks.bench_serializers import make_institution
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from lookupapi import fastserializers, responses, serializers
+
+
+MEMBER_COUNTS = [1000, 10000, 50000]
+
+
+def measure(f):
+    """Return the peak number of bytes allocated by calling *f*."""
+    tracemalloc.start()
+    try:
+        f()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    context = {'request': Request(APIRequestFactory().get('/', HTTP_HOST='localhost'))}
+    serializer_class = serializers.InstitutionSerializer
+
+    for member_count in MEMBER_COUNTS:
+        institution = make_institution(member_count)
+
+        def rendered():
+            JSONRenderer().render(
+                fastserializers.serialize(serializer_class, institution, context))
+
+        def streamed():
+            response = responses.streaming_response(fastserializers.serialize(
+                serializer_class, institution, context, lazy=True))
+            for _ in response.streaming_content:
+                pass
+
+        print('{:6d} members: rendered {:8.1f} KiB, streamed {:8.1f} KiB peak'.format(
+            member_count, measure(rendered) / 1024, measure(streamed) / 1024))
+
+
+if __name__ == '__main__':
+    main()
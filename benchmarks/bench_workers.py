@@ -0,0 +1,60 @@
+"""
+Load benchmark comparing the throughput of lookupproxy served by gunicorn with sync, gthread and
+gevent workers when every call to Lookup takes a fixed time. Lookup is replaced by the fake server
+in :py:mod:`benchmarks.fakelookup` and responses are not cached so that every request is proxied.
+
+gunicorn must be installed and gevent must be installed for the gevent configuration to run. Run
+from the repository root::
+
+    python -m benchmarks.bench_workers
+
+"""
+import importlib.util
+
+from benchmarks import loadtest
+
+
+LATENCY = 0.1
+"""Seconds taken by the fake Lookup server to answer each call."""
+
+CONCURRENCY = 64
+"""Number of concurrent clients."""
+
+DURATION = 10
+"""Seconds for which load is generated for each configuration."""
+
+CONFIGURATIONS = [
+    ('sync', ['--workers', '3']),
+    ('gthread', ['--workers', '3', '--worker-class', 'gthread', '--threads', '16']),
+    ('gevent', ['--workers', '3', '--worker-class', 'gevent', '--worker-connections', '256']),
+]
+"""Names and gunicorn command line arguments of the configurations compared."""
+
+PATHS = {
+    'person': 'people/crsid/fake1',
+    'search': 'people?query=fake&limit=10',
+    'group': 'groups/100656',
+    'institution': 'institutions/UIS',
+}
+"""Paths requested in turn by each client."""
+
+
+def main():
+    with loadtest.fake_lookup(LATENCY) as (lookup_port, certfile):
+        for name, gunicorn_args in CONFIGURATIONS:
+            if name == 'gevent' and importlib.util.find_spec('gevent') is None:
+                print('{:8s} skipped: gevent is not installed'.format(name))
+                continue
+
+            with loadtest.lookupproxy(lookup_port, certfile, gunicorn_args) as base_url:
+                # Warm up each worker's connection pool and introspection cache.
+                loadtest.generate_load(base_url, PATHS, CONCURRENCY, 1)
+                results = loadtest.generate_load(base_url, PATHS, CONCURRENCY, DURATION)
+
+            successes = sum(1 for result in results if result.status == 200)
+            print('{:8s} {:8.1f} requests/s {:6d} errors'.format(
+                name, successes / DURATION, len(results) - successes))
+
+
+if __name__ == '__main__':
+    main()
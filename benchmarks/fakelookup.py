@@ -0,0 +1,281 @@
+"""
+A fake Lookup API server for load testing.
+
+The server answers the Lookup API calls made by :py:mod:`lookupapi` with synthetic people, groups
+and institutions after a fixed delay which stands in for the latency of the real Lookup service.
+The sizes of the generated results are configurable. The server also implements OAuth2 token and
+token introspection endpoints which accept any client and any token.
+
+Since ibisclient only speaks HTTPS, the server uses a self-signed certificate for "localhost"
+which may be created by :py:func:`make_certificate`.
+
+Run from the repository root::
+
+    python -m benchmarks.fakelookup --port 8443 --latency 0.05
+
+"""
+import argparse
+import base64
+import http.server
+import json
+import os
+import socketserver
+import ssl
+import subprocess
+import tempfile
+import time
+import urllib.parse
+from xml.sax.saxutils import escape, quoteattr
+
+
+SCOPE = 'lookup:anonymous'
+"""Scope of every introspected token."""
+
+ATTRIBUTE_SCHEMES = ['email', 'jpegPhoto', 'title']
+"""Attribute schemes returned for people and institutions."""
+
+
+class FakeLookup:
+    """
+    Generator of synthetic Lookup API results. Every search matches *search_count* people, every
+    group and institution has *member_count* members, the directory of institutions has
+    *institution_count* institutions and photos are *photo_size* bytes long.
+
+    """
+    def __init__(self, search_count=250, member_count=20, institution_count=20,
+                 photo_size=4096):
+        self.search_count = search_count
+        self.member_count = member_count
+        self.institution_count = institution_count
+        self.photo_size = photo_size
+
+    def result(self, path, query):
+        """
+        Return the XML content of the result element for the Lookup API *path*, relative to
+        ``api/v1/``, called with the query parameters in the dict *query*. Calls which are not
+        recognised return an empty result.
+
+        """
+        parts = [urllib.parse.unquote_plus(part) for part in path.split('/')]
+        fetch = set(option for option in query.get('fetch', '').split(',') if option != '')
+        if parts in (['person', 'all-attr-schemes'], ['inst', 'all-attr-schemes']):
+            return '<attributeSchemes>{}</attributeSchemes>'.format(''.join(
+                self.attribute_scheme_xml(schemeid) for schemeid in ATTRIBUTE_SCHEMES))
+        if parts == ['person', 'search-count']:
+            return '<value>{}</value>'.format(self.search_count)
+        if parts == ['person', 'search']:
+            offset, limit = int(query.get('offset', 0)), int(query.get('limit', 100))
+            return self.people_xml(
+                'fake{}'.format(idx)
+                for idx in range(offset, min(offset + limit, self.search_count)))
+        if parts == ['person', 'list']:
+            return self.people_xml(
+                (crsid for crsid in query.get('crsids', '').split(',') if crsid != ''), fetch)
+        if len(parts) == 3 and parts[0] == 'person':
+            return self.person_xml(parts[2], parts[1], fetch)
+        if len(parts) == 2 and parts[0] == 'group':
+            return self.group_xml(parts[1])
+        if parts == ['inst', 'all-insts']:
+            return '<institutions>{}</institutions>'.format(''.join(
+                self.institution_xml('INST{}'.format(idx), members=0)
+                for idx in range(self.institution_count)))
+        if len(parts) == 2 and parts[0] == 'inst':
+            return self.institution_xml(parts[1])
+        return ''
+
+    def people_xml(self, crsids, fetch=(), tagname='people'):
+        """Return the XML for a list of people in an element named *tagname*."""
+        return '<{0}>{1}</{0}>'.format(
+            tagname, ''.join(self.person_xml(crsid, fetch=fetch) for crsid in crsids))
+
+    def person_xml(self, identifier, scheme='crsid', fetch=()):
+        """Return the XML for a person with the attributes named in *fetch*."""
+        attributes = ''.join(
+            self.attribute_xml(idx, schemeid, identifier)
+            for idx, schemeid in enumerate(ATTRIBUTE_SCHEMES) if schemeid in fetch)
+        return (
+            '<person cancelled="false"><identifier scheme={scheme}>{identifier}</identifier>'
+            '<displayName>{name}</displayName><registeredName>{name}</registeredName>'
+            '<surname>Person</surname><visibleName>{name}</visibleName>'
+            '<misAffiliation>staff</misAffiliation><attributes>{attributes}</attributes>'
+            '</person>'
+        ).format(
+            scheme=quoteattr(scheme), identifier=escape(identifier),
+            name=escape('A. {} Person'.format(identifier)), attributes=attributes)
+
+    def attribute_xml(self, attrid, schemeid, identifier):
+        """Return the XML for an attribute of a person."""
+        if schemeid == 'jpegPhoto':
+            # A JPEG magic number followed by data which differs for each person.
+            data = b'\xff\xd8\xff' + (identifier.encode('utf8') * self.photo_size)
+            value = '<binaryData>{}</binaryData>'.format(
+                base64.b64encode(data[:self.photo_size]).decode('ascii'))
+        else:
+            value = '<value>{}</value>'.format(escape('{} {}'.format(schemeid, identifier)))
+        return '<attribute attrid="{}" scheme={}>{}</attribute>'.format(
+            attrid, quoteattr(schemeid), value)
+
+    def attribute_scheme_xml(self, schemeid):
+        """Return the XML for an attribute scheme."""
+        return (
+            '<attributeScheme schemeid={schemeid} precedence="1" multiValued="true" '
+            'multiLined="false" searchable="true"><ldapName>{name}</ldapName>'
+            '<displayName>{name}</displayName><dataType>{data_type}</dataType>'
+            '</attributeScheme>'
+        ).format(
+            schemeid=quoteattr(schemeid), name=escape(schemeid),
+            data_type='binary' if schemeid == 'jpegPhoto' else 'text')
+
+    def group_xml(self, groupid):
+        """Return the XML for a group with members."""
+        return (
+            '<group cancelled="false" groupid={groupid}><name>group-{name}</name>'
+            '<title>Group {name}</title>{members}</group>'
+        ).format(
+            groupid=quoteattr(groupid), name=escape(groupid), members=self.people_xml(
+                ('member{}'.format(idx) for idx in range(self.member_count)),
+                tagname='members'))
+
+    def institution_xml(self, instid, members=None):
+        """Return the XML for an institution with members."""
+        members = self.member_count if members is None else members
+        return (
+            '<institution cancelled="false" instid={instid}><name>Institution {name}</name>'
+            '<acronym>{name}</acronym>{members}</institution>'
+        ).format(
+            instid=quoteattr(instid), name=escape(instid), members=self.people_xml(
+                ('member{}'.format(idx) for idx in range(members)), tagname='members'))
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """An HTTP server which handles each connection in a new thread."""
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, handler_class, latency=0, lookup=None):
+        super().__init__(address, handler_class)
+        self.latency = latency
+        self.lookup = lookup if lookup is not None else FakeLookup()
+
+
+class FakeLookupHandler(http.server.BaseHTTPRequestHandler):
+    """Request handler for :py:class:`ThreadingHTTPServer` implementing the fake endpoints."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond()
+
+    def respond(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if length > 0:
+            self.rfile.read(length)
+
+        time.sleep(self.server.latency)
+
+        url = urllib.parse.urlsplit(self.path)
+        if url.path.endswith('/oauth2/token'):
+            self.send_body(200, 'application/json', json.dumps({
+                'access_token': 'fake-client-token', 'token_type': 'bearer', 'expires_in': 3600,
+                'scope': 'introspect',
+            }))
+        elif url.path.endswith('/oauth2/introspect'):
+            self.send_body(200, 'application/json', json.dumps({
+                'active': True, 'scope': SCOPE, 'sub': 'mock:test0001',
+                'exp': int(time.time()) + 3600,
+            }))
+        elif '/api/v1/' in url.path:
+            path = url.path.split('/api/v1/', 1)[1]
+            query = dict(urllib.parse.parse_qsl(url.query))
+            self.send_body(
+                200, 'application/xml',
+                '<?xml version="1.0" encoding="UTF-8"?><result version="1.0">{}</result>'.format(
+                    self.server.lookup.result(path, query)))
+        else:
+            self.send_body(404, 'text/plain', 'Not found')
+
+    def send_body(self, status, content_type, body):
+        body = body.encode('utf8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_certificate(directory):
+    """
+    Create a self-signed certificate and private key for "localhost" in *directory* using the
+    ``openssl`` command and return a (certificate path, key path) tuple. Clients may trust the
+    certificate by pointing the ``REQUESTS_CA_BUNDLE`` environment variable at it.
+
+    """
+    certfile = os.path.join(directory, 'fakelookup.crt')
+    keyfile = os.path.join(directory, 'fakelookup.key')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-subj', '/CN=localhost', '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1',
+        '-keyout', keyfile, '-out', certfile,
+    ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return certfile, keyfile
+
+
+def make_server(port, latency, certfile, keyfile, lookup=None):
+    """
+    Return a :py:class:`ThreadingHTTPServer` serving HTTPS on *port* on localhost. Results are
+    generated by the :py:class:`FakeLookup` instance *lookup* or a default one if it is None.
+
+    """
+    server = ThreadingHTTPServer(
+        ('127.0.0.1', port), FakeLookupHandler, latency=latency, lookup=lookup)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certfile, keyfile)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a fake Lookup API server.')
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument(
+        '--latency', type=float, default=0.05,
+        help='seconds to wait before answering each request (default: %(default)s)')
+    parser.add_argument(
+        '--search-count', type=int, default=250,
+        help='number of people matched by every search (default: %(default)s)')
+    parser.add_argument(
+        '--member-count', type=int, default=20,
+        help='number of members of every group and institution (default: %(default)s)')
+    parser.add_argument(
+        '--institution-count', type=int, default=20,
+        help='number of institutions in the directory (default: %(default)s)')
+    parser.add_argument(
+        '--photo-size', type=int, default=4096,
+        help='size of each photo in bytes (default: %(default)s)')
+    parser.add_argument('--certfile', help='certificate (default: create a self-signed one)')
+    parser.add_argument('--keyfile', help='private key for the certificate')
+    args = parser.parse_args()
+    lookup = FakeLookup(
+        search_count=args.search_count, member_count=args.member_count,
+        institution_count=args.institution_count, photo_size=args.photo_size)
+
+    with tempfile.TemporaryDirectory() as directory:
+        certfile, keyfile = args.certfile, args.keyfile
+        if certfile is None:
+            certfile, keyfile = make_certificate(directory)
+            print('Using self-signed certificate {}'.format(certfile), flush=True)
+        server = make_server(args.port, args.latency, certfile, keyfile, lookup)
+        print('Serving on https://localhost:{}/'.format(args.port), flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Helpers for load testing lookupproxy served by gunicorn against the fake Lookup server in
+:py:mod:`benchmarks.fakelookup`. Both servers run in sub-processes so that they do not compete with
+the load generator for the interpreter lock.
+
+"""
+import collections
+import contextlib
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from benchmarks import fakelookup
+
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Request = collections.namedtuple('Request', 'method path body')
+Request.__doc__ = """
+A request made by :py:func:`generate_load`. The *path* is relative to the base URL and *body*, if
+not None, is sent as JSON.
+
+"""
+
+Result = collections.namedtuple('Result', 'name status elapsed')
+Result.__doc__ = """
+The outcome of a single request made by :py:func:`generate_load`. The *status* is None if the
+request failed without a response and *elapsed* is in seconds.
+
+"""
+
+
+@contextlib.contextmanager
+def fake_lookup(latency, **sizes):
+    """
+    Context manager which runs the fake Lookup server with the given latency in seconds and yields
+    a (port, certificate path) tuple. Keyword arguments set the sizes of the generated results.
+    See :py:class:`~benchmarks.fakelookup.FakeLookup`.
+
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        certfile, keyfile = fakelookup.make_certificate(directory)
+        port = get_free_port()
+        size_args = []
+        for name, value in sorted(sizes.items()):
+            size_args.extend(['--' + name.replace('_', '-'), str(value)])
+        process = subprocess.Popen([
+            sys.executable, '-m', 'benchmarks.fakelookup', '--port', str(port),
+            '--latency', str(latency), '--certfile', certfile, '--keyfile', keyfile,
+        ] + size_args, cwd=REPOSITORY_ROOT, stdout=subprocess.DEVNULL)
+        try:
+            wait_for_port(port)
+            yield port, certfile
+        finally:
+            process.terminate()
+            process.wait()
+
+
+@contextlib.contextmanager
+def lookupproxy(lookup_port, certfile, gunicorn_args,
+                settings_module='lookupproxy.settings.benchmark'):
+    """
+    Context manager which serves ``lookupproxy.wsgi`` with gunicorn, using the server hooks in
+    :py:mod:`lookupproxy.gunicornconf` and passing it the additional command line arguments
+    *gunicorn_args*, and yields its base URL. The fake Lookup server
+    listening on *lookup_port* is trusted via the certificate *certfile*. A fresh SQLite database
+    is used.
+
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ, DJANGO_SETTINGS_MODULE=settings_module, DJANGO_SECRET_KEY='benchmark',
+            DJANGO_DB_NAME=os.path.join(directory, 'db.sqlite3'),
+            LOOKUPPROXY_FAKE_LOOKUP_PORT=str(lookup_port), REQUESTS_CA_BUNDLE=certfile)
+        subprocess.run(
+            [sys.executable, 'manage.py', 'migrate', '--verbosity', '0'],
+            cwd=REPOSITORY_ROOT, env=env, check=True)
+
+        port = get_free_port()
+        process = subprocess.Popen([
+            sys.executable, '-m', 'gunicorn', 'lookupproxy.wsgi:application',
+            '--config', 'lookupproxy/gunicornconf.py',
+            '--bind', '127.0.0.1:{}'.format(port), '--log-level', 'warning',
+        ] + list(gunicorn_args), cwd=REPOSITORY_ROOT, env=env)
+        try:
+            base_url = 'http://127.0.0.1:{}/'.format(port)
+            wait_for_url(base_url + 'healthz')
+            yield base_url
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def generate_load(base_url, requests_by_name, concurrency, duration):
+    """
+    Make requests from *concurrency* threads for *duration* seconds and return a list of
+    :py:class:`Result` tuples. The dict *requests_by_name* maps names to :py:class:`Request`
+    tuples, or to paths relative to *base_url* which are fetched with GET, and each thread makes
+    each request in turn. Requests carry a bearer token which the fake Lookup server accepts.
+
+    """
+    items = [
+        (name, Request('GET', request, None) if isinstance(request, str) else request)
+        for name, request in requests_by_name.items()
+    ]
+    deadline = time.monotonic() + duration
+    results = []
+    results_lock = threading.Lock()
+
+    def run(offset):
+        session = requests.Session()
+        session.headers['Authorization'] = 'Bearer benchmark-token'
+        thread_results = []
+        idx = offset
+        while time.monotonic() < deadline:
+            name, request = items[idx % len(items)]
+            idx += 1
+            start = time.monotonic()
+            try:
+                status = session.request(
+                    request.method, base_url + request.path, json=request.body,
+                    timeout=60).status_code
+            except requests.RequestException:
+                status = None
+            thread_results.append(Result(name, status, time.monotonic() - start))
+        with results_lock:
+            results.extend(thread_results)
+
+    threads = [threading.Thread(target=run, args=(idx,)) for idx in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def percentile(values, percent):
+    """
+    Return the *percent* percentile of the sequence *values* by the nearest-rank method.
+
+    >>> percentile([4, 1, 3, 2], 50)
+    2
+    >>> percentile([4, 1, 3, 2], 99)
+    4
+
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def get_free_port():
+    """Return a TCP port on localhost which is not currently in use."""
+    with contextlib.closing(socket.socket()) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    """Wait for a server to accept connections on *port* on localhost."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def wait_for_url(url, timeout=60):
+    """Wait for *url* to return a 200 response."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if requests.get(url, timeout=5).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError('Timed out waiting for {}'.format(url))
+        time.sleep(0.2)
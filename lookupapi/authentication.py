@@ -0,0 +1,194 @@
+"""
+OAuth2 token authentication for Django REST Framework views.
+
+"""
+import hashlib
+import threading
+import time
+
+from automationoauthdrf import authentication
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework.authentication import get_authorization_header
+
+from . import cache
+from . import health
+from . import permissions
+
+
+_MISSING = object()
+
+_introspection_cache = None
+_introspection_cache_lock = threading.Lock()
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+USER_RESOLUTIONS = ['database', 'cached', 'token']
+"""Valid values of the ``OAUTH2_USER_RESOLUTION`` setting."""
+
+
+class IntrospectedToken(dict):
+    """
+    The result of introspecting a valid OAuth2 token. The :py:attr:`granted_scopes` attribute is a
+    frozenset of the scopes in the "scope" field, parsed once when the result is cached, which is
+    used by :py:class:`~.permissions.HasScopesPermission`.
+
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.granted_scopes = permissions.parse_scopes(self.get('scope', ''))
+
+
+class TokenUser:
+    """
+    A user which is not stored in the database, identified by the subject of an OAuth2 token.
+    Instances provide the parts of the interface of :py:class:`django.contrib.auth.models.User`
+    used by views and have no permissions.
+
+    """
+    pk = id = None
+    is_active = True
+    is_staff = False
+    is_superuser = False
+    is_anonymous = False
+    is_authenticated = True
+
+    def __init__(self, username):
+        self.username = username
+
+    def __str__(self):
+        return self.username
+
+    def __eq__(self, other):
+        return isinstance(other, TokenUser) and other.username == self.username
+
+    def __hash__(self):
+        return hash(self.username)
+
+    def get_username(self):
+        return self.username
+
+    def has_perm(self, perm, obj=None):
+        return False
+
+    def has_perms(self, perm_list, obj=None):
+        return False
+
+    def has_module_perms(self, module):
+        return False
+
+
+class OAuth2TokenAuthentication(authentication.OAuth2TokenAuthentication):
+    """
+    A sub-class of :py:class:`automationoauthdrf.authentication.OAuth2TokenAuthentication` which
+    caches the result of token introspection so that repeated requests with the same bearer token
+    do not each require a call to the introspection endpoint.
+
+    Valid tokens are cached until they expire or for ``OAUTH2_INTROSPECT_CACHE_MAX_TTL`` seconds,
+    whichever is sooner. Invalid tokens are cached for ``OAUTH2_INTROSPECT_CACHE_NEGATIVE_TTL``
+    seconds. Errors contacting the introspection endpoint are never cached. Valid tokens are
+    returned as :py:class:`IntrospectedToken` instances whose granted scopes are parsed once.
+
+    The user for the token's subject is resolved according to the ``OAUTH2_USER_RESOLUTION``
+    setting. If it is "database", the base class gets or creates a database user on every request.
+    If it is "cached", database users are cached in each worker process by :py:meth:`get_user` and
+    if it is "token", the user is a :py:class:`TokenUser` and the database is never used.
+
+    """
+    def authenticate(self, request):
+        resolution = settings.OAUTH2_USER_RESOLUTION
+        if resolution == 'database':
+            return super().authenticate(request)
+
+        bearer = get_bearer_token(request)
+        if bearer is None:
+            return None
+        token = self.validate_token(bearer)
+        if token is None:
+            return None
+        return self.get_user(token.get('sub'), resolution), token
+
+    def get_user(self, subject, resolution):
+        """
+        Return the user for the token subject *subject*, or None if there is no subject, for the
+        "cached" or "token" user resolution *resolution*.
+
+        """
+        if subject is None or subject == '':
+            return None
+        if resolution == 'token':
+            return TokenUser(subject)
+
+        user_cache = get_user_cache()
+        user = user_cache.get(subject)
+        if user is None:
+            user, _ = get_user_model().objects.get_or_create(username=subject)
+            user_cache.set(subject, user, settings.OAUTH2_USER_CACHE_TTL)
+        return user
+
+    def validate_token(self, token):
+        introspection_cache = get_introspection_cache()
+        key = hashlib.sha256(token.encode('utf8')).hexdigest()
+
+        result = introspection_cache.get(key, _MISSING)
+        if result is not _MISSING:
+            return result
+
+        with health.introspection.track():
+            result = super().validate_token(token)
+
+        if result is None:
+            ttl = settings.OAUTH2_INTROSPECT_CACHE_NEGATIVE_TTL
+        else:
+            result = IntrospectedToken(result)
+            ttl = settings.OAUTH2_INTROSPECT_CACHE_MAX_TTL
+            if 'exp' in result:
+                ttl = min(ttl, result['exp'] - time.time())
+
+        if ttl > 0:
+            introspection_cache.set(key, result, ttl)
+
+        return result
+
+
+def get_introspection_cache():
+    """
+    Return the :py:class:`~.cache.LRUCache` used to cache token introspection results in this
+    process, creating it if necessary. Keys are SHA256 digests of bearer tokens so that the tokens
+    themselves are not retained.
+
+    """
+    global _introspection_cache
+    with _introspection_cache_lock:
+        if _introspection_cache is None:
+            _introspection_cache = cache.LRUCache(settings.OAUTH2_INTROSPECT_CACHE_MAX_ENTRIES)
+        return _introspection_cache
+
+
+def get_user_cache():
+    """
+    Return the :py:class:`~.cache.LRUCache` of database users keyed by token subject used in this
+    process when ``OAUTH2_USER_RESOLUTION`` is "cached", creating it if necessary.
+
+    """
+    global _user_cache
+    with _user_cache_lock:
+        if _user_cache is None:
+            _user_cache = cache.LRUCache(settings.OAUTH2_INTROSPECT_CACHE_MAX_ENTRIES)
+        return _user_cache
+
+
+def get_bearer_token(request):
+    """
+    Return the bearer token from the Authorization header of *request* or None if there is no
+    bearer token.
+
+    """
+    parts = get_authorization_header(request).split()
+    if len(parts) != 2 or parts[0].lower() != b'bearer':
+        return None
+    try:
+        return parts[1].decode('ascii')
+    except UnicodeDecodeError:
+        return None
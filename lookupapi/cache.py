@@ -0,0 +1,435 @@
+"""
+Caching of serialised Lookup resources.
+
+The detail views in :py:mod:`~lookupapi.views` cache the serialised representation of the resource
+they return so that repeated requests for the same resource need neither call Lookup nor
+re-serialise the result. Each worker process has an in-process :py:class:`LRUCache` which may be
+backed by a Django cache shared between worker processes. See the ``LOOKUP_API_CACHE_...`` settings
+in :py:mod:`~lookupapi.defaultsettings`.
+
+"""
+import collections
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import health
+from . import ibis
+
+
+LOG = logging.getLogger(__name__)
+
+_process_check_lock = threading.Lock()
+
+
+class ProcessLocalState:
+    """
+    Base class for objects whose locks and in-flight calls belong to the process which created
+    them. A process forked while a thread of its parent held such a lock or was making such a call
+    would inherit a lock which is never released or a call which never completes, since the thread
+    does not exist in the child. Subclasses create this state in :py:meth:`_reset_process_state`
+    and call :py:meth:`_check_process` before using it so that it is re-created the first time the
+    object is used in a forked process, in the same way as the objects returned by
+    :py:func:`~lookupapi.ibis.get_pool` and :py:func:`~lookupapi.ibis.get_executor`.
+
+    """
+    def __init__(self):
+        self._pid = os.getpid()
+        self._reset_process_state()
+
+    def _reset_process_state(self):
+        """Create the state which belongs to the current process."""
+
+    def _check_process(self):
+        """Re-create the state of this object if the process has forked since it was created."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with _process_check_lock:
+            if self._pid != pid:
+                self._reset_process_state()
+                self._pid = pid
+
+
+class LRUCache(ProcessLocalState):
+    """
+    A thread-safe in-process cache holding at most *max_entries* entries. Each entry is fresh for
+    the timeout passed to :py:meth:`set` and may optionally be kept as a stale entry for a further
+    stale timeout. When the cache is full, the least recently used entry is evicted. The cache
+    starts empty in a forked process.
+
+    The cache maintains ``hits``, ``stale_hits``, ``misses`` and ``evictions`` counters which are
+    returned by :py:meth:`stats`. Expired entries count as misses, not evictions.
+
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        super().__init__()
+
+    def _reset_process_state(self):
+        # Entries are (value, fresh until, stale until) tuples.
+        self._entries = collections.OrderedDict()
+        self._counters = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value for *key* or *default* if there is no fresh entry for *key*."""
+        entry = self.get_entry(key)
+        if entry is None or not entry[1]:
+            return default
+        return entry[0]
+
+    def get_entry(self, key):
+        """
+        Return a (value, is fresh) tuple for *key* or None if there is no fresh or stale entry for
+        *key*.
+
+        """
+        self._check_process()
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is None or entry[2] <= now:
+                self._entries.pop(key, None)
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            is_fresh = entry[1] > now
+            self._counters['hits' if is_fresh else 'stale_hits'] += 1
+            return entry[0], is_fresh
+
+    def set(self, key, value, timeout, stale_timeout=0):
+        """
+        Set the value for *key* to be fresh for *timeout* seconds and stale for a further
+        *stale_timeout* seconds.
+
+        """
+        self._check_process()
+        with self._lock:
+            fresh_until = time.monotonic() + timeout
+            self._entries[key] = (value, fresh_until, fresh_until + stale_timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def delete(self, key):
+        """Remove any entry for *key*."""
+        self._check_process()
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries."""
+        self._check_process()
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return a dictionary of counters along with the current number of entries."""
+        self._check_process()
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update({'entries': len(self._entries), 'max_entries': self.max_entries})
+        return stats
+
+
+class SingleFlight(ProcessLocalState):
+    """
+    Coalesces concurrent calls for the same key so that only one call is in flight at a time. Other
+    callers wait for, and share, the result of the in-flight call. The number of calls which were
+    coalesced in this way is returned by :py:meth:`stats`. Calls in flight in a parent process are
+    forgotten in a forked process.
+
+    """
+    def _reset_process_state(self):
+        self._calls = {}
+        self._coalesced = 0
+        self._lock = threading.Lock()
+
+    def do(self, key, f):
+        """
+        Call *f* with no arguments and return its result unless a call for *key* is already in
+        flight in which case wait for it and return its result instead. Exceptions raised by *f*
+        are raised in all callers.
+
+        """
+        self._check_process()
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+            else:
+                self._coalesced += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.result
+
+        try:
+            call.result = f()
+        except Exception as e:
+            call.exception = e
+            raise
+        finally:
+            with self._lock:
+                # The calls may have been reset by _reset_process_state since this one started.
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def stats(self):
+        """Return a dictionary of counters."""
+        self._check_process()
+        with self._lock:
+            return {'coalesced': self._coalesced, 'in_flight': len(self._calls)}
+
+
+class _Call:
+    """An in-flight call made via :py:meth:`SingleFlight.do`."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class ResponseCache(ProcessLocalState):
+    """
+    A two-level cache of serialised responses. Entries are looked for first in an in-process
+    :py:class:`LRUCache` holding at most *max_entries* entries and then, if *backend* is not None,
+    in the Django cache with that alias. Entries found in the Django cache are copied into the
+    in-process cache for the remainder of their lifetime.
+
+    :py:meth:`get_or_set` coalesces concurrent misses for the same key into a single call and
+    serves stale entries while refreshing them in the background.
+
+    Keys are tuples as returned by :py:func:`make_key`.
+
+    """
+    def __init__(self, max_entries, backend=None):
+        self.local = LRUCache(max_entries)
+        self.backend = backend
+        self._flight = SingleFlight()
+        super().__init__()
+
+    def _reset_process_state(self):
+        self._refreshing = set()
+        self._counters = {
+            'backend_hits': 0, 'backend_misses': 0, 'refreshes': 0, 'refresh_failures': 0,
+            'prefetches': 0,
+        }
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for *key* or None if there is no fresh value."""
+        entry = self.get_entry(key)
+        if entry is None or not entry[1]:
+            return None
+        return entry[0]
+
+    def get_entry(self, key):
+        """
+        Return a (value, is fresh) tuple for *key* or None if there is no fresh or stale value.
+
+        """
+        entry = self.local.get_entry(key)
+        if self.backend is None or (entry is not None and entry[1]):
+            return entry
+
+        # Another process may have a fresher value than our stale one.
+        self._check_process()
+        with health.cache_backend.track():
+            backend_entry = caches[self.backend].get(_backend_key(key))
+        with self._lock:
+            self._counters['backend_misses' if backend_entry is None else 'backend_hits'] += 1
+        if backend_entry is None:
+            return entry
+
+        value, fresh_until, stale_until = backend_entry
+        now = time.time()
+        if stale_until <= now:
+            return entry
+        timeout = max(0, fresh_until - now)
+        self.local.set(key, value, timeout, stale_until - now - timeout)
+        return value, timeout > 0
+
+    def set(self, key, value, timeout, stale_timeout=0):
+        """
+        Cache *value* for *key*. The value is fresh for *timeout* seconds and stale for a further
+        *stale_timeout* seconds.
+
+        """
+        self.local.set(key, value, timeout, stale_timeout)
+        if self.backend is not None:
+            fresh_until = time.time() + timeout
+            with health.cache_backend.track():
+                caches[self.backend].set(
+                    _backend_key(key), (value, fresh_until, fresh_until + stale_timeout),
+                    timeout + stale_timeout)
+
+    def get_or_set(self, key, compute, timeout, stale_timeout=0):
+        """
+        Return the cached value for *key*. If there is no cached value, call *compute* with no
+        arguments and cache the result. Concurrent misses for the same key share a single call to
+        *compute*. If the cached value is stale, it is returned immediately and a single background
+        refresh is started.
+
+        """
+        entry = self.get_entry(key)
+        if entry is None:
+            return self._flight.do(
+                key, lambda: self._compute_and_set(key, compute, timeout, stale_timeout))
+
+        value, is_fresh = entry
+        if not is_fresh:
+            self._refresh(key, compute, timeout, stale_timeout)
+        return value
+
+    def prefetch(self, key, compute, timeout, stale_timeout=0):
+        """
+        Start a background call to *compute* to cache the value for *key* unless there is already a
+        fresh value. The call is submitted to the executor returned by
+        :py:func:`~lookupapi.ibis.get_prefetch_executor`. Once it has started, concurrent calls to
+        :py:meth:`get_or_set` for *key* wait for it rather than making their own.
+
+        """
+        entry = self.get_entry(key)
+        if entry is not None and entry[1]:
+            return
+        self._refresh(
+            key, compute, timeout, stale_timeout, counter='prefetches',
+            executor=ibis.get_prefetch_executor())
+
+    def delete(self, key):
+        """Remove any cached value for *key*."""
+        self.local.delete(key)
+        if self.backend is not None:
+            caches[self.backend].delete(_backend_key(key))
+
+    def clear(self):
+        """Clear the in-process cache. Entries in any shared backend are left alone."""
+        self.local.clear()
+
+    def stats(self):
+        """Return a dictionary of counters for both the in-process and backend caches."""
+        stats = self.local.stats()
+        stats.update(self._flight.stats())
+        self._check_process()
+        with self._lock:
+            stats.update(self._counters)
+        return stats
+
+    def _compute_and_set(self, key, compute, timeout, stale_timeout):
+        value = compute()
+        self.set(key, value, timeout, stale_timeout)
+        return value
+
+    def _refresh(self, key, compute, timeout, stale_timeout, counter='refreshes', executor=None):
+        """
+        Start a background refresh of *key* unless one is already running. The refresh is submitted
+        to *executor* or, if it is None, to the executor returned by
+        :py:func:`~lookupapi.ibis.get_executor`.
+
+        """
+        self._check_process()
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self._counters[counter] += 1
+
+        def refresh():
+            try:
+                self._flight.do(
+                    key, lambda: self._compute_and_set(key, compute, timeout, stale_timeout))
+            except Exception:
+                # The stale value continues to be served until it expires.
+                with self._lock:
+                    self._counters['refresh_failures'] += 1
+                LOG.exception('Error refreshing cached response for %r', key)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        try:
+            (executor if executor is not None else ibis.get_executor()).submit(refresh)
+        except Exception:
+            with self._lock:
+                self._refreshing.discard(key)
+            raise
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Return the :py:class:`ResponseCache` for this process, creating it if necessary.
+
+    """
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                settings.LOOKUP_API_CACHE_MAX_ENTRIES, settings.LOOKUP_API_CACHE_BACKEND)
+        return _response_cache
+
+
+def get_timeout(resource):
+    """
+    Return the number of seconds responses for *resource* should be cached for. A return value of
+    0 indicates that responses for *resource* should not be cached.
+
+    """
+    return settings.LOOKUP_API_CACHE_TIMEOUTS.get(resource, 0)
+
+
+def get_stale_timeout(resource):
+    """
+    Return the number of seconds after expiry that stale responses for *resource* may be served
+    while they are refreshed in the background.
+
+    """
+    return settings.LOOKUP_API_CACHE_STALE_TIMEOUTS.get(resource, 0)
+
+
+def make_key(resource, parts, fetch=None, base_url=''):
+    """
+    Return a cache key for the resource of type *resource* identified by the sequence *parts*. The
+    *fetch* parameter is normalised so that the order of, and whitespace around, fetch options do
+    not matter. The *base_url* should be the absolute URL of the API root since hyperlinks in the
+    serialised representation depend on it.
+
+    """
+    return (resource, tuple(parts), normalise_fetch(fetch), base_url)
+
+
+def normalise_fetch(fetch):
+    """
+    Return a canonical form of a comma-separated fetch parameter.
+
+    >>> normalise_fetch(' email, all_groups,email')
+    'all_groups,email'
+    >>> normalise_fetch(None)
+    ''
+
+    """
+    if fetch is None:
+        return ''
+    return ','.join(sorted({option.strip() for option in fetch.split(',') if option.strip()}))
+
+
+def _backend_key(key):
+    """Return a key for *key* which is safe to use with any Django cache backend."""
+    return 'lookupapi:' + hashlib.sha1(repr(key).encode('utf8')).hexdigest()
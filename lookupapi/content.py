@@ -0,0 +1,93 @@
+"""
+Content-addressed storage of binary attribute data.
+
+If the ``LOOKUP_API_BINARY_CONTENT_LINKS`` setting is True, the binary data of attributes, such as
+JPEG photos, is not included in serialised people and institutions. Instead, the data is stored
+here, keyed by its SHA256 digest, and attributes link to the
+:py:class:`~lookupapi.views.AttributeContent` endpoint which serves it.
+
+Content is held in a :py:class:`~lookupapi.cache.ResponseCache` which shares the
+``LOOKUP_API_CACHE_BACKEND`` Django cache with the response cache. The backend must be shared
+between worker processes so that content stored by one process can be served by any other and so
+that content evicted from the in-process cache is still available. Content must also outlive every
+cached representation which links to it. Both requirements are enforced by system checks in
+:py:mod:`~lookupapi.systemchecks`.
+
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+
+from . import cache
+
+
+_MAGIC_NUMBERS = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+
+LINKING_RESOURCES = ['person', 'group', 'institution', 'person-search']
+"""
+Resources in the ``LOOKUP_API_CACHE_TIMEOUTS`` setting whose cached representations may link to
+stored content.
+
+"""
+
+_content_cache = None
+_content_cache_lock = threading.Lock()
+
+
+def store(data):
+    """
+    Store the :py:class:`bytes` object *data* for ``LOOKUP_API_CONTENT_CACHE_TIMEOUT`` seconds and
+    return its digest. Storing data which is already stored extends its lifetime.
+
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    get_content_cache().set(
+        cache.make_key('content', (digest,)), (guess_content_type(data), data),
+        settings.LOOKUP_API_CONTENT_CACHE_TIMEOUT)
+    return digest
+
+
+def load(digest):
+    """
+    Return a (content type, data) tuple for the data with the given digest or None if no such data
+    is stored.
+
+    """
+    return get_content_cache().get(cache.make_key('content', (digest,)))
+
+
+def guess_content_type(data):
+    """
+    Return the MIME type of *data* based on its first few bytes. Lookup's binary attributes are
+    photos and so only common image formats are recognised.
+
+    >>> guess_content_type(b'\\xff\\xd8\\xff\\xe0')
+    'image/jpeg'
+    >>> guess_content_type(b'hello')
+    'application/octet-stream'
+
+    """
+    for magic, content_type in _MAGIC_NUMBERS:
+        if data.startswith(magic):
+            return content_type
+    return 'application/octet-stream'
+
+
+def get_content_cache():
+    """
+    Return the :py:class:`~.cache.ResponseCache` used to store content in this process, creating
+    it if necessary.
+
+    """
+    global _content_cache
+    with _content_cache_lock:
+        if _content_cache is None:
+            _content_cache = cache.ResponseCache(
+                settings.LOOKUP_API_CONTENT_CACHE_MAX_ENTRIES, settings.LOOKUP_API_CACHE_BACKEND)
+        return _content_cache
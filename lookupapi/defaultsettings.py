@@ -35,6 +35,301 @@ are extremely sure in what you are doing, set this to True.
 
 """
 
+LOOKUP_API_CONNECTION_POOL_SIZE = 4
+"""
+Maximum number of idle connections to the proxied Lookup API which are kept open by each worker
+process for re-use by subsequent requests. Set to 0 to disable connection re-use. With threaded or
+gevent workers this should be at least the number of concurrent requests served by each worker.
+
+"""
+
+LOOKUP_API_CONNECTION_POOL_IDLE_TIMEOUT = 60
+"""
+Number of seconds an idle connection to the proxied Lookup API may remain unused before it is
+closed.
+
+"""
+
+LOOKUP_API_EXECUTOR_MAX_WORKERS = 8
+"""
+Maximum number of threads in each worker process which may be used to make concurrent calls to the
+proxied Lookup API. For example, the person search endpoint counts and fetches results
+concurrently. With threaded or gevent workers this should be at least the number of concurrent
+requests served by each worker.
+
+"""
+
+LOOKUP_API_PREFETCH_EXECUTOR_MAX_WORKERS = 2
+"""
+Maximum number of threads in each worker process which may be used to make speculative calls to
+the proxied Lookup API, such as fetching the next page of search results when
+``LOOKUP_API_SEARCH_PREFETCH`` is True. These threads are separate from those bounded by
+``LOOKUP_API_EXECUTOR_MAX_WORKERS`` and so speculative calls queue behind each other rather than
+behind calls made on behalf of requests.
+
+"""
+
+LOOKUP_API_CONCURRENT_TIMEOUT = 30
+"""
+Number of seconds to wait for concurrent calls to the proxied Lookup API to complete before the
+request fails with a 504 Gateway Timeout response.
+
+"""
+
+LOOKUP_API_FAST_SERIALIZERS = True
+"""
+If True, Lookup entities are serialised by the compiled plans in
+:py:mod:`lookupapi.fastserializers` rather than directly by the serializers in
+:py:mod:`lookupapi.serializers`. The output is the same.
+
+"""
+
+LOOKUP_API_STREAMING_RESOURCES = []
+"""
+Names of resources whose JSON responses are streamed to the client rather than rendered in full
+before being sent. Streamed responses have no Content-Length or ETag header and lists of members or
+institutions are serialised one element at a time as they are sent. So that memory use stays flat
+however large the resource, streaming resources are not kept in the response cache whatever
+``LOOKUP_API_CACHE_TIMEOUTS`` says. The resource names are "group", "institution" and
+"institution-list".
+
+"""
+
+LOOKUP_API_STREAMING_CHUNK_SIZE = 65536
+"""
+Approximate number of characters sent in each chunk of a streamed response.
+
+"""
+
+LOOKUP_API_CACHE_TIMEOUTS = {
+    'person': 60,
+    'group': 60,
+    'institution': 300,
+    'person-search': 60,
+    'mock-template': 3600,
+}
+"""
+Number of seconds the serialised representation of a person, group or institution is cached for.
+Keys are resource names and values are timeouts. A missing key or a timeout of 0 disables caching
+for that resource.
+
+The "person-search" resource is a page of person search results requested with a cursor. See
+also ``LOOKUP_API_SEARCH_PREFETCH``. The "mock-template" resource is the test user from which
+people in the "mock" scheme are generated.
+
+"""
+
+LOOKUP_API_CACHE_STALE_TIMEOUTS = {
+    'person': 300,
+    'group': 300,
+    'institution': 3600,
+    'mock-template': 86400,
+}
+"""
+Number of seconds after the timeout given in ``LOOKUP_API_CACHE_TIMEOUTS`` that a cached person,
+group or institution may still be served while a single background request to Lookup refreshes it.
+A missing key or a value of 0 means that expired resources are never served.
+
+"""
+
+LOOKUP_API_CACHE_CONTROL = {}
+"""
+Cache-Control header values for successful responses to GET requests keyed by the URL names in
+:py:mod:`lookupapi.urls`. Responses for URL names which are not present have no Cache-Control
+header unless the view sets one itself. For example, to let a CDN or reverse proxy serve the
+attribute lists for an hour and let clients re-use people for a minute::
+
+    LOOKUP_API_CACHE_CONTROL = {
+        'person-attributes': 'public, max-age=3600',
+        'institution-attributes': 'public, max-age=3600',
+        'person-detail': 'private, max-age=60',
+    }
+
+Responses from endpoints which require an OAuth2 token also have a ``Vary: Authorization`` header.
+The policy is applied by :py:class:`lookupapi.middleware.CacheControlMiddleware` and documented in
+the Swagger schema.
+
+"""
+
+LOOKUP_API_TIMING = False
+"""
+If True, the time taken to authenticate each request, call Lookup, serialise and render the
+response is reported in a ``Server-Timing`` response header and logged at INFO level by the
+``lookupapi.timing`` logger. Timing requires :py:class:`lookupapi.middleware.TimingMiddleware` to
+be installed. Since the header reveals how requests are processed, this is best enabled only while
+investigating performance.
+
+"""
+
+LOOKUP_API_METRICS = False
+"""
+If True, requests, calls to Lookup, caches and the connection pool are measured and the metrics are
+served in the Prometheus text format at the "metrics" URL. Measuring requests requires
+:py:class:`lookupapi.middleware.MetricsMiddleware` to be installed. See :py:mod:`lookupapi.metrics`
+for how metrics from several worker processes are aggregated.
+
+The "metrics" URL is not authenticated and reveals how the server is used. When enabling metrics,
+restrict access to the URL at the ingress or reverse proxy so that only the Prometheus server may
+fetch it.
+
+"""
+
+LOOKUP_API_METRICS_STATS_INTERVAL = 10
+"""
+Minimum number of seconds between updates of the cache and connection pool metrics of each worker
+process by :py:class:`lookupapi.middleware.MetricsMiddleware`. The metrics of the process serving
+the "metrics" URL are always updated.
+
+"""
+
+LOOKUP_API_HEALTH_PATH = '/healthz'
+"""
+Path at which :py:class:`lookupapi.middleware.HealthCheckMiddleware` answers liveness probes. The
+response is returned before any other middleware runs and so does not depend on the Host header,
+sessions, authentication or the database. If None, liveness probes are not answered by the
+middleware.
+
+"""
+
+LOOKUP_API_READINESS_PATH = '/readyz'
+"""
+Path at which :py:class:`lookupapi.middleware.HealthCheckMiddleware` answers readiness probes with
+the report from :py:func:`lookupapi.health.readiness`. If None, readiness probes are not answered
+by the middleware.
+
+"""
+
+LOOKUP_API_UPSTREAM_FAILURE_WINDOW = 30
+"""
+Number of seconds for which a failed call to Lookup, the token introspection endpoint or the shared
+cache backend is reported as making the service unreachable unless a later call succeeds. The
+reachability of these services is reported by readiness probes but does not make the server
+unready. See :py:class:`lookupapi.health.Reachability`.
+
+"""
+
+LOOKUP_API_HEALTH_DETAILS = False
+"""
+If True, readiness reports include the message of the last error from each upstream service and
+the Lookup connection pool counters. Since probes are not authenticated, enable this only if the
+readiness path cannot be reached from outside the cluster.
+
+"""
+
+LOOKUP_API_SEARCH_CURSOR_MAX_AGE = 3600
+"""
+Number of seconds for which a person search cursor is valid. Cursors record the period of this
+many seconds in which they were created, rather than the exact time, and are accepted until the end
+of the following period. The cursor records the total number of results for the search and so the
+count reported when paging with a cursor may be up to twice this old.
+
+"""
+
+LOOKUP_API_SEARCH_PREFETCH = False
+"""
+If True and pages of person search results are cached, the page following any page of results,
+including the first, is fetched from Lookup into the cache in the background. This makes paging
+through results faster at the cost of a further search of Lookup for every page served, including
+pages after which the client stops paging.
+
+"""
+
+LOOKUP_API_BINARY_CONTENT_LINKS = False
+"""
+If True, the binary data of attributes, such as JPEG photos, is not included in responses. Instead,
+each attribute links to an endpoint serving the raw data. See :py:mod:`lookupapi.content`.
+
+The linked data must be available to every worker process and so ``LOOKUP_API_CACHE_BACKEND`` must
+name a cache shared between them. The ``lookupapi.E007`` system check enforces this.
+
+"""
+
+LOOKUP_API_CONTENT_CACHE_TIMEOUT = 86400
+"""
+Number of seconds binary attribute data is stored for after it was last included in a response.
+Since cached responses link to the stored data, this must be longer than the time for which any
+person, group, institution or page of search results is cached, including any stale timeout. The
+``lookupapi.E008`` system check enforces this.
+
+"""
+
+LOOKUP_API_CONTENT_CACHE_MAX_ENTRIES = 256
+"""
+Maximum number of binary attribute values held in memory by each worker process. Values evicted
+from memory continue to be served from the shared ``LOOKUP_API_CACHE_BACKEND`` cache.
+
+"""
+
+LOOKUP_API_CONTENT_CACHE_CONTROL = 'private, max-age=86400, immutable'
+"""
+Value of the Cache-Control header for binary attribute data. Since the data is addressed by its
+digest, it never changes.
+
+"""
+
+LOOKUP_API_CACHE_MAX_ENTRIES = 1024
+"""
+Maximum number of serialised resources held in the in-process cache of each worker process. When
+the cache is full, the least recently used resource is evicted.
+
+"""
+
+LOOKUP_API_CACHE_BACKEND = None
+"""
+Alias of a Django cache from the ``CACHES`` setting used to share cached resources between worker
+processes, for example a Redis or memcached backed cache. If None, only the in-process cache is
+used.
+
+"""
+
+LOOKUP_API_BATCH_MAX_IDENTIFIERS = 1000
+"""
+Maximum number of people which may be requested in a single call to the person batch endpoint.
+
+"""
+
+LOOKUP_API_BATCH_CHUNK_SIZE = 100
+"""
+Maximum number of people requested from the proxied Lookup API in a single call by the person batch
+endpoint. Lookup limits the length of the URL and so this cannot be too large. Chunks are requested
+concurrently.
+
+"""
+
+LOOKUP_API_SNAPSHOT_INTERVALS = {
+    'person-attributes': 3600,
+    'institution-attributes': 3600,
+    'institutions': 3600,
+}
+"""
+Number of seconds after which each in-memory snapshot of rarely changing Lookup data is refreshed
+in the background. Keys are snapshot names. See :py:mod:`~.snapshots`.
+
+"""
+
+LOOKUP_API_SNAPSHOT_PRELOAD = True
+"""
+If True, snapshots are loaded in the background as each worker process starts and readiness
+probes fail until they have been loaded. See :py:func:`~.snapshots.preload` and
+:py:func:`~.health.readiness`.
+
+"""
+
+LOOKUP_API_INSTITUTION_SNAPSHOT = True
+"""
+If True, each worker process holds a snapshot of all institutions known to Lookup. The institution
+list is served from the snapshot and institutions are served from it when the requested fetch
+parameter matches ``LOOKUP_API_INSTITUTION_SNAPSHOT_FETCH``. The snapshot is refreshed according to
+the "institutions" entry in ``LOOKUP_API_SNAPSHOT_INTERVALS``.
+
+"""
+
+LOOKUP_API_INSTITUTION_SNAPSHOT_FETCH = None
+"""
+Fetch parameter used when loading the snapshot of all institutions.
+
+"""
+
 OAUTH2_CLIENT_ID = None
 """
 OAuth2 client id which the API server uses to identify itself to the OAuth2 token introspection
@@ -77,3 +372,45 @@ This applies only to failed DNS lookups, socket connections and connection timeo
 requests where data has made it to the server.
 
 """
+
+OAUTH2_INTROSPECT_CACHE_MAX_TTL = 300
+"""
+Maximum number of seconds the result of introspecting a valid OAuth2 token is cached for. Results
+are never cached beyond the token's expiry time. Set to 0 to disable caching of valid tokens.
+
+"""
+
+OAUTH2_INTROSPECT_CACHE_NEGATIVE_TTL = 30
+"""
+Number of seconds the result of introspecting an invalid OAuth2 token is cached for. Set to 0 to
+disable caching of invalid tokens.
+
+"""
+
+OAUTH2_INTROSPECT_CACHE_MAX_ENTRIES = 4096
+"""
+Maximum number of token introspection results cached by each worker process. When the cache is
+full, the least recently used result is evicted.
+
+"""
+
+OAUTH2_USER_RESOLUTION = 'database'
+"""
+How the subject of a valid OAuth2 token is resolved to a user. One of:
+
+* "database": a database user with the subject as username is fetched, or created, on every
+  request,
+* "cached": as "database" but each worker process caches users for ``OAUTH2_USER_CACHE_TTL``
+  seconds so that most requests do not use the database,
+* "token": the user is a :py:class:`lookupapi.authentication.TokenUser` which is never stored and
+  so requests never use the database.
+
+The views in :py:mod:`lookupapi` only use the username of the user.
+
+"""
+
+OAUTH2_USER_CACHE_TTL = 3600
+"""
+Number of seconds a database user is cached for when ``OAUTH2_USER_RESOLUTION`` is "cached".
+
+"""
@@ -0,0 +1,331 @@
+"""
+A fast path for serialising Lookup entities.
+
+The serializers in :py:mod:`~lookupapi.serializers` describe the API schema and are used to
+generate the API documentation. Serialising a large entity with them is slow, however: each
+request creates nested serializer instances which deep-copy their declared fields, and every value
+of every field passes through several layers of generic attribute lookup and dispatch.
+
+This module compiles each serializer class once into a plan which reads the same attributes and
+converts them in the same way as the serializer's fields but with the per-field decisions taken
+ahead of time. The resulting data renders to the same JSON as that of the corresponding serializer.
+Fields which the plan does not know how to handle more quickly, and values which a fast path cannot
+be sure to treat identically, are passed to the original field.
+
+Data may also be serialised lazily for :py:func:`~lookupapi.responses.streaming_response` in which
+case lists of entities are serialised one entity at a time as they are sent.
+
+Use of the fast path can be disabled by setting ``LOOKUP_API_FAST_SERIALIZERS`` to False.
+
+"""
+import collections.abc
+import functools
+import re
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from rest_framework import fields
+from rest_framework import relations
+from rest_framework import serializers
+
+from . import timing
+
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+# Lookup values which appear in a URL path unchanged. Hyperlinks to other values are constructed
+# by the original field so that quoting and URL resolution are exactly as they would have been.
+_URL_SAFE_VALUE = re.compile(r'^[A-Za-z0-9_-]+$')
+
+_URL_SENTINEL = 'LOOKUPAPIURLKWARG{}'
+
+
+def serialize(serializer_class, instance, context=None, many=False, lazy=False):
+    """
+    Return the same data as ``serializer_class(instance, many=many, context=context).data``. Dicts
+    are used in place of ordered dicts and hyperlinks are plain strings.
+
+    If *lazy* is True, lists of entities are returned as generators which serialise each entity as
+    it is consumed. If *many* is True, this is the returned value itself and otherwise it is those
+    values of the returned dict which are lists of entities.
+
+    The time taken is recorded as the "serialize" metric of the current
+    :py:class:`~lookupapi.timing.Timings` recorder. Lazily serialised entities are serialised as
+    they are sent and so are not included.
+
+    """
+    with timing.timed('serialize'):
+        return _serialize(serializer_class, instance, context, many, lazy)
+
+
+def _serialize(serializer_class, instance, context, many, lazy):
+    if not settings.LOOKUP_API_FAST_SERIALIZERS:
+        return serializer_class(instance, many=many, context=context).data
+
+    plan = get_plan(serializer_class)
+    state = _State({} if context is None else context)
+    if many:
+        items = (plan(item, state) for item in instance)
+        return items if lazy else list(items)
+    if lazy:
+        return plan.lazy(instance, state)
+    return plan(instance, state)
+
+
+def get_plan(serializer_class):
+    """
+    Return a callable which takes an instance and serialisation state and returns the
+    representation of the instance according to *serializer_class*. Plans are compiled once for
+    each serializer class.
+
+    The plan has a ``lazy`` attribute which is a similar callable returning lists of entities as
+    generators.
+
+    """
+    plan = _plans.get(serializer_class)
+    if plan is None:
+        plan = _compile(serializer_class)
+        with _plans_lock:
+            plan = _plans.setdefault(serializer_class, plan)
+    return plan
+
+
+def _compile(serializer_class):
+    if serializer_class.to_representation is not serializers.Serializer.to_representation:
+        # We cannot know what a custom representation does and so use the serializer itself.
+        def plan(instance, state):
+            return serializer_class(instance, context=state.context).data
+        plan.lazy = plan
+        return plan
+
+    readable_fields = [
+        field for field in serializer_class().fields.values() if not field.write_only]
+    steps = [
+        (field.field_name, _make_getter(field), _make_converter(serializer_class, field))
+        for field in readable_fields
+    ]
+    plan = _make_plan(steps)
+
+    # Lists of entities are returned as generators by the lazy plan.
+    plan.lazy = _make_plan([
+        (name, get, _make_lazy_list_converter(field) if isinstance(
+            field, serializers.ListSerializer) else convert)
+        for field, (name, get, convert) in zip(readable_fields, steps)
+    ])
+    return plan
+
+
+def _make_plan(steps):
+    """Return a plan from a sequence of (field name, getter, converter) tuples."""
+    def plan(instance, state):
+        representation = {}
+        for name, get, convert in steps:
+            try:
+                value = get(instance)
+            except fields.SkipField:
+                continue
+            representation[name] = None if value is None else convert(value, state)
+        return representation
+
+    return plan
+
+
+def _make_getter(field):
+    """Return a function equivalent to the field's get_attribute method."""
+    get_attribute = type(field).get_attribute
+    if get_attribute is relations.RelatedField.get_attribute:
+        if field.use_pk_only_optimization():
+            return field.get_attribute
+    elif get_attribute is not fields.Field.get_attribute:
+        # We cannot know what a custom get_attribute method does.
+        return field.get_attribute
+
+    source_attrs = field.source_attrs
+
+    def get(instance):
+        try:
+            return _get_attribute(instance, source_attrs)
+        except (KeyError, AttributeError, ObjectDoesNotExist):
+            # Let the field supply its default, skip itself or raise an appropriate error.
+            return field.get_attribute(instance)
+
+    return get
+
+
+def _get_attribute(instance, attrs):
+    """A version of :py:func:`rest_framework.fields.get_attribute` for the common case."""
+    for attr in attrs:
+        if _is_mapping(type(instance)):
+            instance = instance[attr]
+        else:
+            instance = getattr(instance, attr)
+        if callable(instance) and fields.is_simple_callable(instance):
+            instance = instance()
+    return instance
+
+
+@functools.lru_cache(maxsize=None)
+def _is_mapping(cls):
+    return issubclass(cls, collections.abc.Mapping)
+
+
+def _make_converter(serializer_class, field):
+    """
+    Return a function taking a non-None value and the serialisation state which is equivalent to
+    the field's to_representation method.
+
+    """
+    field_class = type(field)
+
+    if isinstance(field, serializers.ListSerializer):
+        child_class = type(field.child)
+        return lambda value, state: [get_plan(child_class)(item, state) for item in value]
+
+    if isinstance(field, serializers.BaseSerializer):
+        return lambda value, state: get_plan(field_class)(value, state)
+
+    if isinstance(field, relations.HyperlinkedRelatedField):
+        return _make_hyperlink_converter(serializer_class, field)
+
+    if isinstance(field, relations.RelatedField) or isinstance(
+            getattr(field, 'child', None), relations.RelatedField):
+        # Related fields need the serializer context.
+        return lambda value, state: (
+            state.get_field(serializer_class, field.field_name).to_representation(value))
+
+    if field_class.to_representation is fields.CharField.to_representation:
+        return lambda value, state: str(value)
+
+    if field_class.to_representation is fields.IntegerField.to_representation:
+        return lambda value, state: int(value)
+
+    if field_class.to_representation is fields.BooleanField.to_representation:
+        to_representation = field.to_representation
+        return lambda value, state: (
+            value if value is True or value is False else to_representation(value))
+
+    if field_class.to_representation is fields.ListField.to_representation:
+        convert_child = _make_converter(serializer_class, field.child)
+        return lambda value, state: [
+            None if item is None else convert_child(item, state) for item in value]
+
+    if not field_class.__module__.startswith('rest_framework.'):
+        # Fields other than Django REST Framework's own may make use of the serializer context.
+        return lambda value, state: (
+            state.get_field(serializer_class, field.field_name).to_representation(value))
+
+    to_representation = field.to_representation
+    return lambda value, state: to_representation(value)
+
+
+def _make_lazy_list_converter(field):
+    """Return a converter for a list serializer field which returns a generator."""
+    child_class = type(field.child)
+    return lambda value, state: (get_plan(child_class)(item, state) for item in value)
+
+
+def _make_hyperlink_converter(serializer_class, field):
+    """
+    Return a converter for a hyperlink field. Hyperlinks are formed by substituting the lookup
+    values into a URL template constructed once per serialisation by the field's own reverse
+    method.
+
+    Fields may provide a ``get_url_kwargs`` method taking an object and returning the URL keyword
+    arguments for it if they do not use ``lookup_field`` and ``lookup_url_kwarg``.
+
+    """
+    def slow_convert(value, state):
+        return state.get_field(serializer_class, field.field_name).to_representation(value)
+
+    get_url_kwargs = getattr(field, 'get_url_kwargs', None)
+    if get_url_kwargs is None:
+        if type(field).get_url is not relations.HyperlinkedRelatedField.get_url:
+            # We cannot know how a custom get_url method forms its URLs.
+            return slow_convert
+
+        def get_url_kwargs(obj):
+            if hasattr(obj, 'pk'):
+                # The field may decline to link to unsaved objects.
+                raise AttributeError('pk')
+            return {field.lookup_url_kwarg: getattr(obj, field.lookup_field)}
+
+    if field.format is not None:
+        return slow_convert
+
+    def convert(value, state):
+        try:
+            kwargs = get_url_kwargs(value)
+        except AttributeError:
+            return slow_convert(value, state)
+
+        template = state.get_url_template(field, tuple(sorted(kwargs)))
+        if template is None or not all(
+                isinstance(v, str) and _URL_SAFE_VALUE.match(v) for v in kwargs.values()):
+            return slow_convert(value, state)
+
+        return ''.join(
+            kwargs[part] if is_kwarg else part for part, is_kwarg in template)
+
+    return convert
+
+
+class _State:
+    """Per-call state for a serialisation started by :py:func:`serialize`."""
+    def __init__(self, context):
+        self.context = context
+        self._fields = {}
+        self._url_templates = {}
+
+    def get_field(self, serializer_class, field_name):
+        """Return a field of *serializer_class* bound to a serializer with our context."""
+        key = (serializer_class, field_name)
+        field = self._fields.get(key)
+        if field is None:
+            field = self._fields[key] = serializer_class(context=self.context).fields[field_name]
+        return field
+
+    def get_url_template(self, field, kwarg_names):
+        """
+        Return a URL template for *field* as a sequence of (string, is keyword argument) pairs or
+        None if one cannot be constructed.
+
+        """
+        key = (field.view_name, kwarg_names)
+        try:
+            return self._url_templates[key]
+        except KeyError:
+            pass
+
+        template = None
+        request = self.context.get('request')
+        if request is not None:
+            sentinels = {name: _URL_SENTINEL.format(idx) for idx, name in enumerate(kwarg_names)}
+            url = field.reverse(
+                field.view_name, kwargs=sentinels, request=request,
+                format=self.context.get('format'))
+            template = _split_template(url, sentinels)
+
+        self._url_templates[key] = template
+        return template
+
+
+def _split_template(url, sentinels):
+    """
+    Split *url* at each of the sentinel values in the dict *sentinels* and return a list of
+    (string, is keyword argument) pairs or None if any sentinel does not appear exactly once.
+
+    """
+    if any(url.count(sentinel) != 1 for sentinel in sentinels.values()):
+        return None
+
+    template = []
+    positions = sorted((url.index(sentinel), name) for name, sentinel in sentinels.items())
+    start = 0
+    for position, name in positions:
+        template.append((url[start:position], False))
+        template.append((name, True))
+        start = position + len(sentinels[name])
+    template.append((url[start:], False))
+    return template
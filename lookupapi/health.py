@@ -0,0 +1,209 @@
+"""
+Liveness and readiness checks.
+
+The server is ready if its own state allows it to answer requests: its settings are valid and, if
+snapshots are pre-loaded, every snapshot has been loaded. Services shared by every server, such as
+Lookup and the database, are not part of the decision and are not called by the checks. If they
+were, an outage of a shared service would make every server unready at once and turn a brief
+upstream failure into a complete outage. The settings are checked once per process.
+
+The state of the shared services is reported alongside the decision. Calls to Lookup, to the token
+introspection endpoint and to the shared cache backend record whether they succeeded in a
+:py:class:`Reachability` instance and the report is built from these records without calling the
+services. Since probes are not authenticated, error messages and connection pool counters are only
+reported if the ``LOOKUP_API_HEALTH_DETAILS`` setting is True.
+
+The checks are usually answered by :py:class:`~lookupapi.middleware.HealthCheckMiddleware` before
+any other middleware runs. :py:func:`liveness_view` and :py:func:`readiness_view` serve the same
+responses from the URL configuration.
+
+"""
+import contextlib
+import functools
+import json
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+
+class Reachability:
+    """
+    A record of the outcome of the most recent calls to a service. Times are as returned by
+    :py:func:`time.time`. A service is reported as unreachable if a call has failed within the last
+    ``LOOKUP_API_UPSTREAM_FAILURE_WINDOW`` seconds and no call has succeeded since. Failures
+    outside the window are ignored since a server which makes no calls cannot observe a recovery.
+
+    """
+    def __init__(self):
+        self.last_success = None
+        self.last_failure = None
+        self.last_error = None
+
+    def success(self):
+        """Record a successful call."""
+        self.last_success = time.time()
+
+    def failure(self, exception):
+        """Record a call which failed with *exception*."""
+        self.last_error = '{}: {}'.format(type(exception).__name__, exception)
+        self.last_failure = time.time()
+
+    @contextlib.contextmanager
+    def track(self, ignore=()):
+        """
+        Context manager which records the outcome of the call made in its body. Exceptions which
+        are instances of the types in *ignore* show that the service answered and so are recorded
+        as successes.
+
+        """
+        try:
+            yield
+        except ignore:
+            self.success()
+            raise
+        except Exception as e:
+            self.failure(e)
+            raise
+        self.success()
+
+    def tracked(self, ignore=()):
+        """
+        Function or method decorator which records the outcome of each call. See
+        :py:meth:`track`.
+
+        """
+        def decorator(f):
+            @functools.wraps(f)
+            def wrapper(*args, **kwargs):
+                with self.track(ignore):
+                    return f(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def is_reachable(self, now=None):
+        """Return False if the service is considered unreachable."""
+        now = now if now is not None else time.time()
+        last_failure, last_success = self.last_failure, self.last_success
+        window = settings.LOOKUP_API_UPSTREAM_FAILURE_WINDOW
+        if last_failure is None or now - last_failure > window:
+            return True
+        return last_success is not None and last_success >= last_failure
+
+    def report(self, now=None, details=False):
+        """
+        Return a dictionary describing the recorded state for the readiness report. The message of
+        the last error is included only if *details* is True.
+
+        """
+        now = now if now is not None else time.time()
+        last_failure, last_success = self.last_failure, self.last_success
+        report = {
+            'reachable': self.is_reachable(now),
+            'last_success_age': _age(now, last_success),
+            'last_failure_age': _age(now, last_failure),
+        }
+        if details:
+            report['last_error'] = self.last_error if last_failure is not None else None
+        return report
+
+
+lookup = Reachability()
+"""Reachability of Lookup. Lookup error responses count as successes."""
+
+introspection = Reachability()
+"""Reachability of the OAuth2 token introspection endpoint."""
+
+cache_backend = Reachability()
+"""Reachability of the cache given by ``LOOKUP_API_CACHE_BACKEND``."""
+
+
+def readiness():
+    """
+    Return a (ready, report) tuple. The report has a "checks" dictionary with the result of each
+    check of local state, all of which must pass for the server to be ready, and an "upstream"
+    dictionary describing the shared services, which does not affect readiness.
+
+    If snapshots are pre-loaded, a background load is started for any snapshot which has not been
+    loaded, for example because Lookup could not be reached when the worker process started.
+
+    """
+    # Imported here since these modules record their reachability in this one.
+    from . import ibis, snapshots
+
+    details = settings.LOOKUP_API_HEALTH_DETAILS
+    checks = {'settings': {'ok': _settings_ok()}}
+
+    if settings.LOOKUP_API_SNAPSHOT_PRELOAD:
+        loaded = {}
+        for snapshot in snapshots.get_snapshots():
+            loaded[snapshot.name] = snapshot.is_loaded()
+            if not loaded[snapshot.name]:
+                snapshot.load_in_background()
+        checks['snapshots'] = {'ok': all(loaded.values()), 'loaded': loaded}
+
+    now = time.time()
+    upstream = {
+        'lookup': lookup.report(now, details),
+        'introspection': introspection.report(now, details),
+    }
+    if settings.LOOKUP_API_CACHE_BACKEND is not None:
+        upstream['cache_backend'] = cache_backend.report(now, details)
+    if details:
+        upstream['connection_pool'] = ibis.get_pool().stats()
+
+    ready = all(check['ok'] for check in checks.values())
+    return ready, {'checks': checks, 'upstream': upstream}
+
+
+def liveness_response():
+    """Return a response showing that the server is running."""
+    return _json_response(200, {'status': 'ok'})
+
+
+def readiness_response():
+    """
+    Return a response with the :py:func:`readiness` report. The status is 200 if the server is
+    ready and 503 if it is not.
+
+    """
+    ready, report = readiness()
+    return _json_response(200 if ready else 503, dict(
+        report, status='ok' if ready else 'unavailable'))
+
+
+def liveness_view(request):
+    """Django view returning :py:func:`liveness_response`."""
+    return liveness_response()
+
+
+def readiness_view(request):
+    """Django view returning :py:func:`readiness_response`."""
+    return readiness_response()
+
+
+@functools.lru_cache(maxsize=None)
+def _settings_ok():
+    """
+    Return True if the settings pass the lookupapi system checks. The result is cached since the
+    settings do not change while the process runs.
+
+    """
+    # Imported here since the system checks import modules which record their reachability here.
+    from . import systemchecks
+
+    return not any(
+        check(None) for check in (
+            systemchecks.api_credentials_check, systemchecks.user_resolution_check,
+            systemchecks.content_links_check))
+
+
+def _age(now, timestamp):
+    return round(now - timestamp, 3) if timestamp is not None else None
+
+
+def _json_response(status, data):
+    response = HttpResponse(
+        json.dumps(data), status=status, content_type='application/json')
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -2,16 +2,29 @@
 Convenience functions for accessing Ibis (aka "Lookup") APIs.
 
 """
+import concurrent.futures
 import functools
-import inspect
+import os
+import threading
+import types
 from django.conf import settings
 from rest_framework.exceptions import APIException
 from ucamlookup import ibisclient
 
+from . import health
+from . import metrics
+from . import pool
+from . import timing
 
-def get_connection():
+
+_process_state = {}
+_process_state_pid = None
+_process_state_lock = threading.Lock()
+
+
+def create_connection():
     """
-    Return an IbisClientConnection instance based upon the current settings.
+    Return a new IbisClientConnection instance based upon the current settings.
 
     .. seealso:: The :py:mod:`~.defaultsettings` module.
 
@@ -24,17 +37,96 @@ def get_connection():
     )
 
 
+def get_pool():
+    """
+    Return the :py:class:`~.pool.ConnectionPool` for the current process, creating it if
+    necessary. The pool is re-created if the process has forked since it was created so that worker
+    processes never share connections.
+
+    .. seealso:: The ``LOOKUP_API_CONNECTION_POOL_...`` settings in :py:mod:`~.defaultsettings`.
+
+    """
+    return _get_process_local('pool', lambda: pool.ConnectionPool(
+        create_connection,
+        settings.LOOKUP_API_CONNECTION_POOL_SIZE,
+        settings.LOOKUP_API_CONNECTION_POOL_IDLE_TIMEOUT
+    ))
+
+
+def get_executor():
+    """
+    Return the :py:class:`concurrent.futures.ThreadPoolExecutor` used by
+    :py:func:`~.call_concurrently` for the current process, creating it if necessary. The number
+    of worker threads is bounded by the ``LOOKUP_API_EXECUTOR_MAX_WORKERS`` setting.
+
+    """
+    return _get_process_local('executor', lambda: concurrent.futures.ThreadPoolExecutor(
+        max_workers=settings.LOOKUP_API_EXECUTOR_MAX_WORKERS))
+
+
+def get_prefetch_executor():
+    """
+    Return the :py:class:`concurrent.futures.ThreadPoolExecutor` used for speculative background
+    calls to Lookup in the current process, creating it if necessary. It is separate from the
+    executor returned by :py:func:`~.get_executor` so that speculative calls never delay calls made
+    on behalf of a request. The number of worker threads is bounded by the
+    ``LOOKUP_API_PREFETCH_EXECUTOR_MAX_WORKERS`` setting.
+
+    """
+    return _get_process_local('prefetch-executor', lambda: concurrent.futures.ThreadPoolExecutor(
+        max_workers=settings.LOOKUP_API_PREFETCH_EXECUTOR_MAX_WORKERS))
+
+
+def call_concurrently(*calls, timeout=None):
+    """
+    Call each of the passed callables, which take no arguments, concurrently and return a list of
+    their return values in the same order. The first callable is called in the current thread and
+    the remainder are submitted to the executor returned by :py:func:`~.get_executor`.
+
+    Exceptions raised by any callable, such as :py:class:`~.IbisAPIException`, are re-raised in the
+    current thread. If the remaining calls do not complete within *timeout* seconds of the first
+    returning, :py:class:`~.IbisTimeoutException` is raised. If *timeout* is None, the
+    ``LOOKUP_API_CONCURRENT_TIMEOUT`` setting is used.
+
+    """
+    timeout = timeout if timeout is not None else settings.LOOKUP_API_CONCURRENT_TIMEOUT
+    executor = get_executor()
+    futures = [executor.submit(timing.bind(call)) for call in calls[1:]]
+
+    try:
+        results = [calls[0]()]
+        _, not_done = concurrent.futures.wait(futures, timeout=timeout)
+        if len(not_done) > 0:
+            raise IbisTimeoutException()
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+
+    return results + [future.result() for future in futures]
+
+
+def get_connection():
+    """
+    Return an object which may be used in place of an IbisClientConnection. Each call made via the
+    returned object borrows a persistent connection from the pool returned by
+    :py:func:`~.get_pool`.
+
+    """
+    return pool.PooledConnection(get_pool())
+
+
 def get_person_methods(connection=None):
     """
     Return a PersonMethods instance for the specified IbisClientConnection. If the connection is
     None then :py:func:`~.get_connection` is used to get a connection.
 
-    The returned instance has all of its callable attributes decorated with the
-    :py:func:`ibis_exception_wrapper` decorator.
+    The returned instance has all of its callable attributes decorated as described in
+    :py:func:`_decorate_method`.
 
     """
     connection = connection if connection is not None else get_connection()
-    return _decorate_methods(ibisclient.PersonMethods(connection), ibis_exception_wrapper)
+    return _wrap_methods(ibisclient.PersonMethods(connection))
 
 
 def get_group_methods(connection=None):
@@ -42,12 +134,12 @@ def get_group_methods(connection=None):
     Return a GroupMethods instance for the specified IbisClientConnection. If the connection is
     None then :py:func:`~.get_connection` is used to get a connection.
 
-    The returned instance has all of its callable attributes decorated with the
-    :py:func:`ibis_exception_wrapper` decorator.
+    The returned instance has all of its callable attributes decorated as described in
+    :py:func:`_decorate_method`.
 
     """
     connection = connection if connection is not None else get_connection()
-    return _decorate_methods(ibisclient.GroupMethods(connection), ibis_exception_wrapper)
+    return _wrap_methods(ibisclient.GroupMethods(connection))
 
 
 def get_institution_methods(connection=None):
@@ -55,12 +147,12 @@ def get_institution_methods(connection=None):
     Return a InstitutionMethods instance for the specified IbisClientConnection. If the connection
     is None then :py:func:`~.get_connection` is used to get a connection.
 
-    The returned instance has all of its callable attributes decorated with the
-    :py:func:`ibis_exception_wrapper` decorator.
+    The returned instance has all of its callable attributes decorated as described in
+    :py:func:`_decorate_method`.
 
     """
     connection = connection if connection is not None else get_connection()
-    return _decorate_methods(ibisclient.InstitutionMethods(connection), ibis_exception_wrapper)
+    return _wrap_methods(ibisclient.InstitutionMethods(connection))
 
 
 class IbisAPIException(APIException):
@@ -79,10 +171,22 @@ class IbisAPIException(APIException):
         details['details'] = self.error.details
 
 
+class IbisTimeoutException(APIException):
+    """
+    A Django REST Framework :py:class:`APIException` sub-class raised when concurrent calls to
+    Lookup take too long to complete.
+
+    """
+    status_code = 504
+    default_detail = 'Timed out waiting for a response from Lookup.'
+    default_code = 'lookup_timeout'
+
+
 def ibis_exception_wrapper(f):
     """
     Function or method decorator which intercepts :py:class:`IbisException` errors and re-raises
-    them as :py:class:`~.IbisAPIException` instances.
+    them as :py:class:`~.IbisAPIException` instances. Errors are counted by code in
+    :py:data:`~.metrics.LOOKUP_ERRORS`.
 
     """
     @functools.wraps(f)
@@ -90,16 +194,81 @@ def ibis_exception_wrapper(f):
         try:
             return f(*args, **kwargs)
         except ibisclient.IbisException as e:
-            raise IbisAPIException(e)
+            exception = IbisAPIException(e)
+            metrics.LOOKUP_ERRORS.labels(exception.code).inc()
+            raise exception
     return wrapper
 
 
-def _decorate_methods(obj, decorator):
+def _decorate_method(f):
+    """
+    Decorate an ibisclient method with :py:func:`ibis_exception_wrapper` and record the time taken
+    by each call as the "lookup" metric of the current :py:class:`~.timing.Timings` recorder and
+    in :py:data:`~.metrics.LOOKUP_CALL_DURATION`. The outcome of each call is recorded in
+    :py:data:`~.health.lookup`. Lookup error responses show that Lookup is reachable.
+
+    """
+    tracked = health.lookup.tracked(ignore=(ibisclient.IbisException,))(f)
+    decorated = metrics.observe_lookup_call(f.__name__)(ibis_exception_wrapper(tracked))
+    return timing.timed_function('lookup', f.__name__)(decorated)
+
+
+def _get_process_local(name, factory):
     """
-    Inspect a live Python object and decorate all of its methods with the passed decorator. Return
-    the decorated object.
+    Return the object named *name* for the current process, calling *factory* to create it if
+    necessary. All such objects are forgotten when the process forks.
 
     """
-    for name, value in inspect.getmembers(obj, inspect.ismethod):
-        setattr(obj, name, decorator(value))
+    global _process_state_pid
+    pid = os.getpid()
+    with _process_state_lock:
+        if _process_state_pid != pid:
+            _process_state.clear()
+            _process_state_pid = pid
+        try:
+            return _process_state[name]
+        except KeyError:
+            value = _process_state[name] = factory()
+            return value
+
+
+def _wrap_methods(obj):
+    """
+    Change the class of a live Python object to a sub-class of its class whose methods are
+    decorated with :py:func:`~._decorate_method`. Return the object.
+
+    Wrapped classes are created once per class and re-used so that the cost per object is a
+    dictionary lookup rather than inspecting and decorating each method.
+
+    """
+    cls = type(obj)
+    wrapped_cls = _wrapped_classes.get(cls)
+    if wrapped_cls is None:
+        wrapped_cls = _wrapped_classes[cls] = _make_wrapped_class(cls, _decorate_method)
+    obj.__class__ = wrapped_cls
     return obj
+
+
+def _make_wrapped_class(cls, decorator):
+    """
+    Return a sub-class of *cls* where all public and private methods, but not special methods, are
+    decorated with the passed decorator.
+
+    """
+    namespace, seen = {}, set()
+    for klass in cls.__mro__:
+        for name, value in vars(klass).items():
+            if name in seen:
+                continue
+            seen.add(name)
+            if isinstance(value, types.FunctionType) and not name.startswith('__'):
+                namespace[name] = decorator(value)
+    namespace.update({'__module__': cls.__module__, '__qualname__': cls.__qualname__})
+    return type(cls.__name__, (cls,), namespace)
+
+
+# Wrapped classes keyed by the class they wrap. The ibisclient classes are wrapped at import time.
+_wrapped_classes = {
+    cls: _make_wrapped_class(cls, _decorate_method)
+    for cls in (ibisclient.PersonMethods, ibisclient.GroupMethods, ibisclient.InstitutionMethods)
+}
@@ -2,13 +2,18 @@
 Extensions to `drf-yasg <https://drf-yasg.readthedocs.io/>`_.
 
 """
+from django.urls import Resolver404, resolve
+from drf_yasg import openapi
 from drf_yasg.inspectors import SwaggerAutoSchema as BaseSwaggerAutoSchema
 
+from .middleware import get_cache_control_policy
+
 
 class SwaggerAutoSchema(BaseSwaggerAutoSchema):
     """
     An extension to the :py:class:`drf_yasg.inspectors.SwaggerAutoSchema` class which knows about a
-    few more Operation properties.
+    few more Operation properties. Successful responses document the Cache-Control and Vary
+    headers added by :py:class:`~lookupapi.middleware.CacheControlMiddleware`.
 
     """
 
@@ -25,4 +30,27 @@ class SwaggerAutoSchema(BaseSwaggerAutoSchema):
             value = self.overrides.get('operation_' + key)
             if value is not None:
                 operation[key] = value
+        self.add_cache_control_headers(operation)
         return operation
+
+    def add_cache_control_headers(self, operation):
+        """Document any Cache-Control policy for this operation's URL in its 2xx responses."""
+        if self.method not in ('GET', 'HEAD'):
+            return
+        try:
+            url_name = resolve(self.path).url_name
+        except Resolver404:
+            return
+        policy = get_cache_control_policy(url_name, type(self.view))
+        if policy is None:
+            return
+
+        cache_control, vary = policy
+        headers = {'Cache-Control': openapi.SwaggerDict(
+            type=openapi.TYPE_STRING, description='Always "{}".'.format(cache_control))}
+        if len(vary) > 0:
+            headers['Vary'] = openapi.SwaggerDict(
+                type=openapi.TYPE_STRING, description='Includes "{}".'.format(', '.join(vary)))
+        for status, response in operation['responses'].items():
+            if str(status).startswith('2'):
+                response['headers'] = headers
@@ -0,0 +1,180 @@
+"""
+Prometheus metrics for :py:mod:`lookupapi`.
+
+Requests are counted and timed by :py:class:`~lookupapi.middleware.MetricsMiddleware` and calls to
+Lookup made via :py:mod:`~lookupapi.ibis` are timed and their errors counted as they happen. The
+counters kept by the response, content and token introspection caches and by the Lookup connection
+pool are copied into Prometheus metrics by :py:func:`update_stats`. Metrics are exported in the
+Prometheus text format by :py:func:`metrics_view` if the ``LOOKUP_API_METRICS`` setting is True.
+The view is not authenticated and so access to it should be restricted at the ingress.
+
+When lookupproxy is served by several worker processes, each process has its own metrics. Set the
+``PROMETHEUS_MULTIPROC_DIR`` environment variable to an empty directory before the server starts
+for the metrics of all worker processes to be aggregated. See the `prometheus_client documentation
+<https://github.com/prometheus/client_python#multiprocess-mode-eg-gunicorn>`_.
+
+Cache hit ratios may be computed from the ``lookupproxy_cache_events_total`` counter. For
+example::
+
+    sum by (cache) (rate(lookupproxy_cache_events_total{event="hits"}[5m]))
+    / sum by (cache) (rate(lookupproxy_cache_events_total{event=~"hits|stale_hits|misses"}[5m]))
+
+"""
+import functools
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+    multiprocess)
+
+
+REQUESTS = Counter(
+    'lookupproxy_requests_total', 'Requests by URL name, method and status code.',
+    ['url_name', 'method', 'status'])
+
+REQUEST_DURATION = Histogram(
+    'lookupproxy_request_duration_seconds', 'Time taken to answer requests by URL name.',
+    ['url_name'])
+
+LOOKUP_CALL_DURATION = Histogram(
+    'lookupproxy_lookup_call_duration_seconds', 'Time taken by calls to Lookup by method.',
+    ['method'])
+
+LOOKUP_ERRORS = Counter(
+    'lookupproxy_lookup_errors_total', 'Errors returned by Lookup by error code.', ['code'])
+
+CACHE_EVENTS = Counter(
+    'lookupproxy_cache_events_total', 'Cache hits, misses and other events by cache.',
+    ['cache', 'event'])
+
+CACHE_ENTRIES = Gauge(
+    'lookupproxy_cache_entries', 'Entries held in memory by cache.', ['cache'],
+    multiprocess_mode='livesum')
+
+POOL_EVENTS = Counter(
+    'lookupproxy_connection_pool_events_total', 'Lookup connection pool events.', ['event'])
+
+POOL_CONNECTIONS = Gauge(
+    'lookupproxy_connection_pool_connections', 'Connections to Lookup by state.', ['state'],
+    multiprocess_mode='livesum')
+
+_last_stats = {}
+_last_stats_pid = None
+_last_update = None
+_stats_lock = threading.Lock()
+
+
+def observe_lookup_call(method):
+    """
+    Function or method decorator which records the time taken by each call to the decorated
+    function in :py:data:`LOOKUP_CALL_DURATION` with the label *method*.
+
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            start = time.monotonic()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                LOOKUP_CALL_DURATION.labels(method).observe(time.monotonic() - start)
+        return wrapper
+    return decorator
+
+
+def update_stats(min_interval=0):
+    """
+    Copy the counters of the caches and connection pool of the current process into Prometheus
+    metrics. If the metrics were updated less than *min_interval* seconds ago, do nothing.
+
+    """
+    global _last_stats_pid, _last_update
+    # Imported here since these modules record metrics themselves.
+    from . import authentication, cache, content, ibis
+
+    with _stats_lock:
+        now = time.monotonic()
+        pid = os.getpid()
+        if _last_stats_pid != pid:
+            _last_stats.clear()
+            _last_stats_pid, _last_update = pid, None
+        if _last_update is not None and now - _last_update < min_interval:
+            return
+        _last_update = now
+
+        caches = [
+            ('response', cache.get_response_cache().stats()),
+            ('content', content.get_content_cache().stats()),
+            ('introspection', authentication.get_introspection_cache().stats()),
+        ]
+        for name, stats in caches:
+            CACHE_ENTRIES.labels(name).set(stats.pop('entries'))
+            stats.pop('max_entries')
+            stats.pop('in_flight', None)
+            for event, value in stats.items():
+                _increment(CACHE_EVENTS.labels(name, event), ('cache', name, event), value)
+
+        stats = ibis.get_pool().stats()
+        POOL_CONNECTIONS.labels('idle').set(stats['idle'])
+        POOL_CONNECTIONS.labels('in_use').set(stats['in_use'])
+        for event in ibis.pool.ConnectionPool.counter_names:
+            _increment(POOL_EVENTS.labels(event), ('pool', event), stats[event])
+
+
+def metrics_view(request):
+    """
+    Django view which returns the metrics in the Prometheus text format. The cache and connection
+    pool metrics of the current process are updated first. Returns a 404 response if the
+    ``LOOKUP_API_METRICS`` setting is False.
+
+    """
+    if not settings.LOOKUP_API_METRICS:
+        raise Http404
+    update_stats()
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+def get_registry():
+    """
+    Return the registry whose metrics are exported. In multiprocess mode this is a new registry
+    collecting the metrics of all processes.
+
+    """
+    if not _multiprocess_dir():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def mark_process_dead(pid):
+    """
+    Remove the live gauge values of the exited worker process *pid* in multiprocess mode. Called
+    from gunicorn's ``child_exit`` server hook.
+
+    """
+    if _multiprocess_dir():
+        multiprocess.mark_process_dead(pid)
+
+
+def _multiprocess_dir():
+    # Older versions of prometheus_client only recognise the lower-case variable.
+    return (
+        os.environ.get('PROMETHEUS_MULTIPROC_DIR') or os.environ.get('prometheus_multiproc_dir'))
+
+
+def _increment(counter, key, value):
+    """
+    Increment *counter* by the amount the per-process counter *value* identified by *key* has
+    increased since the last call. If *value* has decreased, the per-process counter was reset.
+
+    """
+    last = _last_stats.get(key, 0)
+    _last_stats[key] = value
+    delta = value - last if value >= last else value
+    if delta > 0:
+        counter.inc(delta)
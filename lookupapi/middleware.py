@@ -0,0 +1,142 @@
+"""
+Middleware for :py:mod:`lookupapi`.
+
+"""
+import time
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from . import health
+from . import metrics
+from . import timing
+from .authentication import OAuth2TokenAuthentication
+
+
+CACHEABLE_STATUS_CODES = {200, 304}
+"""Status codes of responses to which a Cache-Control policy is applied."""
+
+
+def get_cache_control_policy(url_name, view_class):
+    """
+    Return a (Cache-Control header value, Vary header names) tuple for responses from the view
+    class *view_class* routed by the URL named *url_name*, or None if the
+    ``LOOKUP_API_CACHE_CONTROL`` setting has no policy for the URL.
+
+    Responses from views which authenticate the client with an OAuth2 token vary by the
+    Authorization header so that shared caches do not return them for other tokens.
+
+    """
+    cache_control = settings.LOOKUP_API_CACHE_CONTROL.get(url_name)
+    if cache_control is None:
+        return None
+    vary = []
+    if any(issubclass(authentication_class, OAuth2TokenAuthentication)
+           for authentication_class in getattr(view_class, 'authentication_classes', ())):
+        vary.append('Authorization')
+    return cache_control, vary
+
+
+class CacheControlMiddleware:
+    """
+    Middleware which adds Cache-Control and Vary headers to successful responses to GET and HEAD
+    requests according to the ``LOOKUP_API_CACHE_CONTROL`` setting. See
+    :py:func:`get_cache_control_policy`. Responses which already have a Cache-Control header are
+    left unchanged.
+
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        if (match is None or request.method not in ('GET', 'HEAD') or
+                response.status_code not in CACHEABLE_STATUS_CODES or
+                response.has_header('Cache-Control')):
+            return response
+
+        policy = get_cache_control_policy(match.url_name, getattr(match.func, 'cls', None))
+        if policy is not None:
+            cache_control, vary = policy
+            response['Cache-Control'] = cache_control
+            patch_vary_headers(response, vary)
+
+        return response
+
+
+class TimingMiddleware:
+    """
+    Middleware which, if the ``LOOKUP_API_TIMING`` setting is True, records the time taken by the
+    work done to answer each request in a :py:class:`~.timing.Timings` recorder. The timings are
+    reported in a ``Server-Timing`` header and logged. See :py:mod:`~.timing`.
+
+    This middleware should be placed first so that the reported total includes all other
+    middleware.
+
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.LOOKUP_API_TIMING:
+            return self.get_response(request)
+
+        with timing.activate(timing.Timings()) as timings:
+            response = self.get_response(request)
+        total = timings.elapsed()
+
+        response['Server-Timing'] = timings.server_timing(total)
+        timing.log(request, response, timings, total)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Middleware which, if the ``LOOKUP_API_METRICS`` setting is True, counts and times requests by
+    URL name in :py:data:`~.metrics.REQUESTS` and :py:data:`~.metrics.REQUEST_DURATION`. Requests
+    for URLs which do not resolve have an empty URL name. The cache and connection pool metrics of
+    the worker process are updated at most every ``LOOKUP_API_METRICS_STATS_INTERVAL`` seconds.
+
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.LOOKUP_API_METRICS:
+            return self.get_response(request)
+
+        start = time.monotonic()
+        response = self.get_response(request)
+        duration = time.monotonic() - start
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.url_name if match is not None and match.url_name is not None else ''
+        metrics.REQUESTS.labels(url_name, request.method, response.status_code).inc()
+        metrics.REQUEST_DURATION.labels(url_name).observe(duration)
+        metrics.update_stats(settings.LOOKUP_API_METRICS_STATS_INTERVAL)
+        return response
+
+
+class HealthCheckMiddleware:
+    """
+    Middleware which answers GET and HEAD requests for the ``LOOKUP_API_HEALTH_PATH`` and
+    ``LOOKUP_API_READINESS_PATH`` paths with :py:func:`~.health.liveness_response` and
+    :py:func:`~.health.readiness_response` respectively. Other requests are passed on unchanged.
+
+    This middleware should be placed first so that probes are answered without running any other
+    middleware, resolving the URL or checking the Host header against ``ALLOWED_HOSTS``.
+
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD'):
+            path = request.path_info
+            if path == settings.LOOKUP_API_HEALTH_PATH:
+                return health.liveness_response()
+            if path == settings.LOOKUP_API_READINESS_PATH:
+                return health.readiness_response()
+        return self.get_response(request)
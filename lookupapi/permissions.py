@@ -5,11 +5,55 @@ OAuth2 token-based permissions for Django REST Framework views.
 from rest_framework import permissions
 
 
+_requirements = {}
+
+
+class AllOf:
+    """
+    A scope expression which requires all of the scopes or scope expressions passed to the
+    constructor. A list of scopes is equivalent to an :py:class:`AllOf` expression.
+
+    """
+    def __init__(self, *requirements):
+        self.requirements = requirements
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(map(repr, self.requirements)))
+
+    def compile(self):
+        """
+        Return a callable which takes a frozenset of granted scopes and returns True if they
+        satisfy this expression.
+
+        """
+        scopes, others = _split_requirements(self.requirements)
+        if len(others) == 0:
+            return scopes.issubset
+        return lambda granted: scopes <= granted and all(other(granted) for other in others)
+
+
+class AnyOf(AllOf):
+    """
+    A scope expression which requires at least one of the scopes or scope expressions passed to
+    the constructor.
+
+    """
+    def compile(self):
+        scopes, others = _split_requirements(self.requirements)
+        if len(others) == 0:
+            return lambda granted: not scopes.isdisjoint(granted)
+        return lambda granted: (
+            not scopes.isdisjoint(granted) or any(other(granted) for other in others))
+
+
 class HasScopesPermission(permissions.BasePermission):
     """
-    Django REST framework permission which requires that the scopes granted to an OAuth2 token are
-    a superset of those required for the view. The requires scopes are specified by the
-    :py:attr:`required_scopes` attribute of the view class.
+    Django REST framework permission which requires that the scopes granted to an OAuth2 token
+    satisfy those required for the view. The required scopes are specified by the
+    :py:attr:`required_scopes` attribute of the view class which is a list of scopes which are all
+    required or a scope expression such as ``['lookup:anonymous', AnyOf('a', 'b')]``.
+
+    The required scopes are compiled once per view class by :py:func:`get_requirement`.
 
     """
     def has_permission(self, request, view):
@@ -20,7 +64,65 @@ class HasScopesPermission(permissions.BasePermission):
         if not isinstance(token, dict):
             return False
 
-        granted_scopes = set(token.get('scope', '').split(' '))
-        required_scopes = set(view.required_scopes)
+        return get_requirement(view)(get_granted_scopes(token))
+
+
+def compile_scopes(requirement):
+    """
+    Return a callable which takes a frozenset of granted scopes and returns True if they satisfy
+    *requirement*. The requirement is a scope, a list of requirements which are all required or an
+    :py:class:`AllOf` or :py:class:`AnyOf` expression.
 
-        return required_scopes <= granted_scopes
+    """
+    if isinstance(requirement, str):
+        requirement = AllOf(requirement)
+    elif not isinstance(requirement, AllOf):
+        requirement = AllOf(*requirement)
+    return requirement.compile()
+
+
+def get_requirement(view):
+    """
+    Return the compiled :py:attr:`required_scopes` of *view*. The result is cached per view class
+    unless the view instance has its own required scopes, for example passed to ``as_view()``.
+
+    """
+    if 'required_scopes' in vars(view):
+        return compile_scopes(view.required_scopes)
+    view_class = type(view)
+    requirement = _requirements.get(view_class)
+    if requirement is None:
+        requirement = _requirements[view_class] = compile_scopes(view_class.required_scopes)
+    return requirement
+
+
+def get_granted_scopes(token):
+    """
+    Return a frozenset of the scopes granted to the introspected token *token*. Tokens returned by
+    :py:class:`~lookupapi.authentication.OAuth2TokenAuthentication` carry their parsed scopes so
+    that they are parsed once per cached introspection result.
+
+    """
+    granted_scopes = getattr(token, 'granted_scopes', None)
+    if granted_scopes is None:
+        granted_scopes = parse_scopes(token.get('scope', ''))
+    return granted_scopes
+
+
+def parse_scopes(scope):
+    """Return a frozenset of the scopes in the space separated *scope* string."""
+    return frozenset(scope.split())
+
+
+def _split_requirements(requirements):
+    """
+    Return a frozenset of the scopes in *requirements* and a tuple of the compiled remaining
+    requirements.
+
+    """
+    scopes = frozenset(
+        requirement for requirement in requirements if isinstance(requirement, str))
+    others = tuple(
+        compile_scopes(requirement) for requirement in requirements
+        if not isinstance(requirement, str))
+    return scopes, others
@@ -0,0 +1,164 @@
+"""
+A pool of persistent connections to the Lookup API.
+
+Creating a new :py:class:`ibisclient.IbisClientConnection` for every call means a new TCP and TLS
+handshake with Lookup for every proxied request. A :py:class:`ConnectionPool` keeps a small number
+of idle connections around so that subsequent calls may re-use them. The pool used by
+:py:func:`lookupapi.ibis.get_connection` is created lazily once per worker process.
+
+"""
+import collections
+import contextlib
+import threading
+import time
+
+
+class ConnectionPool:
+    """
+    A pool of re-usable connections. Connections are created by calling *factory* with no
+    arguments. At most *max_size* idle connections are retained and idle connections which have
+    not been used for more than *idle_timeout* seconds are evicted when the pool is next used.
+
+    A connection which raised an exception while it was borrowed is assumed to be unhealthy and is
+    discarded rather than being returned to the pool.
+
+    The pool maintains the following counters which are returned by :py:meth:`stats`:
+
+    * ``hits``: number of times an idle connection was re-used,
+    * ``misses``: number of times no idle connection was available,
+    * ``handshakes``: number of new connections created,
+    * ``evictions``: number of idle connections closed because they timed out or the pool was full,
+    * ``discards``: number of unhealthy connections closed.
+
+    """
+    counter_names = ['hits', 'misses', 'handshakes', 'evictions', 'discards']
+
+    def __init__(self, factory, max_size, idle_timeout):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+
+        # Idle connections as (connection, last used time) tuples. The most recently used
+        # connection is at the right.
+        self._idle = collections.deque()
+        self._in_use = 0
+        self._counters = {name: 0 for name in self.counter_names}
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Return a connection from the pool, creating a new one if no healthy idle connection is
+        available. The connection should be returned to the pool via :py:meth:`release`.
+
+        """
+        to_close = []
+        with self._lock:
+            # Evict stale connections from the least recently used end of the queue.
+            now = time.monotonic()
+            while len(self._idle) > 0 and now - self._idle[0][1] > self.idle_timeout:
+                to_close.append(self._idle.popleft()[0])
+                self._counters['evictions'] += 1
+
+            self._in_use += 1
+            if len(self._idle) > 0:
+                self._counters['hits'] += 1
+                connection = self._idle.pop()[0]
+            else:
+                self._counters['misses'] += 1
+                connection = None
+
+        for stale_connection in to_close:
+            _close(stale_connection)
+
+        if connection is not None:
+            return connection
+
+        try:
+            connection = self.factory()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+            raise
+
+        with self._lock:
+            self._counters['handshakes'] += 1
+
+        return connection
+
+    def release(self, connection, healthy=True):
+        """
+        Return a connection acquired via :py:meth:`acquire` to the pool. If *healthy* is False, the
+        connection is closed and discarded.
+
+        """
+        with self._lock:
+            self._in_use -= 1
+            if healthy and len(self._idle) < self.max_size:
+                self._idle.append((connection, time.monotonic()))
+                return
+            self._counters['discards' if not healthy else 'evictions'] += 1
+
+        _close(connection)
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+        Context manager which acquires a connection from the pool and releases it on exit. If the
+        body of the context raises an exception, the connection is discarded.
+
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        except Exception:
+            self.release(connection, healthy=False)
+            raise
+        self.release(connection)
+
+    def clear(self):
+        """Close and remove all idle connections."""
+        with self._lock:
+            to_close = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        for connection in to_close:
+            _close(connection)
+
+    def stats(self):
+        """
+        Return a dictionary of counters for this pool along with the current number of idle and
+        in-use connections.
+
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update({
+                'idle': len(self._idle), 'in_use': self._in_use, 'max_size': self.max_size,
+            })
+        return stats
+
+
+class PooledConnection:
+    """
+    A stand-in for :py:class:`ibisclient.IbisClientConnection` which borrows a connection from a
+    :py:class:`ConnectionPool` for the duration of each call to :py:meth:`invoke_method`. The
+    ``*Methods`` classes from :py:mod:`ibisclient` only ever call :py:meth:`invoke_method` on their
+    connection and so an instance of this class can be passed to them directly.
+
+    """
+    def __init__(self, pool):
+        self.pool = pool
+
+    def invoke_method(self, *args, **kwargs):
+        with self.pool.connection() as connection:
+            return connection.invoke_method(*args, **kwargs)
+
+
+def _close(connection):
+    """
+    Close any underlying HTTP session held by a connection. Older versions of ibisclient open a new
+    HTTP connection per call and so have nothing to close.
+
+    """
+    session = getattr(connection, 'session', None)
+    if session is not None:
+        session.close()
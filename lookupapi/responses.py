@@ -0,0 +1,165 @@
+"""
+Helpers for constructing HTTP responses from pre-rendered representations and for streaming large
+representations.
+
+"""
+import collections
+import hashlib
+import types
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import JSONRenderer
+
+from . import timing
+
+
+Prerendered = collections.namedtuple('Prerendered', 'body etag')
+Prerendered.__doc__ = """
+A rendered JSON document. The *body* is a :py:class:`bytes` object and the *etag* is a quoted,
+strong entity tag for the body.
+
+"""
+
+Representation = collections.namedtuple('Representation', 'data prerendered')
+Representation.__doc__ = """
+A serialised representation of a resource as stored in the response cache. The *data* is the
+serialised representation and *prerendered* is a :py:class:`Prerendered` rendering of it or None if
+it has not been rendered.
+
+"""
+
+
+def prerender(data):
+    """
+    Render *data* to JSON in the same way that the default Django REST Framework renderer does and
+    return a :py:class:`Prerendered` instance. The time taken is recorded as the "render" metric of
+    the current :py:class:`~.timing.Timings` recorder.
+
+    """
+    with timing.timed('render'):
+        body = JSONRenderer().render(data)
+    return Prerendered(body=body, etag=make_etag(body))
+
+
+def make_etag(body):
+    """Return a quoted, strong entity tag for the :py:class:`bytes` object *body*."""
+    return '"{}"'.format(hashlib.sha1(body).hexdigest())
+
+
+def prerendered_response(request, prerendered, content_type='application/json'):
+    """
+    Return a response for the :py:class:`Prerendered` document *prerendered* with the given content
+    type. If the request has a matching ``If-None-Match`` header, a 304 Not Modified response is
+    returned instead.
+
+    """
+    response = get_conditional_response(request, etag=prerendered.etag)
+    if response is None:
+        response = HttpResponse(prerendered.body, content_type=content_type)
+    response['ETag'] = prerendered.etag
+    return response
+
+
+def content_response(request, etag, cache_control, get_content):
+    """
+    Return a response with the given entity tag and Cache-Control header. If the request has a
+    matching ``If-None-Match`` header, a 304 Not Modified response is returned. Otherwise
+    *get_content* is called with no arguments and should return a (content type, body) tuple for
+    the response.
+
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        content_type, body = get_content()
+        response = HttpResponse(body, content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def renders_compact_json(request):
+    """
+    Return True if the response to the Django REST Framework request *request* would be rendered
+    by :py:class:`rest_framework.renderers.JSONRenderer` without indentation and so may be
+    replaced by a :py:func:`prerendered_response` or a :py:func:`streaming_response`.
+
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    if type(renderer) is not JSONRenderer:
+        return False
+    return renderer.get_indent(request.accepted_media_type, {}) is None
+
+
+def streaming_response(data):
+    """
+    Return a streaming response rendering *data* to the same JSON as the default Django REST
+    Framework renderer. Lists, and generators, which are either *data* itself or values in a *data*
+    dictionary are rendered element by element so that the complete document is never held in
+    memory. Generators are consumed as the response is sent.
+
+    The response is sent in chunks of approximately ``LOOKUP_API_STREAMING_CHUNK_SIZE``
+    characters.
+
+    """
+    return StreamingHttpResponse(
+        _iter_chunks(iter_json(data), settings.LOOKUP_API_STREAMING_CHUNK_SIZE),
+        content_type='application/json')
+
+
+def iter_json(data):
+    """
+    Yield strings which, when joined, are the JSON document for *data* as rendered by the default
+    Django REST Framework renderer before encoding. See :py:func:`streaming_response`.
+
+    """
+    renderer = JSONRenderer()
+    encode = renderer.encoder_class(
+        ensure_ascii=renderer.ensure_ascii, allow_nan=not renderer.strict,
+        separators=SHORT_SEPARATORS if renderer.compact else LONG_SEPARATORS).encode
+    item_separator, key_separator = SHORT_SEPARATORS if renderer.compact else LONG_SEPARATORS
+
+    if not isinstance(data, dict):
+        yield from _iter_json_value(data, encode, item_separator)
+        return
+
+    yield '{'
+    for idx, (key, value) in enumerate(data.items()):
+        yield '{}{}{}'.format(item_separator if idx > 0 else '', encode(key), key_separator)
+        yield from _iter_json_value(value, encode, item_separator)
+    yield '}'
+
+
+def _iter_json_value(value, encode, item_separator):
+    if not isinstance(value, (list, tuple, types.GeneratorType)):
+        yield encode(value)
+        return
+
+    yield '['
+    for idx, item in enumerate(value):
+        yield item_separator + encode(item) if idx > 0 else encode(item)
+    yield ']'
+
+
+def _iter_chunks(strings, chunk_size):
+    """
+    Join the strings yielded by *strings* into chunks of at least *chunk_size* characters, apart
+    from the last, and yield them encoded as the default Django REST Framework renderer would.
+
+    """
+    buffer, size = [], 0
+    for string in strings:
+        buffer.append(string)
+        size += len(string)
+        if size >= chunk_size:
+            yield _encode(''.join(buffer))
+            buffer, size = [], 0
+    if len(buffer) > 0:
+        yield _encode(''.join(buffer))
+
+
+def _encode(string):
+    # See rest_framework.renderers.JSONRenderer.render.
+    return string.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode('utf-8')
@@ -3,12 +3,24 @@ Django REST framework "serializers" for Lookup object.
 
 """
 import base64
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework.reverse import reverse
 
+from . import content
+
 
 class Base64Field(serializers.Field):
-    """Serialises binary data as base64."""
+    """
+    Serialises binary data as base64. If the ``LOOKUP_API_BINARY_CONTENT_LINKS`` setting is True,
+    the data is serialised as null. See :py:class:`ContentLinkField`.
+
+    """
+    def get_attribute(self, instance):
+        if settings.LOOKUP_API_BINARY_CONTENT_LINKS:
+            return None
+        return super().get_attribute(instance)
+
     def to_representation(self, obj):
         return base64.b64encode(obj)
 
@@ -16,6 +28,28 @@ class Base64Field(serializers.Field):
         return base64.b64decode(data)
 
 
+class ContentLinkField(serializers.URLField):
+    """
+    Serialises binary data as a link to the content endpoint if the
+    ``LOOKUP_API_BINARY_CONTENT_LINKS`` setting is True and otherwise as null. The data is stored
+    by :py:func:`lookupapi.content.store` so that the content endpoint can serve it.
+
+    """
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        if not settings.LOOKUP_API_BINARY_CONTENT_LINKS:
+            return None
+        return super().get_attribute(instance)
+
+    def to_representation(self, obj):
+        return reverse(
+            'attribute-content', kwargs={'digest': content.store(obj)},
+            request=self.context.get('request'))
+
+
 class FetchParametersSerializer(serializers.Serializer):
     """Serialise fetch parameters from a query string."""
     fetch = serializers.CharField(default=None, help_text=(
@@ -48,6 +82,10 @@ class SearchParametersSerializer(FetchParametersSerializer):
     offset = serializers.IntegerField(
         default=0,
         help_text='The number of results to skip at the start of the search. Defaults to 0.')
+    cursor = serializers.CharField(default=None, allow_null=True, help_text=(
+        'An opaque cursor taken from the "next" link of a previous page of results. If given, the '
+        'offset parameter is ignored and the other parameters must be the same as those of the '
+        'previous page.'))
     limit = serializers.IntegerField(
         default=100,
         help_text='The maximum number of results to return. Defaults to 100.')
@@ -57,6 +95,20 @@ class SearchParametersSerializer(FetchParametersSerializer):
         help_text='The order in which to list the results. The default is "surname".')
 
 
+class PersonBatchParametersSerializer(FetchParametersSerializer):
+    """Serialise parameters for the person batch endpoint from a request body."""
+    identifiers = serializers.ListField(child=serializers.CharField(), help_text=(
+        'List of crsids of people to retrieve. The number of crsids which may be requested at '
+        'once is limited.'))
+
+    def validate_identifiers(self, value):
+        max_identifiers = settings.LOOKUP_API_BATCH_MAX_IDENTIFIERS
+        if len(value) > max_identifiers:
+            raise serializers.ValidationError(
+                'At most {} identifiers may be requested.'.format(max_identifiers))
+        return value
+
+
 class InstitutionListParametersSerializer(FetchParametersSerializer):
     """Serialise parameters the for the institution list endpoing."""
     includeCancelled = serializers.BooleanField(default=False, help_text=(
@@ -92,8 +144,11 @@ class AttributeSchemeSerializer(serializers.Serializer):
 class PersonHyperlink(serializers.HyperlinkedIdentityField):
     """A field which can construct the appropriate link to a Person resource."""
     def get_url(self, obj, view_name, request, format):
-        url_kwargs = {'identifier': obj.identifier.value, 'scheme': obj.identifier.scheme}
-        return reverse(view_name, kwargs=url_kwargs, request=request, format=format)
+        return reverse(view_name, kwargs=self.get_url_kwargs(obj), request=request, format=format)
+
+    def get_url_kwargs(self, obj):
+        """Return the keyword arguments used to reverse the URL of the person *obj*."""
+        return {'identifier': obj.identifier.value, 'scheme': obj.identifier.scheme}
 
 
 class PersonHyperlinkSerializer(serializers.Serializer):
@@ -157,8 +212,12 @@ class InstitutionSummarySerializer(InstitutionHyperlinkSerializer):
 class AttributeSerializer(serializers.Serializer):
     """Serializer for IbisAttribute objects."""
     attrid = serializers.IntegerField(help_text='The unique internal identifier of the attribute.')
-    binaryData = Base64Field(
-        help_text='The binary data held in the attribute (e.g., a JPEG photo).')
+    binaryData = Base64Field(help_text=(
+        'The binary data held in the attribute (e.g., a JPEG photo). This is null if the server '
+        'links to binary data rather than including it.'))
+    binaryDataUrl = ContentLinkField(source='binaryData', help_text=(
+        'Link to the binary data held in the attribute if the server links to binary data rather '
+        'than including it. Otherwise, or if the attribute has no binary data, this is null.'))
     comment = serializers.CharField(help_text='Any comment associated with the attribute.')
     effectiveFrom = serializers.DateField(
         help_text='For time-limited attributes, the date from which it takes effect.')
@@ -330,6 +389,23 @@ class PersonListResultsSerializer(serializers.Serializer):
     count = serializers.IntegerField(help_text='Total number of results available.')
     offset = serializers.IntegerField(help_text='0-based index of first result to return.')
     limit = serializers.IntegerField(help_text='Requested number of results.')
+    next = serializers.URLField(allow_null=True, help_text=(
+        'Link to the next page of results or null if this is the last page. The link uses a '
+        'cursor so that the total number of results need not be recomputed.'))
+
+
+class PersonBatchResultSerializer(serializers.Serializer):
+    """Serializer for a single result from the person batch endpoint."""
+    identifier = serializers.CharField(help_text='The requested identifier.')
+    status = serializers.IntegerField(
+        help_text='200 if the person was found or 404 if they were not.')
+    person = PersonSerializer(allow_null=True, help_text='The person or null if not found.')
+
+
+class PersonBatchResultsSerializer(serializers.Serializer):
+    """Serializer for person batch results."""
+    results = PersonBatchResultSerializer(many=True, help_text=(
+        'One result for each requested identifier in the order they were requested.'))
 
 
 class AttributeSchemeListSerializer(serializers.Serializer):
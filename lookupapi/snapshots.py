@@ -0,0 +1,222 @@
+"""
+In-memory snapshots of rarely changing Lookup data.
+
+Some Lookup data, such as the list of attribute schemes, changes very rarely. Rather than fetching
+it from Lookup for every request, each worker process holds a :py:class:`Snapshot` of the data
+which is refreshed in the background once it is older than the interval configured in the
+``LOOKUP_API_SNAPSHOT_INTERVALS`` setting.
+
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from . import cache
+from . import ibis
+
+
+LOG = logging.getLogger(__name__)
+
+_registry = []
+
+
+class Snapshot(cache.ProcessLocalState):
+    """
+    A value returned by calling *loader* with no arguments which is held in memory. The first call
+    to :py:meth:`get` loads the value unless it has already been loaded by :py:func:`preload`. Once
+    the value is older than the snapshot's interval, the next call to :py:meth:`get` starts a
+    single background refresh and continues to return the old value until the refresh completes.
+
+    Snapshots are registered by name when they are created so that they may be pre-loaded by
+    :py:func:`preload`. A forked process keeps any loaded value but not a load or refresh which was
+    running in its parent.
+
+    """
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self._value = None
+        self._loaded_at = None
+        self._counters = {'loads': 0, 'load_failures': 0}
+        self._flight = cache.SingleFlight()
+        super().__init__()
+        _registry.append(self)
+
+    def _reset_process_state(self):
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    @property
+    def interval(self):
+        """Number of seconds after which the snapshot is refreshed."""
+        return settings.LOOKUP_API_SNAPSHOT_INTERVALS.get(self.name, 0)
+
+    def get(self, load=True):
+        """
+        Return the value of the snapshot, loading it if necessary. If *load* is False and the
+        snapshot has not yet been loaded, return None rather than loading it.
+
+        """
+        self._check_process()
+        with self._lock:
+            value, loaded_at = self._value, self._loaded_at
+        if loaded_at is None:
+            return self.load() if load else None
+        if time.monotonic() - loaded_at > self.interval:
+            self._refresh()
+        return value
+
+    def load(self):
+        """
+        Load the value of the snapshot and return it. Concurrent calls share a single call to the
+        loader. No lock is held while the loader runs.
+
+        """
+        self._check_process()
+        return self._flight.do(self.name, self._load)
+
+    def _load(self):
+        # Another caller may have loaded the snapshot since this one found it missing or expired.
+        with self._lock:
+            if self._loaded_at is not None and not self._is_expired():
+                return self._value
+
+        try:
+            value = self.loader()
+        except Exception:
+            with self._lock:
+                self._counters['load_failures'] += 1
+            raise
+
+        with self._lock:
+            self._value, self._loaded_at = value, time.monotonic()
+            self._counters['loads'] += 1
+        return value
+
+    def is_loaded(self):
+        """Return True if the snapshot has been loaded."""
+        self._check_process()
+        with self._lock:
+            return self._loaded_at is not None
+
+    def load_in_background(self):
+        """Start a background load of the snapshot unless one is already running."""
+        self._refresh()
+
+    def clear(self):
+        """Forget any loaded value."""
+        self._check_process()
+        with self._lock:
+            self._value, self._loaded_at = None, None
+
+    def stats(self):
+        """Return a dictionary of counters along with the age of the snapshot in seconds."""
+        self._check_process()
+        with self._lock:
+            stats = dict(self._counters)
+            stats['age'] = (
+                time.monotonic() - self._loaded_at if self._loaded_at is not None else None)
+        return stats
+
+    def _is_expired(self):
+        return time.monotonic() - self._loaded_at > self.interval
+
+    def _refresh(self):
+        """Start a background refresh of the snapshot unless one is already running."""
+        self._check_process()
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            try:
+                self.load()
+            except Exception:
+                # The old value continues to be served.
+                LOG.exception('Error refreshing snapshot %s', self.name)
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        try:
+            ibis.get_executor().submit(refresh)
+        except Exception:
+            with self._lock:
+                self._refreshing = False
+            raise
+
+
+class InstitutionDirectory:
+    """
+    An index of the institutions returned by a call to Lookup's ``allInsts`` method which included
+    cancelled institutions and used the fetch parameter *fetch*.
+
+    Views may store :py:class:`~.responses.Representation` instances for the directory in the
+    :py:attr:`representations` dictionary. They are discarded along with the directory when it is
+    refreshed.
+
+    """
+    def __init__(self, institutions, fetch=None):
+        self.fetch = cache.normalise_fetch(fetch)
+        self.institutions = list(institutions)
+        self.live_institutions = [
+            institution for institution in self.institutions if not institution.cancelled]
+        self.by_instid = {
+            institution.instid.upper(): institution for institution in self.institutions
+            if institution.instid is not None
+        }
+        self.representations = {}
+
+    def list(self, include_cancelled=False):
+        """Return a list of institutions, optionally including cancelled ones."""
+        return self.institutions if include_cancelled else self.live_institutions
+
+    def get(self, instid):
+        """Return the institution with the given instid or None if there is no such institution."""
+        return self.by_instid.get(instid.upper())
+
+    def covers(self, fetch):
+        """
+        Return True if the institutions in this directory have exactly the data which would be
+        returned by Lookup for the fetch parameter *fetch*.
+
+        """
+        return cache.normalise_fetch(fetch) == self.fetch
+
+
+def get_snapshots():
+    """Return a list of all registered snapshots."""
+    return list(_registry)
+
+
+def preload():
+    """
+    Start loading all registered snapshots in the background. This is intended to be called in
+    each worker process once it has loaded the application, for example by the
+    ``post_worker_init`` hook in :py:mod:`lookupproxy.gunicornconf`, so that requests do not have
+    to wait for the first load. It should not be called when the application is imported since
+    that may happen in a process which later forks or which never serves requests. It does nothing
+    if the ``LOOKUP_API_SNAPSHOT_PRELOAD`` setting is False.
+
+    """
+    if not settings.LOOKUP_API_SNAPSHOT_PRELOAD:
+        return
+
+    def load(snapshot):
+        try:
+            snapshot.load()
+        except Exception:
+            LOG.exception('Error pre-loading snapshot %s', snapshot.name)
+
+    executor = ibis.get_executor()
+    for snapshot in get_snapshots():
+        executor.submit(load, snapshot)
+
+
+def clear():
+    """Forget the values of all registered snapshots."""
+    for snapshot in get_snapshots():
+        snapshot.clear()
@@ -1,8 +1,9 @@
 """
 The :py:mod:`lookupapi` application ships with some custom system checks which ensure that the
-``LOOKUP_API_OAUTH2_...`` settings have non-default values. These system checks are registered by
-the :py:class:`~lookupapi.apps.LookupAPIConfig` class's
-:py:meth:`~lookupapi.apps.LookupAPIConfig.ready` method.
+``LOOKUP_API_OAUTH2_...`` settings have non-default values, that ``OAUTH2_USER_RESOLUTION`` is
+valid and that linked binary content is available for as long as it is linked to. These system
+checks are registered by the :py:class:`~lookupapi.apps.LookupAPIConfig`
+class's :py:meth:`~lookupapi.apps.LookupAPIConfig.ready` method.
 
 .. seealso::
 
@@ -12,6 +13,17 @@ the :py:class:`~lookupapi.apps.LookupAPIConfig` class's
 from django.conf import settings
 from django.core.checks import register, Error
 
+from . import cache
+from . import content
+from .authentication import USER_RESOLUTIONS
+
+
+PROCESS_LOCAL_CACHE_BACKENDS = [
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+]
+"""Django cache backends which cannot share content between worker processes."""
+
 
 @register
 def api_credentials_check(app_configs, **kwargs):
@@ -40,3 +52,56 @@ def api_credentials_check(app_configs, **kwargs):
                 hint='Add {} to settings.'.format(name)))
 
     return errors
+
+
+@register
+def user_resolution_check(app_configs, **kwargs):
+    """
+    A system check ensuring that the ``OAUTH2_USER_RESOLUTION`` setting has a valid value.
+
+    """
+    value = getattr(settings, 'OAUTH2_USER_RESOLUTION', None)
+    if value not in USER_RESOLUTIONS:
+        return [Error(
+            'Invalid OAUTH2_USER_RESOLUTION setting {!r}'.format(value),
+            id='lookupapi.E006',
+            hint='Set OAUTH2_USER_RESOLUTION to one of {}.'.format(', '.join(USER_RESOLUTIONS)))]
+    return []
+
+
+@register
+def content_links_check(app_configs, **kwargs):
+    """
+    A system check ensuring that, if ``LOOKUP_API_BINARY_CONTENT_LINKS`` is True, linked content
+    is stored in a cache shared between worker processes and is stored for longer than any cached
+    representation linking to it.
+
+    """
+    if not settings.LOOKUP_API_BINARY_CONTENT_LINKS:
+        return []
+
+    errors = []
+    backend = settings.LOOKUP_API_CACHE_BACKEND
+    if backend is None or settings.CACHES.get(backend, {}).get(
+            'BACKEND') in PROCESS_LOCAL_CACHE_BACKENDS:
+        errors.append(Error(
+            'LOOKUP_API_BINARY_CONTENT_LINKS requires a shared LOOKUP_API_CACHE_BACKEND',
+            id='lookupapi.E007',
+            hint=(
+                'Set LOOKUP_API_CACHE_BACKEND to a cache shared between worker processes, such '
+                'as a Redis or memcached cache, or add lookupapi.E007 to '
+                'SILENCED_SYSTEM_CHECKS if there is only one worker process.')))
+
+    lifetime = 0
+    for resource in content.LINKING_RESOURCES:
+        timeout = cache.get_timeout(resource)
+        if timeout:
+            lifetime = max(lifetime, timeout + cache.get_stale_timeout(resource))
+    if settings.LOOKUP_API_CONTENT_CACHE_TIMEOUT <= lifetime:
+        errors.append(Error(
+            'LOOKUP_API_CONTENT_CACHE_TIMEOUT is not longer than cached representations live',
+            id='lookupapi.E008',
+            hint='Set LOOKUP_API_CONTENT_CACHE_TIMEOUT to more than {} seconds.'.format(
+                lifetime)))
+
+    return errors
@@ -0,0 +1,130 @@
+"""
+Test OAuth2 token authentication.
+
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from lookupapi import authentication
+
+
+class IntrospectionCacheTests(TestCase):
+    def setUp(self):
+        authentication.get_introspection_cache().clear()
+        self.validate_patch = mock.patch(
+            'automationoauthdrf.authentication.OAuth2TokenAuthentication.validate_token')
+        self.mock_validate = self.validate_patch.start()
+        self.auth = authentication.OAuth2TokenAuthentication()
+
+    def tearDown(self):
+        self.validate_patch.stop()
+
+    def test_valid_token_cached(self):
+        """Introspection of a valid token is only performed once."""
+        token = {'active': True, 'scope': 'lookup:anonymous'}
+        self.mock_validate.return_value = token
+        self.assertEqual(self.auth.validate_token('xxx'), token)
+        self.assertEqual(self.auth.validate_token('xxx'), token)
+        self.mock_validate.assert_called_once_with('xxx')
+
+    def test_granted_scopes(self):
+        """Valid tokens carry their parsed scopes."""
+        self.mock_validate.return_value = {'active': True, 'scope': 'lookup:anonymous other'}
+        token = self.auth.validate_token('xxx')
+        self.assertEqual(token.granted_scopes, frozenset(['lookup:anonymous', 'other']))
+        self.assertIs(self.auth.validate_token('xxx'), token)
+
+    def test_invalid_token_cached(self):
+        """Introspection of an invalid token is only performed once."""
+        self.mock_validate.return_value = None
+        self.assertIsNone(self.auth.validate_token('xxx'))
+        self.assertIsNone(self.auth.validate_token('xxx'))
+        self.mock_validate.assert_called_once_with('xxx')
+
+    def test_different_tokens(self):
+        """Different tokens are introspected separately."""
+        self.mock_validate.return_value = {'active': True}
+        self.auth.validate_token('xxx')
+        self.auth.validate_token('yyy')
+        self.assertEqual(self.mock_validate.call_count, 2)
+
+    def test_expired_token_not_cached(self):
+        """Tokens which have already expired are not cached."""
+        with mock.patch('time.time', return_value=1000):
+            self.mock_validate.return_value = {'active': True, 'exp': 999}
+            self.auth.validate_token('xxx')
+            self.auth.validate_token('xxx')
+        self.assertEqual(self.mock_validate.call_count, 2)
+
+    def test_cache_bounded_by_expiry(self):
+        """Tokens are not cached beyond their expiry."""
+        with mock.patch('time.time', return_value=1000), \
+                mock.patch('time.monotonic', return_value=0):
+            self.mock_validate.return_value = {'active': True, 'exp': 1010}
+            self.auth.validate_token('xxx')
+        with mock.patch('time.monotonic', return_value=11):
+            self.auth.validate_token('xxx')
+        self.assertEqual(self.mock_validate.call_count, 2)
+
+    def test_errors_not_cached(self):
+        """Errors contacting the introspection endpoint are not cached."""
+        self.mock_validate.side_effect = RuntimeError()
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                self.auth.validate_token('xxx')
+        self.assertEqual(self.mock_validate.call_count, 2)
+
+
+class UserResolutionTests(TestCase):
+    def setUp(self):
+        authentication.get_introspection_cache().clear()
+        authentication.get_user_cache().clear()
+        self.validate_patch = mock.patch(
+            'automationoauthdrf.authentication.OAuth2TokenAuthentication.validate_token')
+        self.mock_validate = self.validate_patch.start()
+        self.mock_validate.return_value = {
+            'active': True, 'scope': 'lookup:anonymous', 'sub': 'mock:test0001'}
+        self.auth = authentication.OAuth2TokenAuthentication()
+
+    def tearDown(self):
+        self.validate_patch.stop()
+
+    def authenticate(self, authorization='Bearer xxx'):
+        """Authenticate a request with the given Authorization header."""
+        return self.auth.authenticate(
+            APIRequestFactory().get('/', HTTP_AUTHORIZATION=authorization))
+
+    @override_settings(OAUTH2_USER_RESOLUTION='token')
+    def test_token_user(self):
+        """The "token" resolution returns a non-persisted user without using the database."""
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+        self.assertIsInstance(user, authentication.TokenUser)
+        self.assertEqual(user.username, 'mock:test0001')
+        self.assertTrue(user.is_authenticated)
+        self.assertEqual(token['sub'], 'mock:test0001')
+        self.assertFalse(get_user_model().objects.filter(username='mock:test0001').exists())
+
+    @override_settings(OAUTH2_USER_RESOLUTION='cached')
+    def test_cached_user(self):
+        """The "cached" resolution creates a database user once per subject."""
+        user, _ = self.authenticate()
+        self.assertEqual(user, get_user_model().objects.get(username='mock:test0001'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate()[0], user)
+
+    @override_settings(OAUTH2_USER_RESOLUTION='token')
+    def test_no_subject(self):
+        """A token without a subject has no user."""
+        self.mock_validate.return_value = {'active': True, 'scope': 'lookup:anonymous'}
+        self.assertEqual(self.authenticate()[0], None)
+
+    @override_settings(OAUTH2_USER_RESOLUTION='token')
+    def test_invalid_token(self):
+        """Requests with an invalid or no bearer token are not authenticated."""
+        self.assertIsNone(self.authenticate('Basic xxx'))
+        self.mock_validate.return_value = None
+        self.assertIsNone(self.authenticate())
@@ -0,0 +1,167 @@
+"""
+Test caching of serialised Lookup resources.
+
+"""
+import threading
+from unittest import mock
+
+from django.test import TestCase
+
+from lookupapi import cache
+
+
+class LRUCacheTests(TestCase):
+    def setUp(self):
+        self.cache = cache.LRUCache(max_entries=2)
+
+    def test_get_set(self):
+        """Values which have been set can be got."""
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', 1, 10)
+        self.assertEqual(self.cache.get('a'), 1)
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_expiry(self):
+        """Values expire after their timeout."""
+        with mock.patch('time.monotonic', return_value=1000):
+            self.cache.set('a', 1, 10)
+        with mock.patch('time.monotonic', return_value=1011):
+            self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted when the cache is full."""
+        self.cache.set('a', 1, 10)
+        self.cache.set('b', 2, 10)
+        self.cache.get('a')
+        self.cache.set('c', 3, 10)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('c'), 3)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+
+class SingleFlightTests(TestCase):
+    def test_coalesced(self):
+        """Concurrent calls for the same key share a single call."""
+        flight = cache.SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def f():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return 'result'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('k', f)))
+        leader.start()
+        started.wait()
+        followers = [
+            threading.Thread(target=lambda: results.append(flight.do('k', f))) for _ in range(3)]
+        for follower in followers:
+            follower.start()
+        while flight.stats()['coalesced'] < 3:
+            pass
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ['result'] * 4)
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_exception(self):
+        """Exceptions are raised to the caller and the key is no longer in flight."""
+        flight = cache.SingleFlight()
+        with self.assertRaises(RuntimeError):
+            flight.do('k', mock.MagicMock(side_effect=RuntimeError()))
+        self.assertEqual(flight.do('k', lambda: 1), 1)
+
+    def test_fork(self):
+        """Calls in flight in a parent process are not waited for in a forked process."""
+        flight = cache.SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        leader = threading.Thread(
+            target=lambda: flight.do('k', lambda: started.set() or release.wait()))
+        leader.start()
+        started.wait()
+        try:
+            with mock.patch('os.getpid', return_value=flight._pid + 1):
+                self.assertEqual(flight.do('k', lambda: 'child'), 'child')
+                self.assertEqual(flight.stats(), {'coalesced': 0, 'in_flight': 0})
+        finally:
+            release.set()
+            leader.join()
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        self.key = cache.make_key('person', ('crsid', 'spqr2'), 'email')
+
+    def test_local_only(self):
+        """A cache with no backend uses only the in-process cache."""
+        response_cache = cache.ResponseCache(max_entries=10)
+        response_cache.set(self.key, {'a': 1}, 10)
+        self.assertEqual(response_cache.get(self.key), {'a': 1})
+
+    def test_backend(self):
+        """Entries in the shared backend are visible to other processes' caches."""
+        with self.settings(CACHES={'shared': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            cache.ResponseCache(max_entries=10, backend='shared').set(self.key, {'a': 1}, 10)
+            other = cache.ResponseCache(max_entries=10, backend='shared')
+            self.assertEqual(other.get(self.key), {'a': 1})
+            self.assertEqual(other.stats()['backend_hits'], 1)
+            # The value is now held locally
+            self.assertEqual(other.get(self.key), {'a': 1})
+            self.assertEqual(other.stats()['backend_hits'], 1)
+
+    def test_normalise_fetch(self):
+        """Keys do not depend on the order of fetch options."""
+        self.assertEqual(
+            cache.make_key('person', ('crsid', 'spqr2'), 'all_groups, email'),
+            cache.make_key('person', ('crsid', 'spqr2'), 'email,all_groups'))
+        self.assertNotEqual(
+            cache.make_key('person', ('crsid', 'spqr2'), 'email'),
+            cache.make_key('person', ('crsid', 'spqr2'), None))
+
+    def test_get_or_set(self):
+        """A missing value is computed and cached."""
+        response_cache = cache.ResponseCache(max_entries=10)
+        compute = mock.MagicMock(return_value={'a': 1})
+        self.assertEqual(response_cache.get_or_set(self.key, compute, 10), {'a': 1})
+        self.assertEqual(response_cache.get_or_set(self.key, compute, 10), {'a': 1})
+        self.assertEqual(compute.call_count, 1)
+
+    def test_stale_while_revalidate(self):
+        """A stale value is served while it is refreshed in the background."""
+        response_cache = cache.ResponseCache(max_entries=10)
+        executor = mock.MagicMock()
+        with mock.patch('time.monotonic', return_value=1000):
+            response_cache.set(self.key, 'old', 10, 100)
+        with mock.patch('time.monotonic', return_value=1011), \
+                mock.patch('lookupapi.ibis.get_executor', return_value=executor):
+            compute = mock.MagicMock(return_value='new')
+            self.assertEqual(response_cache.get_or_set(self.key, compute, 10, 100), 'old')
+            self.assertEqual(response_cache.get_or_set(self.key, compute, 10, 100), 'old')
+
+            # Only one refresh is scheduled
+            self.assertEqual(executor.submit.call_count, 1)
+            compute.assert_not_called()
+
+            # Run the refresh
+            executor.submit.call_args[0][0]()
+            compute.assert_called_once_with()
+            self.assertEqual(response_cache.get_or_set(self.key, compute, 10, 100), 'new')
+
+    def test_stale_expiry(self):
+        """Values are not served once the stale timeout has passed."""
+        response_cache = cache.ResponseCache(max_entries=10)
+        with mock.patch('time.monotonic', return_value=1000):
+            response_cache.set(self.key, 'old', 10, 100)
+        with mock.patch('time.monotonic', return_value=1111):
+            self.assertEqual(response_cache.get_or_set(self.key, lambda: 'new', 10, 100), 'new')
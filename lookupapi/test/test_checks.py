@@ -32,3 +32,44 @@ class RequiredSettings(TestCase):
                 call_command('check')
             with self.settings(**{name: None}), self.assertRaises(SystemCheckError):
                 call_command('check')
+
+
+class UserResolution(TestCase):
+    def test_invalid(self):
+        """The system check should fail if OAUTH2_USER_RESOLUTION is invalid."""
+        with self.settings(OAUTH2_USER_RESOLUTION='ldap'), self.assertRaises(SystemCheckError):
+            call_command('check')
+
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+               'LOCATION': '/tmp/lookupapi-test-shared-cache'},
+}
+
+
+class ContentLinks(TestCase):
+    def test_shared_backend(self):
+        """Content links should pass the checks with a shared cache backend."""
+        with self.settings(
+                LOOKUP_API_BINARY_CONTENT_LINKS=True, CACHES=SHARED_CACHES,
+                LOOKUP_API_CACHE_BACKEND='shared'):
+            call_command('check')
+
+    def test_no_shared_backend(self):
+        """The system check should fail if content links are not stored in a shared cache."""
+        with self.settings(LOOKUP_API_BINARY_CONTENT_LINKS=True), \
+                self.assertRaises(SystemCheckError):
+            call_command('check')
+        with self.settings(
+                LOOKUP_API_BINARY_CONTENT_LINKS=True, CACHES=SHARED_CACHES,
+                LOOKUP_API_CACHE_BACKEND='default'), self.assertRaises(SystemCheckError):
+            call_command('check')
+
+    def test_content_timeout(self):
+        """The system check should fail if content expires before representations linking to it."""
+        with self.settings(
+                LOOKUP_API_BINARY_CONTENT_LINKS=True, CACHES=SHARED_CACHES,
+                LOOKUP_API_CACHE_BACKEND='shared', LOOKUP_API_CONTENT_CACHE_TIMEOUT=3600), \
+                self.assertRaises(SystemCheckError):
+            call_command('check')
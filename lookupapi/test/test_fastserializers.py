@@ -0,0 +1,133 @@
+"""
+Test the fast serialisation path.
+
+"""
+import datetime
+
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from ucamlookup import ibisclient
+
+from lookupapi import fastserializers, responses, serializers
+
+
+def make_person(crsid, scheme='crsid'):
+    person = ibisclient.IbisPerson()
+    person.identifier = ibisclient.IbisIdentifier({'scheme': scheme, 'value': crsid})
+    person.identifier.value = crsid
+    person.cancelled = False
+    person.visibleName = 'Person {}'.format(crsid)
+    person.misAffiliation = 'staff'
+    return person
+
+
+def make_institution(instid):
+    institution = ibisclient.IbisInstitution()
+    institution.instid = instid
+    institution.name = 'Institution {}'.format(instid)
+    institution.acronym = instid
+    institution.cancelled = False
+    return institution
+
+
+def make_group(groupid):
+    group = ibisclient.IbisGroup()
+    group.groupid = groupid
+    group.name = 'group-{}'.format(groupid)
+    group.title = 'Group {}'.format(groupid)
+    group.cancelled = True
+    return group
+
+
+class SerializeTests(TestCase):
+    def setUp(self):
+        self.request = Request(APIRequestFactory().get('/'))
+        self.context = {'request': self.request}
+
+    def assertSameJSON(self, serializer_class, instance, many=False):
+        expected = JSONRenderer().render(
+            serializer_class(instance, many=many, context=self.context).data)
+        actual = JSONRenderer().render(
+            fastserializers.serialize(serializer_class, instance, self.context, many=many))
+        self.assertEqual(actual, expected)
+
+    def test_person(self):
+        """A fully populated person is serialised identically."""
+        person = make_person('spqr2')
+        person.displayName = 'Ms Spqr'
+        person.identifiers = [person.identifier]
+        attribute = ibisclient.IbisAttribute({'attrid': '1', 'scheme': 'jpegPhoto'})
+        attribute.attrid = 1
+        attribute.binaryData = b'\xff\xd8\xff'
+        attribute.effectiveFrom = datetime.date(2018, 1, 1)
+        person.attributes = [attribute]
+        group = make_group('100656')
+        group.members = [make_person('abc1'), make_person('def2')]
+        group.managesInsts = [make_institution('UIS')]
+        person.directGroups = [group]
+        person.groups = [group]
+        person.institutions = [make_institution('CS')]
+        self.assertSameJSON(serializers.PersonSerializer, person)
+
+    def test_binary_content_links(self):
+        """Attributes with links to binary data are serialised identically."""
+        attribute = ibisclient.IbisAttribute({'scheme': 'jpegPhoto'})
+        attribute.binaryData = b'\xff\xd8\xff'
+        with self.settings(LOOKUP_API_BINARY_CONTENT_LINKS=True):
+            self.assertSameJSON(serializers.AttributeSerializer, attribute)
+
+    def test_institution_members(self):
+        """An institution with members is serialised identically."""
+        institution = make_institution('UIS')
+        institution.members = [make_person('ab{}'.format(idx)) for idx in range(10)]
+        institution.parentInsts = [make_institution('UCS')]
+        row = ibisclient.IbisContactRow()
+        row.addresses = ['1 Street']
+        row.emails = ['foo@example.com']
+        row.people = institution.members[:2]
+        row.phoneNumbers = []
+        row.webPages = []
+        institution.contactRows = [row]
+        self.assertSameJSON(serializers.InstitutionSerializer, institution)
+
+    def test_many(self):
+        """Lists of entities are serialised identically."""
+        self.assertSameJSON(
+            serializers.InstitutionSummarySerializer,
+            [make_institution('UIS'), make_institution('CS')], many=True)
+
+    def test_unusual_identifiers(self):
+        """Identifiers which need quoting in URLs are linked identically."""
+        self.assertSameJSON(serializers.PersonListResultsSerializer, {
+            'results': [make_person('a b'), make_person('..'), make_person('caf\xe9', 'mock')],
+            'count': 3, 'offset': 0, 'limit': 100,
+        })
+
+    def test_missing_attribute(self):
+        """Missing attributes raise an error as the serializer would."""
+        with self.assertRaises(KeyError):
+            fastserializers.serialize(serializers.PersonListResultsSerializer, {'results': []})
+
+    def test_disabled(self):
+        """The serializer is used directly if the fast path is disabled."""
+        with self.settings(LOOKUP_API_FAST_SERIALIZERS=False):
+            data = fastserializers.serialize(
+                serializers.InstitutionSummarySerializer, make_institution('UIS'), self.context)
+        self.assertEqual(data['url'], 'http://testserver/institutions/UIS')
+
+    def test_streaming(self):
+        """Lazily serialised data is streamed as identical JSON."""
+        institution = make_institution('UIS')
+        institution.members = [make_person('ab{}'.format(idx)) for idx in range(10)]
+        institution.members[0].visibleName = 'Line\u2028separator \u2603'
+        expected = JSONRenderer().render(
+            serializers.InstitutionSerializer(institution, context=self.context).data)
+        data = fastserializers.serialize(
+            serializers.InstitutionSerializer, institution, self.context, lazy=True)
+        with self.settings(LOOKUP_API_STREAMING_CHUNK_SIZE=100):
+            response = responses.streaming_response(data)
+            chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks), expected)
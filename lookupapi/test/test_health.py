@@ -0,0 +1,239 @@
+"""
+Test liveness and readiness checks.
+
+"""
+import json
+from unittest import mock
+
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from ucamlookup import ibisclient
+
+from lookupapi import cache, health, ibis, middleware
+
+
+class HealthTestCase(TestCase):
+    def setUp(self):
+        for reachability in (health.lookup, health.introspection, health.cache_backend):
+            reachability.last_success = None
+            reachability.last_failure = None
+            reachability.last_error = None
+        health._settings_ok.cache_clear()
+
+
+class ReachabilityTest(HealthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.reachability = health.Reachability()
+
+    def test_initially_reachable(self):
+        """A service with no recorded calls should be reachable."""
+        self.assertTrue(self.reachability.is_reachable())
+
+    def test_failure(self):
+        """A recent failure should make a service unreachable until a call succeeds."""
+        with self.assertRaises(OSError):
+            with self.reachability.track():
+                raise OSError('connection refused')
+        self.assertFalse(self.reachability.is_reachable())
+        self.assertEqual(
+            self.reachability.report(details=True)['last_error'], 'OSError: connection refused')
+        with self.reachability.track():
+            pass
+        self.assertTrue(self.reachability.is_reachable())
+
+    @override_settings(LOOKUP_API_UPSTREAM_FAILURE_WINDOW=30)
+    def test_failure_window(self):
+        """Failures older than the failure window should be ignored."""
+        self.reachability.failure(OSError())
+        now = self.reachability.last_failure
+        self.assertFalse(self.reachability.is_reachable(now + 29))
+        self.assertTrue(self.reachability.is_reachable(now + 31))
+
+    def test_ignore(self):
+        """Ignored exceptions should be recorded as successes."""
+        @self.reachability.tracked(ignore=(KeyError,))
+        def f():
+            raise KeyError()
+
+        with self.assertRaises(KeyError):
+            f()
+        self.assertIsNotNone(self.reachability.last_success)
+        self.assertIsNone(self.reachability.last_failure)
+
+
+@override_settings(LOOKUP_API_SNAPSHOT_PRELOAD=False)
+class ReadinessTest(HealthTestCase):
+    def test_ready(self):
+        """The server should be ready if its local checks pass."""
+        ready, report = health.readiness()
+        self.assertTrue(ready)
+        self.assertTrue(report['checks']['settings']['ok'])
+        self.assertTrue(report['upstream']['lookup']['reachable'])
+
+    def test_lookup_failure(self):
+        """A failed call to Lookup should be reported without making the server unready."""
+        with mock.patch('ucamlookup.ibisclient.PersonMethods') as person_methods:
+            person_methods.return_value = MockPersonMethods(OSError('connection refused'))
+            with self.assertRaises(OSError):
+                ibis.get_person_methods().getPerson('crsid', 'x')
+        ready, report = health.readiness()
+        self.assertTrue(ready)
+        self.assertFalse(report['upstream']['lookup']['reachable'])
+
+        with mock.patch('ucamlookup.ibisclient.PersonMethods') as person_methods:
+            person_methods.return_value = MockPersonMethods(None)
+            ibis.get_person_methods().getPerson('crsid', 'x')
+        self.assertTrue(health.readiness()[1]['upstream']['lookup']['reachable'])
+
+    def test_lookup_error_response(self):
+        """A Lookup error response should show that Lookup is reachable."""
+        error = ibisclient.IbisError()
+        error.code = 404
+        with mock.patch('ucamlookup.ibisclient.PersonMethods') as person_methods:
+            person_methods.return_value = MockPersonMethods(ibisclient.IbisException(error))
+            with self.assertRaises(ibis.IbisAPIException):
+                ibis.get_person_methods().getPerson('crsid', 'x')
+        self.assertTrue(health.readiness()[1]['upstream']['lookup']['reachable'])
+        self.assertIsNotNone(health.lookup.last_success)
+
+    @override_settings(LOOKUP_API_CACHE_BACKEND='default')
+    def test_cache_backend_failure(self):
+        """A failed call to the shared cache backend should be reported."""
+        response_cache = cache.ResponseCache(10, backend='default')
+        with mock.patch.object(caches['default'], 'get', side_effect=OSError()):
+            with self.assertRaises(OSError):
+                response_cache.get_entry(('missing',))
+        ready, report = health.readiness()
+        self.assertTrue(ready)
+        self.assertFalse(report['upstream']['cache_backend']['reachable'])
+
+    def test_cache_backend_not_configured(self):
+        """The shared cache backend should not be reported if none is configured."""
+        self.assertNotIn('cache_backend', health.readiness()[1]['upstream'])
+
+    def test_details(self):
+        """Error messages and pool counters should only be reported if enabled."""
+        health.lookup.failure(OSError('connection refused'))
+        upstream = health.readiness()[1]['upstream']
+        self.assertNotIn('last_error', upstream['lookup'])
+        self.assertNotIn('connection_pool', upstream)
+        with self.settings(LOOKUP_API_HEALTH_DETAILS=True):
+            upstream = health.readiness()[1]['upstream']
+        self.assertEqual(upstream['lookup']['last_error'], 'OSError: connection refused')
+        self.assertIn('idle', upstream['connection_pool'])
+
+    def test_settings(self):
+        """The server should be unready if its settings fail the system checks."""
+        with self.settings(OAUTH2_CLIENT_ID=None):
+            ready, report = health.readiness()
+        self.assertFalse(ready)
+        self.assertFalse(report['checks']['settings']['ok'])
+
+    def test_settings_checked_once(self):
+        """The system checks should be run once per process, not on every probe."""
+        with mock.patch('lookupapi.systemchecks.api_credentials_check', return_value=[]) as check:
+            health.readiness()
+            health.readiness()
+        check.assert_called_once_with(None)
+
+    def test_database_not_checked(self):
+        """Readiness should not connect to the database."""
+        with mock.patch('django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection') as \
+                ensure_connection:
+            ready, report = health.readiness()
+        self.assertTrue(ready)
+        ensure_connection.assert_not_called()
+        self.assertNotIn('database', report['checks'])
+
+    @override_settings(LOOKUP_API_SNAPSHOT_PRELOAD=True)
+    def test_snapshots(self):
+        """With pre-loading, the server should be unready and load snapshots until loaded."""
+        snapshot = mock.MagicMock()
+        snapshot.name = 'test'
+        snapshot.is_loaded.return_value = False
+        with mock.patch('lookupapi.snapshots.get_snapshots', return_value=[snapshot]):
+            ready, report = health.readiness()
+            self.assertFalse(ready)
+            self.assertEqual(report['checks']['snapshots']['loaded'], {'test': False})
+            snapshot.load_in_background.assert_called_once_with()
+
+            snapshot.is_loaded.return_value = True
+            self.assertTrue(health.readiness()[0])
+        snapshot.load_in_background.assert_called_once_with()
+
+    @override_settings(LOOKUP_API_SNAPSHOT_PRELOAD=True)
+    def test_readiness_response(self):
+        """The readiness response should have status 503 if the server is not ready."""
+        snapshot = mock.MagicMock()
+        snapshot.name = 'test'
+        snapshot.is_loaded.return_value = False
+        with mock.patch('lookupapi.snapshots.get_snapshots', return_value=[snapshot]):
+            response = health.readiness_response()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertEqual(json.loads(response.content.decode('utf8'))['status'], 'unavailable')
+
+
+class HealthCheckMiddlewareTest(HealthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = RequestFactory()
+        self.get_response = mock.MagicMock(return_value=HttpResponse('passed on'))
+        self.middleware = middleware.HealthCheckMiddleware(self.get_response)
+
+    def test_liveness(self):
+        """Liveness probes should be answered without calling the rest of the stack."""
+        response = self.middleware(self.factory.get('/healthz'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode('utf8')), {'status': 'ok'})
+        self.get_response.assert_not_called()
+
+    @override_settings(LOOKUP_API_SNAPSHOT_PRELOAD=False)
+    def test_readiness(self):
+        """Readiness probes should be answered without calling the rest of the stack."""
+        health.lookup.failure(OSError())
+        response = self.middleware(self.factory.get('/readyz'))
+        self.assertEqual(response.status_code, 200)
+        self.get_response.assert_not_called()
+
+    def test_other_requests(self):
+        """Other paths and methods should be passed on."""
+        self.middleware(self.factory.get('/people'))
+        self.middleware(self.factory.post('/healthz'))
+        self.assertEqual(self.get_response.call_count, 2)
+
+    @override_settings(LOOKUP_API_HEALTH_PATH=None, LOOKUP_API_READINESS_PATH=None)
+    def test_disabled(self):
+        """Probes should be passed on if the paths are None."""
+        self.middleware(self.factory.get('/healthz'))
+        self.middleware(self.factory.get('/readyz'))
+        self.assertEqual(self.get_response.call_count, 2)
+
+    @override_settings(ALLOWED_HOSTS=['lookupproxy.invalid'], LOOKUP_API_SNAPSHOT_PRELOAD=False)
+    def test_allowed_hosts(self):
+        """Probes should be answered whatever the Host header."""
+        self.assertEqual(self.client.get('/healthz', HTTP_HOST='10.0.0.1').status_code, 200)
+        self.assertEqual(self.client.get('/readyz', HTTP_HOST='10.0.0.1').status_code, 200)
+
+
+class ReadinessViewTest(HealthTestCase):
+    @override_settings(LOOKUP_API_READINESS_PATH=None, LOOKUP_API_SNAPSHOT_PRELOAD=False)
+    def test_readiness_view(self):
+        """The readiness report should also be served from the URL configuration."""
+        response = self.client.get(reverse('readyz'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode('utf8'))['status'], 'ok')
+
+
+class MockPersonMethods:
+    """A mock PersonMethods-like class whose getPerson raises *exception* if it is not None."""
+    def __init__(self, exception):
+        self.exception = exception
+
+    def getPerson(self, scheme, identifier, fetch=None):
+        if self.exception is not None:
+            raise self.exception
+        return ibisclient.IbisPerson()
@@ -1,8 +1,9 @@
+import threading
 from unittest import mock
 from django.test import TestCase
 from ucamlookup import ibisclient
 
-from lookupapi import ibis
+from lookupapi import ibis, timing
 
 
 class IbisTests(TestCase):
@@ -10,6 +11,11 @@ class IbisTests(TestCase):
         """Get connection should return a connection instance."""
         self.assertIsNotNone(ibis.get_connection())
 
+    def test_get_connection_pooled(self):
+        """Connections should share a single per-process pool."""
+        self.assertIs(ibis.get_connection().pool, ibis.get_connection().pool)
+        self.assertIs(ibis.get_connection().pool, ibis.get_pool())
+
     def test_person_methods_wrapper(self):
         """get_person_methods() should return a wrapped object which intercepts IbisExceptions."""
 
@@ -36,6 +42,51 @@ class IbisTests(TestCase):
             with self.assertRaises(ibis.IbisAPIException):
                 ibis.get_institution_methods().getInst('xxxx')
 
+    def test_wrapped_class_shared(self):
+        """Methods objects should share a pre-computed wrapped sub-class."""
+        first, second = ibis.get_person_methods(), ibis.get_person_methods()
+        self.assertIs(type(first), type(second))
+        self.assertIsInstance(first, ibisclient.PersonMethods)
+        self.assertNotIn('getPerson', vars(first))
+
+    def test_call_concurrently(self):
+        """call_concurrently() should return results in the order of the calls."""
+        self.assertEqual(ibis.call_concurrently(lambda: 1, lambda: 2, lambda: 3), [1, 2, 3])
+
+    def test_call_concurrently_exception(self):
+        """call_concurrently() should re-raise exceptions from any call."""
+        with mock.patch('ucamlookup.ibisclient.PersonMethods') as person_methods:
+            person_methods.return_value = MockPersonMethods()
+            methods = ibis.get_person_methods()
+            with self.assertRaises(ibis.IbisAPIException):
+                ibis.call_concurrently(
+                    lambda: 1, lambda: methods.getPerson('crsid', 'test0001'))
+
+    def test_call_concurrently_timeout(self):
+        """call_concurrently() should raise IbisTimeoutException if calls take too long."""
+        event = threading.Event()
+        try:
+            with self.assertRaises(ibis.IbisTimeoutException):
+                ibis.call_concurrently(lambda: 1, event.wait, timeout=0.01)
+        finally:
+            event.set()
+
+    def test_calls_timed(self):
+        """Calls to wrapped methods should be recorded as the "lookup" metric."""
+        with mock.patch('ucamlookup.ibisclient.PersonMethods') as person_methods:
+            person_methods.return_value = MockPersonMethods()
+            with timing.activate(timing.Timings()) as timings:
+                with self.assertRaises(ibis.IbisAPIException):
+                    ibis.get_person_methods().getPerson('crsid', 'test0001')
+        self.assertEqual(timings.counts['lookup'], 1)
+        self.assertEqual(timings.details['lookup'], ['getPerson'])
+
+    def test_call_concurrently_timed(self):
+        """call_concurrently() should make the caller's recorder current for every call."""
+        with timing.activate(timing.Timings()) as timings:
+            results = ibis.call_concurrently(timing.get_current, timing.get_current)
+        self.assertEqual(results, [timings, timings])
+
 
 class MockPersonMethods:
     """A mock PersonMethods-like class which simply raises IbisException for all methods."""
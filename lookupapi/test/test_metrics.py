@@ -0,0 +1,63 @@
+"""
+Test the Prometheus metrics endpoint.
+
+"""
+from unittest import mock
+
+from django.test import TestCase
+from ucamlookup import ibisclient
+
+from lookupapi import cache, ibis, metrics
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        cache.get_response_cache().clear()
+
+    def sample(self, name, labels):
+        """Return the current value of a sample from the default registry."""
+        return metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_update_stats(self):
+        """update_stats() should add the increase in cache counters since the last update."""
+        labels = {'cache': 'response', 'event': 'misses'}
+        metrics.update_stats()
+        before = self.sample('lookupproxy_cache_events_total', labels)
+        cache.get_response_cache().get(('missing',))
+        cache.get_response_cache().get(('missing',))
+        metrics.update_stats()
+        self.assertEqual(self.sample('lookupproxy_cache_events_total', labels), before + 2)
+        metrics.update_stats()
+        self.assertEqual(self.sample('lookupproxy_cache_events_total', labels), before + 2)
+
+    def test_update_stats_interval(self):
+        """update_stats() should do nothing if called again within the minimum interval."""
+        labels = {'cache': 'response', 'event': 'misses'}
+        metrics.update_stats()
+        before = self.sample('lookupproxy_cache_events_total', labels)
+        cache.get_response_cache().get(('missing',))
+        metrics.update_stats(min_interval=3600)
+        self.assertEqual(self.sample('lookupproxy_cache_events_total', labels), before)
+
+    def test_lookup_calls(self):
+        """Calls to Lookup should be timed by method and errors counted by code."""
+        duration_labels = {'method': 'getPerson'}
+        error_labels = {'code': '404'}
+        calls = self.sample('lookupproxy_lookup_call_duration_seconds_count', duration_labels)
+        errors = self.sample('lookupproxy_lookup_errors_total', error_labels)
+        with mock.patch('ucamlookup.ibisclient.PersonMethods') as person_methods:
+            person_methods.return_value = MockPersonMethods()
+            with self.assertRaises(ibis.IbisAPIException):
+                ibis.get_person_methods().getPerson('crsid', 'x')
+        self.assertEqual(
+            self.sample('lookupproxy_lookup_call_duration_seconds_count', duration_labels),
+            calls + 1)
+        self.assertEqual(self.sample('lookupproxy_lookup_errors_total', error_labels), errors + 1)
+
+
+class MockPersonMethods:
+    """A mock PersonMethods-like class which raises a not found IbisException."""
+    def getPerson(self, scheme, identifier, fetch=None):
+        error = ibisclient.IbisError()
+        error.code = 404
+        raise ibisclient.IbisException(error)
@@ -2,6 +2,8 @@
 Test custom DRF permissions
 
 """
+from unittest import mock
+
 from django.http import HttpRequest
 from django.test import TestCase
 from rest_framework.request import Request
@@ -39,6 +41,31 @@ class HasScopesTest(TestCase):
         self.request.auth = {'scope': 'SCOPEA SCOPEB SCOPEC'}
         self.assertTrue(self.has_permission())
 
+    def test_requirement_cached(self):
+        """Required scopes are compiled once per view class."""
+        self.view = type('View', (HasScopesTest.MockView,), {})()
+        self.request.auth = {'scope': 'SCOPEA SCOPEB'}
+        with mock.patch('lookupapi.permissions.compile_scopes') as compile_scopes:
+            compile_scopes.return_value.return_value = True
+            self.has_permission()
+            self.has_permission()
+        compile_scopes.assert_called_once_with(['SCOPEA', 'SCOPEB'])
+
+    def test_instance_scopes(self):
+        """Required scopes set on a view instance are used."""
+        self.view.required_scopes = ['SCOPEC']
+        self.request.auth = {'scope': 'SCOPEA SCOPEB'}
+        self.assertFalse(self.has_permission())
+        self.request.auth = {'scope': 'SCOPEC'}
+        self.assertTrue(self.has_permission())
+
+    def test_granted_scopes(self):
+        """Parsed granted scopes carried by the token are used."""
+        auth = self.request.auth = mock.MagicMock(spec=dict)
+        auth.granted_scopes = frozenset(['SCOPEA', 'SCOPEB'])
+        self.assertTrue(self.has_permission())
+        auth.get.assert_not_called()
+
     def has_permission(self):
         """
         Convenience method to return the has_permission() method value when evaluated on the
@@ -50,3 +77,35 @@ class HasScopesTest(TestCase):
     class MockView:
         """A mock view class which defines two required scopes."""
         required_scopes = ['SCOPEA', 'SCOPEB']
+
+
+class ScopeExpressionTest(TestCase):
+    def check(self, requirement, scope):
+        """Return True if the space separated *scope* satisfies *requirement*."""
+        return permissions.compile_scopes(requirement)(permissions.parse_scopes(scope))
+
+    def test_all_of(self):
+        """A list or AllOf requires every scope."""
+        for requirement in (['A', 'B'], permissions.AllOf('A', 'B')):
+            self.assertTrue(self.check(requirement, 'A B C'))
+            self.assertFalse(self.check(requirement, 'A C'))
+
+    def test_any_of(self):
+        """AnyOf requires at least one scope."""
+        requirement = permissions.AnyOf('A', 'B')
+        self.assertTrue(self.check(requirement, 'B'))
+        self.assertFalse(self.check(requirement, 'C'))
+        self.assertFalse(self.check(requirement, ''))
+
+    def test_nested(self):
+        """Expressions may be nested in lists and other expressions."""
+        requirement = ['A', permissions.AnyOf('B', permissions.AllOf('C', 'D'))]
+        self.assertTrue(self.check(requirement, 'A B'))
+        self.assertTrue(self.check(requirement, 'A C D'))
+        self.assertFalse(self.check(requirement, 'A C'))
+        self.assertFalse(self.check(requirement, 'B C D'))
+
+    def test_single_scope(self):
+        """A single scope may be required."""
+        self.assertTrue(self.check('A', 'A B'))
+        self.assertFalse(self.check('A', 'B'))
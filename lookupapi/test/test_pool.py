@@ -0,0 +1,65 @@
+"""
+Test the Lookup connection pool.
+
+"""
+from unittest import mock
+
+from django.test import TestCase
+
+from lookupapi import pool
+
+
+class ConnectionPoolTests(TestCase):
+    def setUp(self):
+        self.factory = mock.MagicMock(side_effect=lambda: mock.MagicMock())
+        self.pool = pool.ConnectionPool(self.factory, max_size=2, idle_timeout=60)
+
+    def test_reuse(self):
+        """A released connection is re-used by the next acquire."""
+        connection = self.pool.acquire()
+        self.pool.release(connection)
+        self.assertIs(self.pool.acquire(), connection)
+        self.assertEqual(self.factory.call_count, 1)
+        stats = self.pool.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['handshakes'], 1)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_max_size(self):
+        """No more than max_size idle connections are retained."""
+        connections = [self.pool.acquire() for _ in range(3)]
+        for connection in connections:
+            self.pool.release(connection)
+        stats = self.pool.stats()
+        self.assertEqual(stats['idle'], 2)
+        self.assertEqual(stats['evictions'], 1)
+        connections[2].session.close.assert_called_once_with()
+
+    def test_idle_eviction(self):
+        """Connections idle for longer than idle_timeout are evicted."""
+        with mock.patch('time.monotonic', return_value=1000):
+            connection = self.pool.acquire()
+            self.pool.release(connection)
+        with mock.patch('time.monotonic', return_value=1061):
+            self.assertIsNot(self.pool.acquire(), connection)
+        self.assertEqual(self.pool.stats()['evictions'], 1)
+        connection.session.close.assert_called_once_with()
+
+    def test_unhealthy_discarded(self):
+        """Connections which raise while borrowed are not returned to the pool."""
+        with self.assertRaises(RuntimeError):
+            with self.pool.connection():
+                raise RuntimeError()
+        stats = self.pool.stats()
+        self.assertEqual(stats['idle'], 0)
+        self.assertEqual(stats['discards'], 1)
+        self.assertEqual(stats['in_use'], 0)
+
+    def test_pooled_connection(self):
+        """PooledConnection borrows a connection for each call."""
+        pooled = pool.PooledConnection(self.pool)
+        pooled.invoke_method('GET', '/api/v1/person/crsid/spqr2')
+        pooled.invoke_method('GET', '/api/v1/person/crsid/spqr2')
+        self.assertEqual(self.factory.call_count, 1)
+        self.assertEqual(self.pool.stats()['hits'], 1)
@@ -0,0 +1,107 @@
+"""
+Test in-memory snapshots.
+
+"""
+import threading
+from unittest import mock
+
+from django.test import TestCase
+
+from lookupapi import snapshots
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.loader = mock.MagicMock(side_effect=['first', 'second'])
+        self.snapshot = snapshots.Snapshot('test', self.loader)
+        self.executor = mock.MagicMock()
+        self.executor_patch = mock.patch(
+            'lookupapi.ibis.get_executor', return_value=self.executor)
+        self.executor_patch.start()
+
+    def tearDown(self):
+        self.executor_patch.stop()
+        snapshots._registry.remove(self.snapshot)
+
+    def test_load_once(self):
+        """The snapshot is loaded on first use and then re-used."""
+        with self.settings(LOOKUP_API_SNAPSHOT_INTERVALS={'test': 60}):
+            self.assertEqual(self.snapshot.get(), 'first')
+            self.assertEqual(self.snapshot.get(), 'first')
+        self.assertEqual(self.loader.call_count, 1)
+
+    def test_concurrent_load(self):
+        """Concurrent first uses share a single load which does not block other access."""
+        started, finish = threading.Event(), threading.Event()
+
+        def loader():
+            started.set()
+            finish.wait(5)
+            return 'first'
+
+        self.snapshot.loader = loader
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.snapshot.get()))
+            for _ in range(2)
+        ]
+        threads[0].start()
+        started.wait(5)
+        threads[1].start()
+        # The snapshot may be inspected while it is loading.
+        self.assertEqual(self.snapshot.stats()['loads'], 0)
+        self.assertIsNone(self.snapshot.get(load=False))
+        finish.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, ['first', 'first'])
+        self.assertEqual(self.snapshot.stats()['loads'], 1)
+
+    def test_background_refresh(self):
+        """An old snapshot is returned while it is refreshed in the background."""
+        with self.settings(LOOKUP_API_SNAPSHOT_INTERVALS={'test': 60}):
+            with mock.patch('time.monotonic', return_value=1000):
+                self.snapshot.get()
+            with mock.patch('time.monotonic', return_value=1061):
+                self.assertEqual(self.snapshot.get(), 'first')
+                self.assertEqual(self.snapshot.get(), 'first')
+                self.assertEqual(self.executor.submit.call_count, 1)
+                self.executor.submit.call_args[0][0]()
+                self.assertEqual(self.snapshot.get(), 'second')
+
+    def test_preload(self):
+        """Pre-loading submits a load for each snapshot."""
+        with self.settings(LOOKUP_API_SNAPSHOT_PRELOAD=True):
+            snapshots.preload()
+        self.assertIn(
+            mock.call(mock.ANY, self.snapshot), self.executor.submit.call_args_list)
+        with self.settings(LOOKUP_API_SNAPSHOT_PRELOAD=False):
+            self.executor.reset_mock()
+            snapshots.preload()
+        self.executor.submit.assert_not_called()
+
+    def test_preload_hook(self):
+        """Snapshots are pre-loaded by the gunicorn hook run in each worker process."""
+        from lookupproxy import gunicornconf
+        with mock.patch('lookupapi.snapshots.preload') as preload:
+            gunicornconf.post_worker_init(mock.MagicMock())
+        preload.assert_called_once_with()
+
+    def test_load_in_background(self):
+        """A snapshot which has not been loaded may be loaded in the background."""
+        self.assertFalse(self.snapshot.is_loaded())
+        self.snapshot.load_in_background()
+        self.snapshot.load_in_background()
+        self.assertEqual(self.executor.submit.call_count, 1)
+        self.executor.submit.call_args[0][0]()
+        self.assertTrue(self.snapshot.is_loaded())
+        self.assertEqual(self.snapshot.get(load=False), 'first')
+
+    def test_fork(self):
+        """A forked process keeps a loaded value but not a refresh running in its parent."""
+        self.snapshot.load()
+        self.snapshot.load_in_background()
+        with mock.patch('os.getpid', return_value=self.snapshot._pid + 1):
+            self.assertEqual(self.snapshot.get(load=False), 'first')
+            self.snapshot.load_in_background()
+        self.assertEqual(self.executor.submit.call_count, 2)
@@ -0,0 +1,63 @@
+"""
+Test request timing and the Server-Timing header.
+
+"""
+from django.test import TestCase
+
+from lookupapi import timing
+
+
+class TimingsTest(TestCase):
+    def test_timed(self):
+        """timed() should record the count and duration of each metric."""
+        with timing.activate(timing.Timings()) as timings:
+            with timing.timed('lookup', 'getPerson'):
+                pass
+            with timing.timed('lookup', 'getGroup'):
+                pass
+        self.assertEqual(timings.counts['lookup'], 2)
+        self.assertGreaterEqual(timings.durations['lookup'], 0)
+        self.assertEqual(timings.details['lookup'], ['getPerson', 'getGroup'])
+
+    def test_timed_exception(self):
+        """timed() should record the time taken even if the body raises an exception."""
+        with timing.activate(timing.Timings()) as timings:
+            with self.assertRaises(ValueError):
+                with timing.timed('auth'):
+                    raise ValueError()
+        self.assertEqual(timings.counts['auth'], 1)
+
+    def test_no_recorder(self):
+        """timed() should do nothing if there is no current recorder."""
+        self.assertIsNone(timing.get_current())
+        with timing.timed('auth'):
+            pass
+
+    def test_activate_restores(self):
+        """activate() should restore the previous recorder on exit."""
+        outer, inner = timing.Timings(), timing.Timings()
+        with timing.activate(outer):
+            with timing.activate(inner):
+                self.assertIs(timing.get_current(), inner)
+            self.assertIs(timing.get_current(), outer)
+        self.assertIsNone(timing.get_current())
+
+    def test_server_timing(self):
+        """The Server-Timing header should report recorded metrics in milliseconds."""
+        timings = timing.Timings()
+        timings.record('auth', 0.002)
+        timings.record('lookup', 0.1, 'getPerson')
+        timings.record('lookup', 0.05, 'getGroup')
+        self.assertEqual(
+            timings.server_timing(0.2),
+            'auth;desc="Authentication";dur=2.0, lookup;desc="Lookup (2 calls)";dur=150.0, '
+            'total;dur=200.0')
+
+    def test_as_dict(self):
+        """as_dict() should report metrics, counts and call details."""
+        timings = timing.Timings()
+        timings.record('lookup', 0.1, 'getPerson')
+        self.assertEqual(timings.as_dict(0.2), {
+            'total_ms': 200.0, 'lookup_ms': 100.0, 'lookup_count': 1,
+            'lookup_calls': ['getPerson'],
+        })
@@ -2,14 +2,19 @@
 Test API views.
 
 """
+import concurrent.futures
+import json
 import urllib.parse
 from unittest import mock
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from drf_yasg import codecs
+from drf_yasg.generators import OpenAPISchemaGenerator
 from ucamlookup import ibisclient
 
+from lookupapi import cache, content, ibis, snapshots, views
 from lookupapi.views import REQUIRED_SCOPES
 
 
@@ -24,6 +29,11 @@ class ViewTestCase:
     default_query = None
 
     def setUp(self):
+        # Start each test with an empty response cache and no snapshots
+        cache.get_response_cache().clear()
+        snapshots.clear()
+        views.clear_schema_cache()
+
         # Patch Lookup api get-ers
         self.get_person_methods_patch = mock.patch('lookupapi.ibis.get_person_methods')
         self.get_person_methods = self.get_person_methods_patch.start()
@@ -109,6 +119,104 @@ class PersonByCRSIDTest(AuthenticatedViewTestCase, TestCase):
         data = response.json()
         self.assertEqual(data.get('displayName'), person.displayName)
 
+    def test_cached(self):
+        """A second request for the same person is served from the cache."""
+        self.get_person_methods.return_value.getPerson.return_value = self.create_person()
+        first, second = self.get(), self.get()
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(self.get_person_methods.return_value.getPerson.call_count, 1)
+
+    def test_cached_per_fetch(self):
+        """Requests with different fetch parameters are cached separately."""
+        self.get_person_methods.return_value.getPerson.return_value = self.create_person()
+        self.get({'fetch': 'email,all_groups'})
+        self.get({'fetch': 'all_groups, email'})
+        self.assertEqual(self.get_person_methods.return_value.getPerson.call_count, 1)
+        self.get()
+        self.assertEqual(self.get_person_methods.return_value.getPerson.call_count, 2)
+
+    def test_not_found_not_cached(self):
+        """A 404 response is not cached."""
+        self.get_person_methods.return_value.getPerson.return_value = None
+        self.assertEqual(self.get().status_code, 404)
+        self.get_person_methods.return_value.getPerson.return_value = self.create_person()
+        self.assertEqual(self.get().status_code, 200)
+
+    def test_cache_disabled(self):
+        """Setting a cache timeout of 0 disables caching."""
+        self.get_person_methods.return_value.getPerson.return_value = self.create_person()
+        with self.settings(LOOKUP_API_CACHE_TIMEOUTS={'person': 0}):
+            self.get()
+            self.get()
+        self.assertEqual(self.get_person_methods.return_value.getPerson.call_count, 2)
+
+    def test_etag(self):
+        """The response has an ETag and a matching If-None-Match gives a 304."""
+        self.get_person_methods.return_value.getPerson.return_value = self.create_person()
+        etag = self.get()['ETag']
+        url = reverse(self.view_name, kwargs=self.view_kwargs)
+        with mock.patch('lookupapi.fastserializers.serialize') as mock_serialize:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        mock_serialize.assert_not_called()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_etag_not_cached(self):
+        """Responses which are not cached have an ETag computed from their body."""
+        self.get_person_methods.return_value.getPerson.return_value = self.create_person()
+        with self.settings(LOOKUP_API_CACHE_TIMEOUTS={'person': 0}):
+            etag = self.get()['ETag']
+            response = self.client.get(
+                reverse(self.view_name, kwargs=self.view_kwargs), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(LOOKUP_API_CACHE_CONTROL={'person-detail': 'private, max-age=60'})
+    def test_cache_control(self):
+        """A configured Cache-Control policy is applied and responses vary by token."""
+        self.get_person_methods.return_value.getPerson.return_value = self.create_person()
+        response = self.get()
+        self.assertEqual(response['Cache-Control'], 'private, max-age=60')
+        self.assertIn('Authorization', response['Vary'])
+
+    @override_settings(LOOKUP_API_CACHE_CONTROL={'person-detail': 'private, max-age=60'})
+    def test_cache_control_not_found(self):
+        """A Cache-Control policy is not applied to error responses."""
+        self.get_person_methods.return_value.getPerson.return_value = None
+        self.assertFalse(self.get().has_header('Cache-Control'))
+
+    @override_settings(LOOKUP_API_TIMING=True)
+    def test_server_timing(self):
+        """Timing reports authentication, serialisation and rendering."""
+        self.get_person_methods.return_value.getPerson.return_value = self.create_person()
+        with self.assertLogs('lookupapi.timing', 'INFO') as logs:
+            response = self.get()
+        server_timing = response['Server-Timing']
+        for name in ('auth', 'serialize', 'render', 'total'):
+            self.assertIn(name + ';', server_timing)
+        self.assertIn('url_name=person-detail', logs.output[0])
+        self.assertIn('status=200', logs.output[0])
+
+    def test_server_timing_disabled(self):
+        """Timing is not reported by default."""
+        self.get_person_methods.return_value.getPerson.return_value = self.create_person()
+        self.assertFalse(self.get().has_header('Server-Timing'))
+
+    @override_settings(LOOKUP_API_BINARY_CONTENT_LINKS=True)
+    def test_binary_content_links(self):
+        """Binary attribute data may be replaced by a link to the content endpoint."""
+        person = self.create_person()
+        attribute = ibisclient.IbisAttribute({'scheme': 'jpegPhoto'})
+        attribute.binaryData = b'\xff\xd8\xffphoto'
+        person.attributes = [attribute]
+        self.get_person_methods.return_value.getPerson.return_value = person
+        data = self.get({'fetch': 'jpegPhoto'}).json()['attributes'][0]
+        self.assertIsNone(data['binaryData'])
+        response = self.client.get(data['binaryDataUrl'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'\xff\xd8\xffphoto')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
     def create_person(self):
         person = ibisclient.IbisPerson()
         person.displayName = 'Testing1'
@@ -144,6 +252,30 @@ class PersonMockedTest(AuthenticatedViewTestCase, TestCase):
         self.assertEqual(data['identifier']['scheme'], "mock")
         self.assertFalse(data['isStaff'])
 
+    def test_template_cached(self):
+        """Mock people are generated from a single cached copy of the test user."""
+        person = self.create_person()
+        self.get_person_methods.return_value.getPerson.return_value = person
+        for identifier in ('test0005', 'test0006', 'test0405'):
+            self.view_kwargs = {'scheme': 'mock', 'identifier': identifier}
+            self.assertEqual(self.get().json()['identifier']['value'], identifier)
+        self.get_person_methods.return_value.getPerson.assert_called_once_with(
+            'crsid', 'mug99', None)
+        self.assertEqual(person.identifier.value, 'mug99')
+        self.assertIsNone(person.misAffiliation)
+
+    def test_template_cached_per_fetch(self):
+        """The test user is cached separately for each fetch parameter."""
+        self.get_person_methods.return_value.getPerson.return_value = self.create_person()
+        self.get()
+        self.get({'fetch': 'email'})
+        self.assertEqual(self.get_person_methods.return_value.getPerson.call_count, 2)
+
+    def test_template_not_found(self):
+        """If the test user does not exist, mock people are not found."""
+        self.get_person_methods.return_value.getPerson.return_value = None
+        self.assertEqual(self.get().status_code, 404)
+
     def create_person(self):
         person = ibisclient.IbisPerson()
         person.displayName = 'Testing1'
@@ -171,6 +303,66 @@ class PersonSelfTest(AuthenticatedViewTestCase, TestCase):
         return person
 
 
+class PersonBatchTest(AuthenticatedViewTestCase, TestCase):
+    view_name = 'person-batch'
+    default_body = {'identifiers': ['spqr1']}
+
+    def setUp(self):
+        super().setUp()
+        self.list_people = self.get_person_methods.return_value.listPeople
+        self.list_people.return_value = []
+
+    def test_results_in_order(self):
+        """Results are returned in request order with 404s for missing people."""
+        self.list_people.return_value = [self.create_person('spqr1'), self.create_person('spqr3')]
+        response = self.post({'identifiers': ['spqr3', 'spqr2', 'SPQR1'], 'fetch': 'email'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([r['identifier'] for r in results], ['spqr3', 'spqr2', 'SPQR1'])
+        self.assertEqual([r['status'] for r in results], [200, 404, 200])
+        self.assertEqual(results[0]['person']['displayName'], 'spqr3 USER')
+        self.assertIsNone(results[1]['person'])
+        self.list_people.assert_called_once_with('spqr3,spqr2,spqr1', 'email')
+
+    def test_chunked(self):
+        """Identifiers are fetched from Lookup in chunks."""
+        with self.settings(LOOKUP_API_BATCH_CHUNK_SIZE=2):
+            self.post({'identifiers': ['a', 'b', 'c', 'd', 'e']})
+        self.assertEqual(
+            sorted(c[0][0] for c in self.list_people.call_args_list), ['a,b', 'c,d', 'e'])
+
+    def test_cached(self):
+        """People already cached are not fetched again."""
+        self.list_people.return_value = [self.create_person('spqr1')]
+        self.post({'identifiers': ['spqr1']})
+        self.list_people.return_value = []
+        response = self.post({'identifiers': ['spqr1', 'spqr2']})
+        self.assertEqual([r['status'] for r in response.json()['results']], [200, 404])
+        self.list_people.assert_called_with('spqr2', None)
+
+    def test_too_many_identifiers(self):
+        """Requesting too many identifiers is a bad request."""
+        with self.settings(LOOKUP_API_BATCH_MAX_IDENTIFIERS=2):
+            self.assertEqual(self.post({'identifiers': ['a', 'b', 'c']}).status_code, 400)
+
+    def get(self, query=None):
+        """The batch endpoint only supports POST so make the inherited tests POST."""
+        return self.post(self.default_body)
+
+    def post(self, body):
+        """HTTP POST a JSON body to this view."""
+        return self.client.post(
+            reverse(self.view_name), json.dumps(body), content_type='application/json')
+
+    def create_person(self, crsid):
+        person = ibisclient.IbisPerson()
+        person.displayName = '{} USER'.format(crsid)
+        person.identifier = ibisclient.IbisIdentifier({'scheme': 'crsid', 'value': crsid})
+        # IbisIdentifier takes its value from element text rather than the attributes
+        person.identifier.value = crsid
+        return person
+
+
 class PersonListTest(AuthenticatedViewTestCase, TestCase):
     view_name = 'person-list'
     default_query = {'query': 'xxx'}
@@ -188,6 +380,144 @@ class PersonListTest(AuthenticatedViewTestCase, TestCase):
         self.assertEqual(data.get('results'), [])
         self.assertEqual(data.get('count'), 0)
 
+    def test_search_and_count(self):
+        """Both search and searchCount are called with the query."""
+        self.set_return_value([self.create_person('spqr2')])
+        response = self.get({'query': 'xxx', 'limit': 10})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(len(data['results']), 1)
+        methods = self.get_person_methods.return_value
+        methods.searchCount.assert_called_once_with(
+            query='xxx', approxMatches=False, includeCancelled=False, misStatus=None,
+            attributes=None)
+        methods.search.assert_called_once_with(
+            query='xxx', approxMatches=False, includeCancelled=False, misStatus=None,
+            attributes=None, offset=0, limit=10, fetch=None, orderBy='surname')
+
+    def test_count_error(self):
+        """Lookup errors from searchCount are reported as before."""
+        self.get_person_methods.return_value.searchCount.side_effect = ibis.IbisAPIException(
+            ibisclient.IbisException(ibisclient.IbisError()))
+        self.assertEqual(self.get().status_code, 500)
+
+    def test_next(self):
+        """A link to the next page of results is returned if there are more results."""
+        self.get_person_methods.return_value.searchCount.return_value = 3
+        data = self.get({'query': 'xxx', 'limit': 2}).json()
+        self.assertIn('cursor=', data['next'])
+        self.assertEqual(
+            self.get({'query': 'xxx', 'limit': 2, 'offset': 2}).json()['next'], None)
+
+    @override_settings(LOOKUP_API_CACHE_TIMEOUTS={})
+    def test_cursor(self):
+        """Following the next link does not count the results again."""
+        methods = self.get_person_methods.return_value
+        methods.searchCount.return_value = 5
+        next_url = self.get({'query': 'xxx', 'limit': 2, 'offset': 0}).json()['next']
+        self.assertNotIn('offset=', next_url)
+        data = self.client.get(next_url).json()
+        self.assertEqual(data['offset'], 2)
+        self.assertEqual(data['count'], 5)
+        self.assertIn('cursor=', data['next'])
+        methods.searchCount.assert_called_once()
+        methods.search.assert_called_with(
+            query='xxx', approxMatches=False, includeCancelled=False, misStatus=None,
+            attributes=None, offset=2, limit=2, fetch=None, orderBy='surname')
+
+    def test_no_prefetch(self):
+        """By default, no further page is fetched."""
+        methods = self.get_person_methods.return_value
+        methods.searchCount.return_value = 5
+        with mock.patch('lookupapi.ibis.get_prefetch_executor') as get_executor:
+            next_url = self.get({'query': 'xxx', 'limit': 2}).json()['next']
+            self.client.get(next_url)
+        self.assertEqual(methods.search.call_count, 2)
+        get_executor.assert_not_called()
+
+    @override_settings(LOOKUP_API_SEARCH_PREFETCH=True)
+    def test_cursor_prefetch(self):
+        """The page after one requested with a cursor is fetched in the background."""
+        methods = self.get_person_methods.return_value
+        methods.searchCount.return_value = 5
+        with mock.patch('lookupapi.ibis.get_prefetch_executor') as get_executor:
+            get_executor.return_value.submit.side_effect = self.submit
+            next_url = self.get({'query': 'xxx', 'limit': 2}).json()['next']
+            next_url = self.client.get(next_url).json()['next']
+            self.assertEqual(methods.search.call_count, 3)
+            self.assertEqual(methods.search.call_args[1]['offset'], 4)
+            data = self.client.get(next_url).json()
+        self.assertEqual(data['offset'], 4)
+        self.assertIsNone(data['next'])
+        self.assertEqual(methods.search.call_count, 3)
+
+    @override_settings(LOOKUP_API_SEARCH_PREFETCH=True)
+    def test_first_page_prefetch(self):
+        """The second page is fetched in the background when the first page is requested."""
+        methods = self.get_person_methods.return_value
+        methods.searchCount.return_value = 5
+        with mock.patch('lookupapi.ibis.get_prefetch_executor') as get_executor:
+            get_executor.return_value.submit.side_effect = self.submit
+            next_url = self.get({'query': 'xxx', 'limit': 2}).json()['next']
+            self.assertEqual(methods.search.call_count, 2)
+            self.assertEqual(methods.search.call_args[1]['offset'], 2)
+            get_executor.return_value.submit.side_effect = None
+            get_executor.return_value.submit.reset_mock()
+            data = self.client.get(next_url).json()
+        self.assertEqual(data['offset'], 2)
+        # Page two came from the cache and only the prefetch of page three was submitted.
+        self.assertEqual(methods.search.call_count, 2)
+        get_executor.return_value.submit.assert_called_once()
+
+    def test_etag(self):
+        """Search results have an ETag and a matching If-None-Match gives a 304."""
+        etag = self.get()['ETag']
+        response = self.client.get(
+            reverse(self.view_name) + '?query=xxx', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(LOOKUP_API_CACHE_TIMEOUTS={}, LOOKUP_API_SEARCH_CURSOR_MAX_AGE=3600)
+    def test_cursor_etag(self):
+        """The same page has the same next link, and so the same ETag, a second later."""
+        self.get_person_methods.return_value.searchCount.return_value = 5
+        with mock.patch('time.time', return_value=36000):
+            response = self.get({'query': 'xxx', 'limit': 2})
+            next_url = response.json()['next']
+            page_two = self.client.get(next_url)
+        with mock.patch('time.time', return_value=36001):
+            self.assertEqual(self.get({'query': 'xxx', 'limit': 2}).json()['next'], next_url)
+            response = self.client.get(next_url, HTTP_IF_NONE_MATCH=page_two['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(LOOKUP_API_SEARCH_CURSOR_MAX_AGE=3600)
+    def test_cursor_expiry(self):
+        """A cursor is rejected once the period after the one it was created in has ended."""
+        self.get_person_methods.return_value.searchCount.return_value = 5
+        with mock.patch('time.time', return_value=36000):
+            next_url = self.get({'query': 'xxx', 'limit': 2}).json()['next']
+        with mock.patch('time.time', return_value=36000 + 7199):
+            self.assertEqual(self.client.get(next_url).status_code, 200)
+        with mock.patch('time.time', return_value=36000 + 7200):
+            self.assertEqual(self.client.get(next_url).status_code, 400)
+
+    def test_invalid_cursor(self):
+        """An invalid cursor is rejected."""
+        self.assertEqual(self.get({'query': 'xxx', 'cursor': 'invalid'}).status_code, 400)
+
+    def test_cursor_other_query(self):
+        """A cursor for a different query is rejected."""
+        self.get_person_methods.return_value.searchCount.return_value = 5
+        next_url = self.get({'query': 'xxx', 'limit': 2}).json()['next']
+        next_url = next_url.replace('query=xxx', 'query=yyy')
+        self.assertEqual(self.client.get(next_url).status_code, 400)
+
+    def submit(self, f, *args, **kwargs):
+        """Run a function submitted to the executor immediately."""
+        future = concurrent.futures.Future()
+        future.set_result(f(*args, **kwargs))
+        return future
+
     def set_return_value(self, return_value):
         self.get_person_methods.return_value.search.return_value = return_value
         self.get_person_methods.return_value.searchCount.return_value = len(return_value)
@@ -229,21 +559,58 @@ class InstitutionListTest(AuthenticatedViewTestCase, TestCase):
             self.assertEqual(received['name'], expected.name)
             self.assertEqual(received['instid'], expected.instid)
 
+    @override_settings(LOOKUP_API_INSTITUTION_SNAPSHOT=False)
     def test_no_query_params(self):
         """Passing no query passes correct default values to allInsts"""
         self.get()
         self.mocked_allInsts.assert_called_with(includeCancelled=False, fetch=None)
 
+    @override_settings(LOOKUP_API_INSTITUTION_SNAPSHOT=False)
     def test_include_cancelled_param(self):
         """Passing includeCancelled as query is passed to allInsts"""
         self.get({'includeCancelled': 'true'})
         self.mocked_allInsts.assert_called_with(includeCancelled=True, fetch=None)
 
+    @override_settings(LOOKUP_API_INSTITUTION_SNAPSHOT=False)
     def test_fetch_param(self):
         """Passing fetch as query is passed to allInsts"""
         self.get({'fetch': 'foo,bar'})
         self.mocked_allInsts.assert_called_with(includeCancelled=False, fetch='foo,bar')
 
+    def test_snapshot(self):
+        """With the snapshot enabled, all institutions are fetched once."""
+        self.set_return_value([self.create_institution('TESTA')])
+        self.get()
+        self.get({'includeCancelled': 'true', 'fetch': 'foo,bar'})
+        self.mocked_allInsts.assert_called_once_with(includeCancelled=True, fetch=None)
+
+    def test_snapshot_cancelled(self):
+        """Cancelled institutions are only returned if includeCancelled is set."""
+        cancelled = self.create_institution('TESTB')
+        cancelled.cancelled = True
+        self.set_return_value([self.create_institution('TESTA'), cancelled])
+        self.assertEqual(
+            [i['instid'] for i in self.get().json()['results']], ['TESTA'])
+        self.assertEqual(
+            [i['instid'] for i in self.get({'includeCancelled': 'true'}).json()['results']],
+            ['TESTA', 'TESTB'])
+
+    def test_snapshot_etag(self):
+        """The snapshot list has an ETag and a matching If-None-Match gives a 304."""
+        etag = self.get()['ETag']
+        response = self.client.get(reverse(self.view_name), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_snapshot_content_negotiation(self):
+        """The snapshot list is rendered by the negotiated renderer."""
+        self.get()
+        response = self.client.get(reverse(self.view_name), HTTP_ACCEPT='text/html')
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+        response = self.client.get(
+            reverse(self.view_name), HTTP_ACCEPT='application/json; indent=4')
+        self.assertEqual(response.content.decode('utf8'), '{\n    "results": []\n}')
+        self.mocked_allInsts.assert_called_once()
+
     def set_return_value(self, return_value):
         self.mocked_allInsts.return_value = return_value
 
@@ -275,6 +642,50 @@ class GroupTest(AuthenticatedViewTestCase, TestCase):
         print(data)
         self.assertEqual(data.get('name'), group.name)
 
+    @override_settings(LOOKUP_API_STREAMING_RESOURCES=['group'], LOOKUP_API_CACHE_TIMEOUTS={})
+    def test_streaming(self):
+        """Groups may be streamed."""
+        group = self.create_group()
+        group.members = [ibisclient.IbisPerson(), ibisclient.IbisPerson()]
+        for idx, person in enumerate(group.members):
+            person.identifier = ibisclient.IbisIdentifier({'scheme': 'crsid', 'value': None})
+            person.identifier.value = 'spqr{}'.format(idx)
+        self.get_group_methods.return_value.getGroup.return_value = group
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content).decode('utf8'))
+        self.assertEqual(data['name'], group.name)
+        self.assertEqual(
+            [member['identifier']['value'] for member in data['members']], ['spqr0', 'spqr1'])
+
+    @override_settings(LOOKUP_API_STREAMING_RESOURCES=['group'])
+    def test_streaming_not_cached(self):
+        """Streamed groups are not cached even if a cache timeout is set."""
+        group = self.create_group()
+        self.get_group_methods.return_value.getGroup.return_value = group
+        for _ in range(2):
+            response = self.get()
+            self.assertTrue(response.streaming)
+            data = json.loads(b''.join(response.streaming_content).decode('utf8'))
+            self.assertEqual(data['name'], group.name)
+        self.assertEqual(self.get_group_methods.return_value.getGroup.call_count, 2)
+        self.assertEqual(cache.get_response_cache().stats()['entries'], 0)
+
+    @override_settings(LOOKUP_API_STREAMING_RESOURCES=['group'])
+    def test_streaming_no_etag(self):
+        """Streamed groups have no ETag."""
+        self.get_group_methods.return_value.getGroup.return_value = self.create_group()
+        self.assertFalse(self.get().has_header('ETag'))
+
+    def test_etag(self):
+        """Groups which are not streamed have an ETag."""
+        self.get_group_methods.return_value.getGroup.return_value = self.create_group()
+        etag = self.get()['ETag']
+        response = self.client.get(
+            reverse(self.view_name, kwargs=self.view_kwargs), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
     def create_group(self):
         group = ibisclient.IbisGroup()
         group.name = 'Testing1'
@@ -298,12 +709,63 @@ class InstitutionTest(AuthenticatedViewTestCase, TestCase):
         print(data)
         self.assertEqual(data.get('name'), institution.name)
 
+    def test_from_snapshot(self):
+        """A loaded institution snapshot is used when the fetch parameter matches."""
+        institution = self.create_institution()
+        institution.instid = '102030'
+        self.get_institution_methods.return_value.allInsts.return_value = [institution]
+        views.institution_directory.load()
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], institution.name)
+        self.get_institution_methods.return_value.getInst.assert_not_called()
+
+        self.get_institution_methods.return_value.getInst.return_value = institution
+        self.get({'fetch': 'all_members'})
+        self.get_institution_methods.return_value.getInst.assert_called_once_with(
+            '102030', 'all_members')
+
     def create_institution(self):
         institution = ibisclient.IbisInstitution()
         institution.name = 'Testing1'
         return institution
 
 
+class AttributeContentTest(AuthenticatedViewTestCase, TestCase):
+    view_name = 'attribute-content'
+
+    def setUp(self):
+        super().setUp()
+        content.get_content_cache().clear()
+        self.view_kwargs = {'digest': content.store(b'\xff\xd8\xffphoto')}
+
+    def test_content(self):
+        """Stored content is returned with an ETag and Cache-Control header."""
+        response = self.get()
+        self.assertEqual(response.content, b'\xff\xd8\xffphoto')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['ETag'], '"{}"'.format(self.view_kwargs['digest']))
+        self.assertIn('max-age', response['Cache-Control'])
+
+    def test_any_accept(self):
+        """The Accept header is ignored."""
+        response = self.client.get(
+            reverse(self.view_name, kwargs=self.view_kwargs), HTTP_ACCEPT='image/jpeg')
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified(self):
+        """A matching If-None-Match header gives a 304."""
+        response = self.client.get(
+            reverse(self.view_name, kwargs=self.view_kwargs),
+            HTTP_IF_NONE_MATCH='"{}"'.format(self.view_kwargs['digest']))
+        self.assertEqual(response.status_code, 304)
+
+    def test_not_found(self):
+        """Content which is not stored is not found."""
+        self.view_kwargs = {'digest': '0' * 64}
+        self.assertEqual(self.get().status_code, 404)
+
+
 class SwaggerAPITest(ViewTestCase, TestCase):
     view_name = 'schema-json'
     view_kwargs = {'format': '.json'}
@@ -314,6 +776,30 @@ class SwaggerAPITest(ViewTestCase, TestCase):
         self.assertIn('securityDefinitions', spec)
         self.assertIn('oauth2', spec['securityDefinitions'])
 
+    @override_settings(LOOKUP_API_CACHE_CONTROL={'person-detail': 'private, max-age=60'})
+    def test_cache_control_headers(self):
+        """Configured Cache-Control policies are documented."""
+        paths = self.get_spec()['paths']
+        headers = paths['/people/{scheme}/{identifier}']['get']['responses']['200']['headers']
+        self.assertIn('private, max-age=60', headers['Cache-Control']['description'])
+        self.assertIn('Authorization', headers['Vary']['description'])
+        self.assertNotIn('headers', paths['/groups/{groupid}']['get']['responses']['200'])
+
+    def test_schema_cached(self):
+        """The schema is generated and validated once and has an ETag."""
+        with mock.patch.object(
+                OpenAPISchemaGenerator, 'get_schema', autospec=True,
+                side_effect=OpenAPISchemaGenerator.get_schema) as get_schema, \
+                mock.patch.dict('drf_yasg.codecs.VALIDATORS', {'flex': mock.MagicMock()}):
+            validate_flex = codecs.VALIDATORS['flex']
+            first, second = self.get(), self.get()
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(get_schema.call_count, 1)
+        self.assertEqual(validate_flex.call_count, 1)
+        url = reverse(self.view_name, kwargs=self.view_kwargs)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
     def get_spec(self):
         """Return the Swagger (OpenAPI) spec as parsed JSON."""
         response = self.get()
@@ -331,6 +817,14 @@ class PersonAttributesTest(ViewTestCase, TestCase):
         data = response.json()
         self.assertEqual(data.get('results'), [])
 
+    @override_settings(LOOKUP_API_CACHE_CONTROL={'person-attributes': 'public, max-age=3600'})
+    def test_cache_control(self):
+        """A public Cache-Control policy is applied and responses do not vary by token."""
+        self.get_person_methods.return_value.allAttributeSchemes.return_value = []
+        response = self.get()
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        self.assertNotIn('Authorization', response.get('Vary', ''))
+
 
 class InstitutionAttributesTest(ViewTestCase, TestCase):
     view_name = 'institution-attributes'
@@ -342,6 +836,36 @@ class InstitutionAttributesTest(ViewTestCase, TestCase):
         data = response.json()
         self.assertEqual(data.get('results'), [])
 
+    def test_snapshot(self):
+        """Attribute schemes are only fetched once."""
+        self.get_institution_methods.return_value.allAttributeSchemes.return_value = []
+        self.get()
+        self.get()
+        self.assertEqual(
+            self.get_institution_methods.return_value.allAttributeSchemes.call_count, 1)
+
+    def test_etag(self):
+        """The response has an ETag and a matching If-None-Match gives a 304."""
+        self.get_institution_methods.return_value.allAttributeSchemes.return_value = []
+        etag = self.get()['ETag']
+        response = self.client.get(reverse(self.view_name), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(reverse(self.view_name), HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_content_negotiation(self):
+        """Snapshots are rendered by the negotiated renderer when it is not compact JSON."""
+        self.get_institution_methods.return_value.allAttributeSchemes.return_value = []
+        self.get()
+        response = self.client.get(
+            reverse(self.view_name), HTTP_ACCEPT='application/json; indent=4')
+        self.assertEqual(response.content.decode('utf8'), '{\n    "results": []\n}')
+        response = self.client.get(reverse(self.view_name), HTTP_ACCEPT='text/html')
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+        self.assertEqual(
+            self.get_institution_methods.return_value.allAttributeSchemes.call_count, 1)
+
 
 class HealthTest(ViewTestCase, TestCase):
     view_name = 'healthz'
@@ -349,3 +873,23 @@ class HealthTest(ViewTestCase, TestCase):
     def test_gettable(self):
         """Health check endpoint should return 200 status."""
         self.assertEqual(self.get().status_code, 200)
+
+
+class MetricsTest(ViewTestCase, TestCase):
+    view_name = 'metrics'
+
+    @override_settings(LOOKUP_API_METRICS=True, LOOKUP_API_HEALTH_PATH=None)
+    def test_metrics(self):
+        """Metrics should count requests by URL name and include cache and pool metrics."""
+        self.client.get(reverse('healthz'))
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode('utf8')
+        self.assertIn(
+            'lookupproxy_requests_total{method="GET",status="200",url_name="healthz"}', body)
+        self.assertIn('lookupproxy_cache_entries{cache="response"}', body)
+        self.assertIn('lookupproxy_connection_pool_connections{state="idle"}', body)
+
+    def test_disabled(self):
+        """Metrics should not be served by default."""
+        self.assertEqual(self.get().status_code, 404)
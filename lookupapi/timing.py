@@ -0,0 +1,186 @@
+"""
+Per-request timing of the work done to answer an API request.
+
+When the ``LOOKUP_API_TIMING`` setting is True, :py:class:`~lookupapi.middleware.TimingMiddleware`
+makes a :py:class:`Timings` recorder current for each request. Authentication, calls to Lookup
+made via :py:mod:`~lookupapi.ibis`, serialisation and rendering record how long they take in the
+current recorder using :py:func:`timed`. The totals are reported to the client in a
+``Server-Timing`` header and logged by the ``lookupapi.timing`` logger.
+
+Recording is a no-op in threads which have no current recorder, such as those refreshing cached
+resources in the background.
+
+"""
+import collections
+import contextlib
+import functools
+import logging
+import threading
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+METRICS = collections.OrderedDict([
+    ('auth', 'Authentication'),
+    ('lookup', 'Lookup'),
+    ('serialize', 'Serialisation'),
+    ('render', 'Rendering'),
+])
+"""
+Names and descriptions of the metrics which are recorded, in the order they are reported.
+
+"""
+
+_local = threading.local()
+
+
+class Timings:
+    """
+    A thread-safe record of the number of times each metric was timed and the total time taken by
+    each. Durations are in seconds. Details of individual timings, such as the name of each Lookup
+    method called, are kept for logging.
+
+    """
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counts = collections.Counter()
+        self.durations = collections.Counter()
+        self.details = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, name, duration, detail=None):
+        """Record that metric *name* took *duration* seconds."""
+        with self._lock:
+            self.counts[name] += 1
+            self.durations[name] += duration
+            if detail is not None:
+                self.details[name].append(detail)
+
+    def elapsed(self):
+        """Return the number of seconds since this recorder was created."""
+        return time.monotonic() - self.started
+
+    def server_timing(self, total=None):
+        """
+        Return the value of a ``Server-Timing`` header reporting each recorded metric and the total
+        time *total*, or the elapsed time if *total* is None, in milliseconds. Metrics timed more
+        than once report the number of timings in their description. Since calls to Lookup may be
+        concurrent, the time reported for "lookup" may exceed the total.
+
+        """
+        total = total if total is not None else self.elapsed()
+        entries = []
+        with self._lock:
+            for name, description in METRICS.items():
+                if self.counts[name] == 0:
+                    continue
+                if self.counts[name] > 1:
+                    description = '{} ({} calls)'.format(description, self.counts[name])
+                entries.append('{};desc="{}";dur={:.1f}'.format(
+                    name, description, 1e3 * self.durations[name]))
+        entries.append('total;dur={:.1f}'.format(1e3 * total))
+        return ', '.join(entries)
+
+    def as_dict(self, total=None):
+        """
+        Return a dictionary of the recorded metrics suitable for structured logging. Durations are
+        in milliseconds.
+
+        """
+        total = total if total is not None else self.elapsed()
+        result = {'total_ms': round(1e3 * total, 1)}
+        with self._lock:
+            for name in METRICS:
+                if self.counts[name] == 0:
+                    continue
+                result['{}_ms'.format(name)] = round(1e3 * self.durations[name], 1)
+                result['{}_count'.format(name)] = self.counts[name]
+                if len(self.details[name]) > 0:
+                    result['{}_calls'.format(name)] = list(self.details[name])
+        return result
+
+
+def get_current():
+    """Return the current thread's :py:class:`Timings` recorder or None if there is none."""
+    return getattr(_local, 'timings', None)
+
+
+@contextlib.contextmanager
+def activate(timings):
+    """
+    Context manager which makes the :py:class:`Timings` recorder *timings* current in this thread
+    for the duration of the context. If *timings* is None, no recorder is current.
+
+    """
+    previous = get_current()
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+@contextlib.contextmanager
+def timed(name, detail=None):
+    """
+    Context manager which records the time taken by the body of the context as metric *name* in the
+    current recorder, if any. The time is recorded even if the body raises an exception.
+
+    """
+    timings = get_current()
+    if timings is None:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        timings.record(name, time.monotonic() - start, detail)
+
+
+def timed_function(name, detail=None):
+    """
+    Function or method decorator which records the time taken by each call to the decorated
+    function as metric *name*. See :py:func:`timed`.
+
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with timed(name, detail):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind(f):
+    """
+    Return a callable which calls *f* with the current thread's recorder current. Used to record
+    the timings of work submitted to other threads against the request which submitted it.
+
+    """
+    timings = get_current()
+    if timings is None:
+        return f
+
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        with activate(timings):
+            return f(*args, **kwargs)
+    return wrapper
+
+
+def log(request, response, timings, total):
+    """Log the recorded metrics for a request along with the request and response details."""
+    match = getattr(request, 'resolver_match', None)
+    fields = collections.OrderedDict([
+        ('method', request.method), ('path', request.path),
+        ('url_name', match.url_name if match is not None else None),
+        ('status', response.status_code),
+    ])
+    fields.update(timings.as_dict(total))
+    LOG.info(
+        ' '.join('{}=%s'.format(key) for key in fields),
+        *[','.join(value) if isinstance(value, list) else value for value in fields.values()],
+        extra={'timings': dict(fields)})
@@ -20,9 +20,11 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
 
+from . import health
+from . import metrics
 from . import views
 
-schema_view = get_schema_view(
+schema_view = views.with_cached_schema(get_schema_view(
    openapi.Info(
       title="Lookup API",
       default_version='v1',
@@ -34,10 +36,11 @@ schema_view = get_schema_view(
    validators=['flex', 'ssv'],
    public=True,
    permission_classes=(permissions.AllowAny,),
-)
+))
 """
-A configured drf-yasg schema view. The default URL config renders only the schema document but you
-can use this in your URL config to render a Swagger UI for the API:
+A configured drf-yasg schema view. The schema is generated and validated once and then served from
+memory. See :py:class:`~lookupapi.views.CachedSchemaMixin`. The default URL config renders only
+the schema document but you can use this in your URL config to render a Swagger UI for the API:
 
 .. code::
 
@@ -47,7 +50,7 @@ can use this in your URL config to render a Swagger UI for the API:
 
     urlpatterns = [
         # ...
-        path('ui', schema_view.with_ui('swagger', cache_timeout=None), name='schema-swagger-ui'),
+        path('ui', schema_view.with_ui('swagger'), name='schema-swagger-ui'),
         # ...
     ]
 
@@ -57,6 +60,7 @@ can use this in your URL config to render a Swagger UI for the API:
 urlpatterns = [
     path('attributes/people', views.PersonFetchAttributes.as_view(), name='person-attributes'),
     path('people', views.PersonList.as_view(), name='person-list'),
+    path('people/batch', views.PersonBatch.as_view(), name='person-batch'),
     path('people/<scheme>/<identifier>', views.Person.as_view(), name='person-detail'),
 
     path('groups/<groupid>', views.Group.as_view(), name='group-detail'),
@@ -66,10 +70,13 @@ urlpatterns = [
     path('attributes/institutions', views.InstitutionFetchAttributes.as_view(),
          name='institution-attributes'),
 
+    path('content/<digest>', views.AttributeContent.as_view(), name='attribute-content'),
+
     # See https://stackoverflow.com/questions/43380939/ for why this is "healthz".
     path('healthz', views.Health.as_view(), name='healthz'),
+    path('readyz', health.readiness_view, name='readyz'),
+    path('metrics', metrics.metrics_view, name='metrics'),
 
     # Schema documents
-    re_path(r'^swagger(?P<format>.json|.yaml)$', schema_view.without_ui(cache_timeout=None),
-            name='schema-json'),
+    re_path(r'^swagger(?P<format>.json|.yaml)$', schema_view.without_ui(), name='schema-json'),
 ]
@@ -2,16 +2,37 @@
 Views for :py:mod:`lookupapi`.
 
 """
+import base64
+import collections
+import copy
+import functools
+import hashlib
+import itertools
+import json
+import re
+import time
+
+from django.conf import settings
+from django.core import signing
 from django.http import Http404
 from django.utils.decorators import method_decorator
-from rest_framework import generics
+from rest_framework import generics, negotiation, views
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from drf_yasg.openapi import Parameter
+from drf_yasg.renderers import OpenAPIRenderer, SwaggerJSONRenderer, SwaggerYAMLRenderer
 from drf_yasg.utils import swagger_auto_schema
-from ucamlookup import ibisclient, re
+from ucamlookup import ibisclient
+from . import cache
+from . import content
+from . import fastserializers
 from . import ibis
+from . import responses
 from . import serializers
-from automationoauthdrf.authentication import OAuth2TokenAuthentication
+from . import snapshots
+from . import timing
+from .authentication import OAuth2TokenAuthentication
 from .permissions import HasScopesPermission
 
 
@@ -25,6 +46,38 @@ List of OAuth2 scopes requires to access the Lookup API.
 
 """
 
+MOCK_IDENTIFIER = re.compile(r'test0([0-4]\d\d|500)')
+"""
+Regular expression matching the start of identifiers in the "mock" scheme for which data from the
+test user mug99 is returned.
+
+"""
+
+MOCK_STUDENT_IDENTIFIER = re.compile(r'test0(40[1-9]|4[1-9]\d|500)')
+"""
+Regular expression matching the start of identifiers in the "mock" scheme which are not marked as
+current staff.
+
+"""
+
+MOCK_TEMPLATE_RESOURCE = 'mock-template'
+"""
+Resource name of the cached test user mug99 in the ``LOOKUP_API_CACHE_TIMEOUTS`` and
+``LOOKUP_API_CACHE_STALE_TIMEOUTS`` settings.
+
+"""
+
+SCHEMA_DOCUMENT_RENDERERS = (OpenAPIRenderer, SwaggerJSONRenderer, SwaggerYAMLRenderer)
+"""drf-yasg renderers whose output is cached by :py:class:`CachedSchemaMixin`."""
+
+_schemas = {}
+_schemas_flight = cache.SingleFlight()
+
+
+def _represent(data):
+    """Return a :py:class:`~.responses.Representation` of *data* along with its rendering."""
+    return responses.Representation(data=data, prerendered=responses.prerender(data))
+
 
 def _get_or_404(obj):
     """Raise a HTTP 404 NotFound if obj is None otherwise return obj."""
@@ -35,47 +88,193 @@ def _get_or_404(obj):
 
 class ViewPermissionsMixin:
     """
-    A mixin class which specifies the authentication and permissions for all API endpoints.
+    A mixin class which specifies the authentication and permissions for all API endpoints. The
+    time taken to authenticate the request is recorded as the "auth" metric of the current
+    :py:class:`~.timing.Timings` recorder.
 
     """
     authentication_classes = (OAuth2TokenAuthentication,)
     permission_classes = (HasScopesPermission,)
     required_scopes = REQUIRED_SCOPES
 
+    def perform_authentication(self, request):
+        with timing.timed('auth'):
+            super().perform_authentication(request)
+
+
+class RepresentationMixin:
+    """
+    A mixin for views which return serialised representations. Responses rendered as compact JSON
+    have a strong ETag computed from the rendered body and requests with a matching
+    ``If-None-Match`` header receive a 304 Not Modified response.
+
+    Responses may also be large. If :py:attr:`streaming_resource` is listed in the
+    ``LOOKUP_API_STREAMING_RESOURCES`` setting and the response is to be rendered as compact JSON,
+    :py:meth:`make_response` returns a streaming response which renders lists element by element.
+    Views may then pass lazily serialised data to :py:meth:`make_response` so that large lists are
+    never held in memory in their entirety. Since the body is not known until it has been sent,
+    streaming responses have no ETag.
+
+    """
+    streaming_resource = None
+    """Resource name used in the ``LOOKUP_API_STREAMING_RESOURCES`` setting."""
+
+    def is_streaming_resource(self):
+        """Return True if :py:attr:`streaming_resource` is configured to be streamed."""
+        return self.streaming_resource in settings.LOOKUP_API_STREAMING_RESOURCES
+
+    def should_stream(self):
+        """
+        Return True if :py:meth:`make_response` will return a streaming response for data which
+        has not been pre-rendered.
+
+        """
+        return self.is_streaming_resource() and responses.renders_compact_json(self.request)
+
+    def make_response(self, data, prerendered=None):
+        """
+        Return a response for the serialised data *data*. If *prerendered* is not None, it is the
+        :py:class:`~.responses.Prerendered` rendering of *data* and is used in preference to
+        rendering *data* again.
+
+        """
+        if not responses.renders_compact_json(self.request):
+            return Response(data)
+        if prerendered is None:
+            if self.should_stream():
+                return responses.streaming_response(data)
+            prerendered = responses.prerender(data)
+        return responses.prerendered_response(self.request, prerendered)
+
+
+class CachedRetrieveMixin(RepresentationMixin):
+    """
+    A mixin for retrieve views which caches the serialised representation of the resource along
+    with its rendering and ETag. Cached representations are returned without calling Lookup or
+    re-serialising or re-rendering the resource, and a request with a matching ``If-None-Match``
+    header is answered with a 304 Not Modified response directly from the cache. Concurrent
+    requests for a resource which is not cached share a single call to Lookup and expired
+    representations continue to be served while they are refreshed in the background. Views set
+    :py:attr:`cache_resource` and implement :py:meth:`get_cache_key_parts`.
+
+    Streaming resources are not cached so that memory use does not grow with the size of the
+    resource. Their responses, and those for resources which are not cached, are streamed from
+    lazily serialised data if :py:meth:`~RepresentationMixin.should_stream` returns True.
 
-class PersonFetchAttributes(generics.RetrieveAPIView):
+    """
+    cache_resource = None
+    """
+    Resource name used as a key in the ``LOOKUP_API_CACHE_TIMEOUTS`` and
+    ``LOOKUP_API_CACHE_STALE_TIMEOUTS`` settings.
+
+    """
+
+    def get_cache_key_parts(self):
+        """Return a sequence of normalised values which identify the resource."""
+        raise NotImplementedError()
+
+    def get_data(self, lazy=False):
+        """
+        Return the serialised representation of the resource. See
+        :py:func:`~.fastserializers.serialize` for the meaning of *lazy*.
+
+        """
+        return fastserializers.serialize(
+            self.get_serializer_class(), self.get_object(), self.get_serializer_context(),
+            lazy=lazy)
+
+    def get_representation(self):
+        """Return the :py:class:`~.responses.Representation` of the resource to be cached."""
+        return _represent(self.get_data())
+
+    def retrieve(self, request, *args, **kwargs):
+        timeout = cache.get_timeout(self.cache_resource)
+        if not timeout or self.is_streaming_resource():
+            return self.make_response(self.get_data(lazy=self.should_stream()))
+
+        query = serializers.FetchParametersSerializer(request.query_params).data
+        key = cache.make_key(
+            self.cache_resource, self.get_cache_key_parts(), query['fetch'],
+            request.build_absolute_uri('/'))
+
+        representation = cache.get_response_cache().get_or_set(
+            key, self.get_representation,
+            timeout, cache.get_stale_timeout(self.cache_resource))
+        return self.make_response(representation.data, representation.prerendered)
+
+
+person_attribute_schemes = snapshots.Snapshot('person-attributes', lambda: _represent(
+    fastserializers.serialize(
+        serializers.AttributeSchemeListSerializer,
+        {'results': ibis.get_person_methods().allAttributeSchemes()})))
+"""
+A :py:class:`~.snapshots.Snapshot` of the :py:class:`~.responses.Representation` returned by
+:py:class:`PersonFetchAttributes`.
+
+"""
+
+institution_attribute_schemes = snapshots.Snapshot(
+    'institution-attributes', lambda: _represent(
+        fastserializers.serialize(
+            serializers.AttributeSchemeListSerializer,
+            {'results': ibis.get_institution_methods().allAttributeSchemes()})))
+"""
+A :py:class:`~.snapshots.Snapshot` of the :py:class:`~.responses.Representation` returned by
+:py:class:`InstitutionFetchAttributes`.
+
+"""
+
+institution_directory = snapshots.Snapshot('institutions', lambda: snapshots.InstitutionDirectory(
+    ibis.get_institution_methods().allInsts(
+        includeCancelled=True, fetch=settings.LOOKUP_API_INSTITUTION_SNAPSHOT_FETCH),
+    settings.LOOKUP_API_INSTITUTION_SNAPSHOT_FETCH))
+"""
+A :py:class:`~.snapshots.Snapshot` of all institutions used by :py:class:`InstitutionList` and
+:py:class:`Institution`.
+
+"""
+
+
+class PersonFetchAttributes(RepresentationMixin, generics.RetrieveAPIView):
     """
     All valid attributes for a person.
 
     """
     serializer_class = serializers.AttributeSchemeListSerializer
 
-    def get_object(self):
-        return {'results': ibis.get_person_methods().allAttributeSchemes()}
+    def retrieve(self, request, *args, **kwargs):
+        representation = person_attribute_schemes.get()
+        return self.make_response(representation.data, representation.prerendered)
 
 
-class InstitutionFetchAttributes(generics.RetrieveAPIView):
+class InstitutionFetchAttributes(RepresentationMixin, generics.RetrieveAPIView):
     """
     All valid attributes for a institution.
 
     """
     serializer_class = serializers.AttributeSchemeListSerializer
 
-    def get_object(self):
-        return {'results': ibis.get_institution_methods().allAttributeSchemes()}
+    def retrieve(self, request, *args, **kwargs):
+        representation = institution_attribute_schemes.get()
+        return self.make_response(representation.data, representation.prerendered)
 
 
 @method_decorator(name='get', decorator=swagger_auto_schema(
     query_serializer=serializers.SearchParametersSerializer(),
     operation_security=[{'oauth2': REQUIRED_SCOPES}],
 ))
-class PersonList(ViewPermissionsMixin, generics.ListAPIView):
+class PersonList(ViewPermissionsMixin, RepresentationMixin, generics.ListAPIView):
     """
     Search for people using a free text query string. This is the same search function that is used
     in the Lookup web application. By default, only a few basic details about each person are
     returned, but the optional fetch parameter may be used to fetch additional attributes or
     references.
 
+    Each page of results includes a link to the next page. The link has a cursor which records the
+    total number of results so that subsequent pages need not count them again. Pages requested
+    with a cursor are cached and, if the ``LOOKUP_API_SEARCH_PREFETCH`` setting is True, the page
+    following every page is fetched in the background.
+
     """
     serializer_class = serializers.PersonListResultsSerializer
 
@@ -85,15 +284,142 @@ class PersonList(ViewPermissionsMixin, generics.ListAPIView):
     full_query_keys = ['offset', 'limit', 'fetch', 'orderBy']
     """Query keys which are used only by search."""
 
+    cache_resource = 'person-search'
+    """Resource name for cached pages of results requested with a cursor."""
+
+    cursor_salt = 'lookupapi.views.PersonList.cursor'
+    """Salt used when signing cursors."""
+
     def list(self, request):
         query = serializers.SearchParametersSerializer(request.query_params).data
-        kwargs = {key: query.get(key) for key in self.count_query_keys}
-        count = ibis.get_person_methods().searchCount(**kwargs)
+        count_kwargs = {key: query.get(key) for key in self.count_query_keys}
+        kwargs = dict(count_kwargs)
         kwargs.update({key: query.get(key) for key in self.full_query_keys})
-        results = ibis.get_person_methods().search(**kwargs)
-        return Response(self.serializer_class({
-            'results': results, 'count': count, 'offset': query['offset'], 'limit': query['limit']
-        }, context={'request': request}).data)
+        context = {'request': request}
+        methods = ibis.get_person_methods()
+
+        if query['cursor'] is None:
+            # The count and the results do not depend on each other and so fetch them
+            # concurrently.
+            results, count = ibis.call_concurrently(
+                functools.partial(methods.search, **kwargs),
+                functools.partial(methods.searchCount, **count_kwargs))
+            results = fastserializers.serialize(
+                serializers.PersonSummarySerializer, results, context, many=True)
+            self.prefetch_next_page(methods, kwargs, context, count)
+        else:
+            kwargs['offset'], count = self.decode_cursor(query['cursor'], count_kwargs)
+            results = self.get_page(methods, kwargs, context, count)
+
+        next_offset = kwargs['offset'] + kwargs['limit']
+        next_url = None
+        if kwargs['limit'] > 0 and next_offset < count:
+            next_url = remove_query_param(replace_query_param(
+                request.build_absolute_uri(), 'cursor',
+                self.encode_cursor(count_kwargs, next_offset, count)), 'offset')
+
+        return self.make_response(collections.OrderedDict([
+            ('results', results), ('count', count), ('offset', kwargs['offset']),
+            ('limit', kwargs['limit']), ('next', next_url),
+        ]))
+
+    def get_page(self, methods, kwargs, context, count):
+        """
+        Return the serialised results of a search with keyword arguments *kwargs* made using the
+        person methods *methods*, caching them and starting a background fetch of the next page if
+        pages of results are cached. The total number of results is *count*.
+
+        """
+        timeout = cache.get_timeout(self.cache_resource)
+        if not timeout:
+            return self.get_results(methods, kwargs, context)
+
+        results = cache.get_response_cache().get_or_set(
+            self.make_page_key(kwargs), functools.partial(
+                self.get_results, methods, kwargs, context),
+            timeout, cache.get_stale_timeout(self.cache_resource))
+        self.prefetch_next_page(methods, kwargs, context, count)
+        return results
+
+    def prefetch_next_page(self, methods, kwargs, context, count):
+        """
+        Start a background fetch into the cache of the page following the one for the search with
+        keyword arguments *kwargs* if prefetching is enabled, pages of results are cached and there
+        is a following page.
+
+        """
+        timeout = cache.get_timeout(self.cache_resource)
+        next_kwargs = dict(kwargs, offset=kwargs['offset'] + kwargs['limit'])
+        if not settings.LOOKUP_API_SEARCH_PREFETCH or not timeout:
+            return
+        if kwargs['limit'] <= 0 or next_kwargs['offset'] >= count:
+            return
+        cache.get_response_cache().prefetch(
+            self.make_page_key(next_kwargs), functools.partial(
+                self.get_results, methods, next_kwargs, context),
+            timeout, cache.get_stale_timeout(self.cache_resource))
+
+    def get_results(self, methods, kwargs, context):
+        """
+        Return the serialised results of a search with keyword arguments *kwargs* made using the
+        person methods *methods*.
+
+        """
+        return fastserializers.serialize(
+            serializers.PersonSummarySerializer, methods.search(**kwargs), context, many=True)
+
+    def make_page_key(self, kwargs):
+        """Return the response cache key for the page of results of a search."""
+        return cache.make_key(self.cache_resource, (
+            self.get_query_fingerprint(kwargs), kwargs['offset'], kwargs['limit'],
+            kwargs['orderBy']), kwargs['fetch'], self.request.build_absolute_uri('/'))
+
+    def get_query_fingerprint(self, kwargs):
+        """Return a digest of the values of the count query keys in *kwargs*."""
+        query = {key: kwargs[key] for key in self.count_query_keys}
+        return hashlib.sha1(json.dumps(query, sort_keys=True).encode('utf8')).hexdigest()
+
+    def encode_cursor(self, count_kwargs, offset, count):
+        """
+        Return a signed cursor for the page of results at *offset* with total *count*. The cursor
+        records the period of ``LOOKUP_API_SEARCH_CURSOR_MAX_AGE`` seconds in which it was created
+        rather than the exact time so that the same page has the same cursor, and so the same ETag,
+        throughout the period.
+
+        """
+        position = json.dumps({
+            'query': self.get_query_fingerprint(count_kwargs), 'offset': offset, 'count': count,
+            'period': self.get_cursor_period(),
+        }, sort_keys=True, separators=(',', ':'))
+        return signing.Signer(salt=self.cursor_salt).sign(
+            base64.urlsafe_b64encode(position.encode('utf8')).decode('ascii'))
+
+    def get_cursor_period(self):
+        """
+        Return the number of the current period of ``LOOKUP_API_SEARCH_CURSOR_MAX_AGE`` seconds.
+        Cursors are accepted during the period in which they were created and the following one.
+
+        """
+        return int(time.time() // settings.LOOKUP_API_SEARCH_CURSOR_MAX_AGE)
+
+    def decode_cursor(self, cursor, count_kwargs):
+        """
+        Return the offset and count recorded in *cursor*. Raise a
+        :py:class:`rest_framework.exceptions.ValidationError` if the cursor is invalid, has expired
+        or is for a different query.
+
+        """
+        try:
+            position = signing.Signer(salt=self.cursor_salt).unsign(cursor)
+            position = json.loads(
+                base64.urlsafe_b64decode(position.encode('ascii')).decode('utf8'))
+        except signing.BadSignature:
+            raise ValidationError({'cursor': ['Invalid or expired cursor.']})
+        if not 0 <= self.get_cursor_period() - position.get('period', -2) <= 1:
+            raise ValidationError({'cursor': ['Invalid or expired cursor.']})
+        if position.get('query') != self.get_query_fingerprint(count_kwargs):
+            raise ValidationError({'cursor': ['Cursor does not match query.']})
+        return position['offset'], position['count']
 
 
 @method_decorator(name='get', decorator=swagger_auto_schema(
@@ -109,7 +435,7 @@ class PersonList(ViewPermissionsMixin, generics.ListAPIView):
                 'this will be the crsid of the person.')),
     ],
 ))
-class Person(ViewPermissionsMixin, generics.RetrieveAPIView):
+class Person(ViewPermissionsMixin, CachedRetrieveMixin, generics.RetrieveAPIView):
     """
     Retrieve information on a person by scheme and identifier within that scheme. The scheme is
     usually "crsid" and the identifier is usually that person's crsid.
@@ -122,12 +448,16 @@ class Person(ViewPermissionsMixin, generics.RetrieveAPIView):
 
     """
     serializer_class = serializers.PersonSerializer
+    cache_resource = 'person'
 
-    def get_object(self):
-        query = serializers.FetchParametersSerializer(self.request.query_params)
+    def get_scheme_and_identifier(self):
+        """
+        Return the scheme and identifier of the requested person, resolving the "token" scheme to
+        the authenticated user.
+
+        """
         scheme = self.kwargs['scheme']
         identifier = self.kwargs['identifier']
-        fetch = query.data['fetch']
 
         if scheme == "token" and identifier == "self":
             if self.request.user.is_authenticated:
@@ -144,9 +474,24 @@ class Person(ViewPermissionsMixin, generics.RetrieveAPIView):
             else:
                 raise Http404("You are not authenticated")
 
-        if scheme == "mock" and re.match('test0([0-4]\d\d|500)', identifier):
-            # Returns a mocked lookup entry for a Person (test user mug99)
-            person = ibis.get_person_methods().getPerson("crsid", "mug99", fetch)
+        return scheme, identifier
+
+    def get_cache_key_parts(self):
+        scheme, identifier = self.get_scheme_and_identifier()
+        # Mock identities are matched case-sensitively below and so must not be normalised.
+        if scheme == "mock":
+            return scheme, identifier
+        return scheme.lower(), identifier.lower()
+
+    def get_object(self):
+        query = serializers.FetchParametersSerializer(self.request.query_params)
+        scheme, identifier = self.get_scheme_and_identifier()
+        fetch = query.data['fetch']
+
+        if scheme == "mock" and MOCK_IDENTIFIER.match(identifier):
+            # Returns a mocked lookup entry for a Person (test user mug99). The template is shared
+            # between requests and so is copied rather than modified.
+            person = copy.copy(self.get_mock_template(fetch))
             person.identifier = ibisclient.IbisIdentifier({'scheme': scheme, 'value': identifier})
             person.identifier.value = identifier
             if hasattr(person, "identifiers"):
@@ -156,7 +501,7 @@ class Person(ViewPermissionsMixin, generics.RetrieveAPIView):
             # Following raven recommendations: "User-ids test0001 to test0400 are marked as
             # belonging to 'current staff and students', leaving user-ids test0401 to test0500 not
             # so marked"
-            if re.match('test0(40[1-9]|4[1-9]\d|500)', identifier):
+            if MOCK_STUDENT_IDENTIFIER.match(identifier):
                 # This is the only way to have isStaff returning False, misAffiliation returns
                 # isStaff=True as some members of staff have this
                 person.misAffiliation = "student"
@@ -164,17 +509,106 @@ class Person(ViewPermissionsMixin, generics.RetrieveAPIView):
 
         return _get_or_404(ibis.get_person_methods().getPerson(scheme, identifier, fetch))
 
+    def get_mock_template(self, fetch):
+        """
+        Return the test user mug99 fetched from Lookup with the fetch parameter *fetch*. The
+        result is cached per fetch parameter according to the :py:data:`MOCK_TEMPLATE_RESOURCE`
+        timeouts so that mock people are generated without calling Lookup.
+
+        """
+        def get_template():
+            return _get_or_404(ibis.get_person_methods().getPerson("crsid", "mug99", fetch))
+
+        timeout = cache.get_timeout(MOCK_TEMPLATE_RESOURCE)
+        if not timeout:
+            return get_template()
+        return cache.get_response_cache().get_or_set(
+            cache.make_key(MOCK_TEMPLATE_RESOURCE, ('crsid', 'mug99'), fetch), get_template,
+            timeout, cache.get_stale_timeout(MOCK_TEMPLATE_RESOURCE))
+
+
+@method_decorator(name='post', decorator=swagger_auto_schema(
+    request_body=serializers.PersonBatchParametersSerializer(),
+    responses={200: serializers.PersonBatchResultsSerializer()},
+    operation_security=[{'oauth2': REQUIRED_SCOPES}],
+))
+class PersonBatch(ViewPermissionsMixin, generics.GenericAPIView):
+    """
+    Retrieve information on many people by crsid in a single request. Results are returned in the
+    order the crsids were requested. Each result has a status of 200 and the person if the person
+    was found or a status of 404 and a null person if they were not.
+
+    """
+    serializer_class = serializers.PersonBatchParametersSerializer
+
+    def post(self, request):
+        query = self.get_serializer(data=request.data)
+        query.is_valid(raise_exception=True)
+        identifiers = query.validated_data['identifiers']
+        fetch = query.validated_data['fetch']
+
+        response_cache = cache.get_response_cache()
+        timeout = cache.get_timeout(Person.cache_resource)
+        stale_timeout = cache.get_stale_timeout(Person.cache_resource)
+        base_url = request.build_absolute_uri('/')
+
+        def make_key(crsid):
+            return cache.make_key(Person.cache_resource, ('crsid', crsid), fetch, base_url)
+
+        # Serialised people keyed by normalised crsid. Use any which are already cached.
+        crsids = list(collections.OrderedDict.fromkeys(
+            identifier.lower() for identifier in identifiers))
+        people = {}
+        if timeout:
+            for crsid in crsids:
+                representation = response_cache.get(make_key(crsid))
+                if representation is not None:
+                    people[crsid] = representation.data
+
+        # Fetch the remainder from Lookup in concurrent chunks.
+        missing = [crsid for crsid in crsids if crsid not in people]
+        if len(missing) > 0:
+            methods = ibis.get_person_methods()
+            chunk_size = settings.LOOKUP_API_BATCH_CHUNK_SIZE
+            chunks = [missing[idx:idx+chunk_size] for idx in range(0, len(missing), chunk_size)]
+            chunk_results = ibis.call_concurrently(*[
+                functools.partial(methods.listPeople, ','.join(chunk), fetch) for chunk in chunks
+            ])
+            context = self.get_serializer_context()
+            for person in itertools.chain.from_iterable(chunk_results):
+                if person.identifier is None:
+                    continue
+                crsid = person.identifier.value.lower()
+                data = people[crsid] = fastserializers.serialize(
+                    serializers.PersonSerializer, person, context)
+                if timeout:
+                    response_cache.set(
+                        make_key(crsid), responses.Representation(data=data, prerendered=None),
+                        timeout, stale_timeout)
+
+        return Response({'results': [
+            {'identifier': identifier, 'status': 200, 'person': people[identifier.lower()]}
+            if identifier.lower() in people else
+            {'identifier': identifier, 'status': 404, 'person': None}
+            for identifier in identifiers
+        ]})
+
 
 @method_decorator(name='get', decorator=swagger_auto_schema(
     query_serializer=serializers.FetchParametersSerializer(),
     operation_security=[{'oauth2': REQUIRED_SCOPES}],
 ))
-class Group(ViewPermissionsMixin, generics.RetrieveAPIView):
+class Group(ViewPermissionsMixin, CachedRetrieveMixin, generics.RetrieveAPIView):
     """
     Retrieve information on a group by groupid.
 
     """
     serializer_class = serializers.GroupSerializer
+    cache_resource = 'group'
+    streaming_resource = 'group'
+
+    def get_cache_key_parts(self):
+        return (self.kwargs['groupid'].lower(),)
 
     def get_object(self):
         query = serializers.FetchParametersSerializer(self.request.query_params)
@@ -186,42 +620,174 @@ class Group(ViewPermissionsMixin, generics.RetrieveAPIView):
     query_serializer=serializers.InstitutionListParametersSerializer(),
     operation_security=[{'oauth2': REQUIRED_SCOPES}],
 ))
-class InstitutionList(ViewPermissionsMixin, generics.ListAPIView):
+class InstitutionList(ViewPermissionsMixin, RepresentationMixin, generics.ListAPIView):
     """
     Return a list of all institutions known to Lookup.
 
     """
     serializer_class = serializers.InstitutionListResultsSerializer
+    streaming_resource = 'institution-list'
 
     def list(self, request):
         query = serializers.InstitutionListParametersSerializer(self.request.query_params).data
-        results = ibis.get_institution_methods().allInsts(
-            includeCancelled=query['includeCancelled'], fetch=query['fetch'])
-        return Response(self.serializer_class(
-            {'results': results}, context={'request': request}).data)
+
+        if not settings.LOOKUP_API_INSTITUTION_SNAPSHOT:
+            results = ibis.get_institution_methods().allInsts(
+                includeCancelled=query['includeCancelled'], fetch=query['fetch'])
+            return self.make_response(fastserializers.serialize(
+                self.serializer_class, {'results': results}, context={'request': request},
+                lazy=self.should_stream()))
+
+        # The list representation includes only summary fields and so does not depend on the fetch
+        # parameter. It does depend on the base URL since it includes links to each institution.
+        directory = institution_directory.get()
+        key = (query['includeCancelled'], request.build_absolute_uri('/'))
+        representation = directory.representations.get(key)
+        if representation is None:
+            representation = directory.representations[key] = _represent(
+                fastserializers.serialize(
+                    self.serializer_class, {'results': directory.list(query['includeCancelled'])},
+                    context={'request': request}))
+        return self.make_response(representation.data, representation.prerendered)
 
 
 @method_decorator(name='get', decorator=swagger_auto_schema(
     query_serializer=serializers.FetchParametersSerializer(),
     operation_security=[{'oauth2': REQUIRED_SCOPES}],
 ))
-class Institution(ViewPermissionsMixin, generics.RetrieveAPIView):
+class Institution(ViewPermissionsMixin, CachedRetrieveMixin, generics.RetrieveAPIView):
     """
     Retrieve information on an institution by instid.
 
     """
     serializer_class = serializers.InstitutionSerializer
+    cache_resource = 'institution'
+    streaming_resource = 'institution'
+
+    def get_cache_key_parts(self):
+        return (self.kwargs['instid'].upper(),)
 
     def get_object(self):
         query = serializers.FetchParametersSerializer(self.request.query_params)
+
+        # Use the institution snapshot if it has been loaded and has the right data.
+        if settings.LOOKUP_API_INSTITUTION_SNAPSHOT:
+            directory = institution_directory.get(load=False)
+            if directory is not None and directory.covers(query.data['fetch']):
+                institution = directory.get(self.kwargs['instid'])
+                if institution is not None:
+                    return institution
+
         return _get_or_404(ibis.get_institution_methods().getInst(
             self.kwargs['instid'], query.data['fetch']))
 
 
+class ContentNegotiation(negotiation.BaseContentNegotiation):
+    """
+    Content negotiation which ignores the client's Accept header and always selects the first
+    parser and renderer. Used by views which return content of a fixed type.
+
+    """
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(
+    operation_security=[{'oauth2': REQUIRED_SCOPES}],
+    responses={
+        200: 'The binary data.',
+        304: 'The binary data matches the If-None-Match header.',
+        404: 'The binary data is no longer available.',
+    },
+))
+class AttributeContent(ViewPermissionsMixin, views.APIView):
+    """
+    Return the binary data of an attribute, such as a JPEG photo. Links to this endpoint are
+    included in attributes in place of their binary data if the server is so configured. The data
+    is identified by its digest and so never changes but it is only available for a limited time
+    after the link was returned.
+
+    """
+    content_negotiation_class = ContentNegotiation
+
+    def get(self, request, digest):
+        def get_content():
+            return _get_or_404(content.load(digest))
+
+        return responses.content_response(
+            request, '"{}"'.format(digest), settings.LOOKUP_API_CONTENT_CACHE_CONTROL,
+            get_content)
+
+
+class CachedSchemaMixin:
+    """
+    A mixin for drf-yasg schema views which generates the schema once for each API version and base
+    URL and renders, and so validates, each schema document format once. Schema documents are
+    served from memory with a strong ETag and requests with a matching ``If-None-Match`` header
+    receive a 304 Not Modified response. Cached schemas are kept until the process exits or
+    :py:func:`clear_schema_cache` is called. Concurrent requests for a schema which is not cached
+    share a single generation.
+
+    Web UI renderers are passed the cached schema and so render the page without generating the
+    schema.
+
+    """
+    def get(self, request, version='', format=None):
+        key = (request.version or version or '', request.build_absolute_uri('/'))
+
+        def get_schema():
+            return super(CachedSchemaMixin, self).get(request, version, format).data
+
+        schema = _get_cached_schema(key, get_schema)
+
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, SCHEMA_DOCUMENT_RENDERERS):
+            return Response(schema)
+
+        def render():
+            body = renderer.render(schema, renderer.media_type, self.get_renderer_context())
+            return responses.Prerendered(body=body, etag=responses.make_etag(body))
+
+        prerendered = _get_cached_schema(key + (renderer.media_type,), render)
+        return responses.prerendered_response(request, prerendered, renderer.media_type)
+
+
+def with_cached_schema(schema_view):
+    """
+    Return a sub-class of the drf-yasg schema view class *schema_view*, as returned by
+    :py:func:`drf_yasg.views.get_schema_view`, which uses :py:class:`CachedSchemaMixin`. Since the
+    schema is cached, the view should not also be wrapped with ``cache_page`` and so should be
+    created with a ``cache_timeout`` of 0.
+
+    """
+    return type(schema_view.__name__, (CachedSchemaMixin, schema_view), {})
+
+
+def clear_schema_cache():
+    """Forget all schemas and schema documents cached by :py:class:`CachedSchemaMixin`."""
+    _schemas.clear()
+
+
+def _get_cached_schema(key, compute):
+    """
+    Return the schema or schema document cached for *key*, calling *compute* to create it if
+    necessary.
+
+    """
+    value = _schemas.get(key)
+    if value is None:
+        value = _schemas_flight.do(key, lambda: _schemas.setdefault(key, compute()))
+    return value
+
+
 class Health(generics.RetrieveAPIView):
     """
-    Returns a HTTP 200 response when the application is running. Can be used as a readiness
-    probe.
+    Returns a HTTP 200 response when the application is running. Can be used as a liveness
+    probe. Probes are usually answered by :py:class:`~.middleware.HealthCheckMiddleware` before
+    reaching this view. Readiness probes should use :py:func:`~.health.readiness_view`.
 
     """
     serializer_class = serializers.HealthSerializer
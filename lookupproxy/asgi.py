@@ -0,0 +1,31 @@
+"""
+ASGI config for lookupproxy project.
+
+It exposes the ASGI callable as a module-level variable named ``application``. It may be served by
+any ASGI server, for example::
+
+    gunicorn lookupproxy.asgi:application --worker-class uvicorn.workers.UvicornWorker
+
+This is a deployment entry point only. ASGI support requires Django 3.0 or later. The lookupapi
+views are synchronous Django REST Framework views which call Lookup with the blocking ibisclient
+and so serving them over ASGI does not let a worker serve more concurrent requests than the WSGI
+application under threaded workers. See :py:mod:`lookupproxy.wsgi`.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from django.core.asgi import get_asgi_application
+except ImportError:
+    raise ImproperlyConfigured(
+        'Serving lookupproxy over ASGI requires Django 3.0 or later. Use lookupproxy.wsgi '
+        'instead.')
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "lookupproxy.settings")
+
+application = get_asgi_application()
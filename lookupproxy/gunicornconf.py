@@ -0,0 +1,23 @@
+"""
+The :py:mod:`lookupproxy.gunicornconf` module is a gunicorn configuration file defining server
+hooks used when serving lookupproxy. It is passed to gunicorn by the Docker entrypoint script::
+
+    gunicorn --config lookupproxy/gunicornconf.py lookupproxy.wsgi:application
+
+"""
+
+
+def post_worker_init(worker):
+    """
+    Start loading in-memory snapshots of rarely changing Lookup data once a worker process has
+    loaded the application. See :py:func:`lookupapi.snapshots.preload`.
+
+    """
+    from lookupapi import snapshots
+    snapshots.preload()
+
+
+def child_exit(server, worker):
+    """Remove the live metrics of a worker process which has exited."""
+    from lookupapi import metrics
+    metrics.mark_process_dead(worker.pid)
@@ -36,8 +36,12 @@ INSTALLED_APPS = [
 
 #: Installed middleware
 MIDDLEWARE = [
+    'lookupapi.middleware.HealthCheckMiddleware',
+    'lookupapi.middleware.TimingMiddleware',
+    'lookupapi.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'lookupapi.middleware.CacheControlMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
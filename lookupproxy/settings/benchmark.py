@@ -0,0 +1,49 @@
+"""
+The :py:mod:`lookupproxy.settings.benchmark` module contains settings used by the load benchmarks
+in the ``benchmarks`` directory. Lookup and the OAuth2 endpoints are provided by the fake Lookup
+server in ``benchmarks/fakelookup.py`` listening on localhost on the port given by the
+``LOOKUPPROXY_FAKE_LOOKUP_PORT`` environment variable.
+
+"""
+import os
+import tempfile
+
+# Import settings from the base settings file
+from .base import *  # noqa: F401, F403
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['*']
+
+_fake_lookup_port = int(os.environ.get('LOOKUPPROXY_FAKE_LOOKUP_PORT', '8443'))
+
+LOOKUP_API_ENDPOINT_HOST = 'localhost'
+LOOKUP_API_ENDPOINT_PORT = _fake_lookup_port
+
+OAUTH2_TOKEN_URL = 'https://localhost:{}/oauth2/token'.format(_fake_lookup_port)
+OAUTH2_INTROSPECT_URL = 'https://localhost:{}/oauth2/introspect'.format(_fake_lookup_port)
+OAUTH2_CLIENT_ID = 'benchmark-client-id'
+OAUTH2_CLIENT_SECRET = 'benchmark-client-secret'
+OAUTH2_INTROSPECT_SCOPES = ['introspect']
+
+#: Responses are not cached so that every request is proxied to the fake Lookup server.
+LOOKUP_API_CACHE_TIMEOUTS = {}
+
+#: Keep enough connections to Lookup, and threads for concurrent calls, for the most concurrent
+#: worker configuration benchmarked.
+LOOKUP_API_CONNECTION_POOL_SIZE = 64
+LOOKUP_API_EXECUTOR_MAX_WORKERS = 64
+
+#: Link to binary attribute data so that the content endpoint may be benchmarked. Linked content
+#: is stored in a file-based cache shared by all worker processes.
+LOOKUP_API_BINARY_CONTENT_LINKS = True
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'lookupproxy-benchmark-cache'),
+    },
+}
+
+LOOKUP_API_CACHE_BACKEND = 'shared'
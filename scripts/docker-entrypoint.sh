@@ -2,12 +2,32 @@
 python manage.py migrate                  # Apply database migrations
 python manage.py collectstatic --noinput  # Collect static files
 
-# Start Gunicorn processes
+# Worker configuration. The default of a few synchronous workers can serve only as many requests
+# at once as there are workers. Set GUNICORN_WORKER_CLASS to "gthread" or "gevent" to serve many
+# concurrent requests per worker while they wait for Lookup. See "Serving" in the documentation.
+GUNICORN_WORKERS=${GUNICORN_WORKERS:-3}
+GUNICORN_WORKER_CLASS=${GUNICORN_WORKER_CLASS:-sync}
+GUNICORN_THREADS=${GUNICORN_THREADS:-1}                         # gthread workers only
+GUNICORN_WORKER_CONNECTIONS=${GUNICORN_WORKER_CONNECTIONS:-1000}  # gevent workers only
+
+# Metrics from all workers are aggregated via files in this directory which must start empty. See
+# the lookupapi.metrics module.
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/lookupproxy-metrics}
+export prometheus_multiproc_dir=$PROMETHEUS_MULTIPROC_DIR  # older prometheus_client versions
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Start Gunicorn processes. Additional arguments are passed to gunicorn. Do not pass --preload: the
+# application must be loaded separately by each worker process. See "Serving" in the documentation.
 echo Starting Gunicorn.
 exec gunicorn lookupproxy.wsgi:application \
+    --config lookupproxy/gunicornconf.py \
     --name lookupproxy \
     --bind 0.0.0.0:8080 \
-    --workers 3 \
+    --workers "$GUNICORN_WORKERS" \
+    --worker-class "$GUNICORN_WORKER_CLASS" \
+    --threads "$GUNICORN_THREADS" \
+    --worker-connections "$GUNICORN_WORKER_CONNECTIONS" \
     --log-level=info \
     --log-file=- \
     --access-logfile=- \